@@ -1,11 +1,7 @@
+import uuid
+
 import streamlit as st
-import os
-import tempfile
-from src.graphs.builder import build_graph
-from src.graphs.type import RAGAgentState
-# from src.utils.ingest_pdf import IngestPDF
-# from src.utils.ingest_pdf_docling import IngestPDF
-from src.utils.ingest_pdf_docling_genaiembeddings import IngestPDF
+from src.service.client import QueryServiceClient, ServiceBusyError, ServiceError
 
 
 # Configure page
@@ -22,22 +18,50 @@ if 'answer' not in st.session_state:
 if 'ingestion_completed' not in st.session_state:
     st.session_state.ingestion_completed = False
 
-def save_uploaded_files(uploaded_files):
-    """Save uploaded files to temporary directory and return file paths"""
-    temp_dir = tempfile.mkdtemp()
-    file_paths = []
-    
-    for uploaded_file in uploaded_files:
-        # Create a temporary file
-        temp_file_path = os.path.join(temp_dir, uploaded_file.name)
-        
-        # Write the uploaded file to the temporary file
-        with open(temp_file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        
-        file_paths.append(temp_file_path)
-    
-    return file_paths
+# Labels for the per-stage progress reported by the ingestion job
+STAGE_LABELS = {
+    "pages_converted": "Pages converted",
+    "chunks_embedded": "Chunks embedded",
+    "points_upserted": "Points upserted",
+}
+
+# Docling profiles offered by the service, with what they trade off
+PROFILE_HELP = {
+    "fast": "No OCR or table structure; quickest for born-digital text",
+    "balanced": "OCR only on scanned pages, fast table structure",
+    "accurate": "Full OCR, accurate table structure and figure images; slowest",
+}
+
+@st.cache_resource
+def get_client():
+    """Client for the query service, shared across reruns and sessions"""
+    return QueryServiceClient()
+
+
+def current_workspace() -> str:
+    """Tenant of this session's documents; a new session gets its own, kept in the URL across refreshes"""
+    if "workspace" not in st.query_params:
+        st.query_params["workspace"] = uuid.uuid4().hex[:12]
+    return st.query_params["workspace"]
+
+
+def workspace_sidebar():
+    """Show the workspace, switch to a shared one, or delete its documents"""
+    with st.sidebar:
+        st.subheader("Workspace")
+        name = st.text_input("Workspace", value=current_workspace(),
+                             help="Documents are only searched within the workspace they were uploaded to. "
+                                  "Enter the same name in another session to share them.")
+        if name and name != current_workspace():
+            st.query_params["workspace"] = name
+            st.rerun()
+        if st.button("Delete workspace documents"):
+            try:
+                result = get_client().drop_tenant(current_workspace())
+                st.session_state.ingestion_completed = False
+                st.success(f"Deleted {result['points_deleted']} chunks.")
+            except ServiceError as e:
+                st.error(f"Could not delete the workspace: {e.detail}")
 
 
 def upload_and_ingest_tab():
@@ -55,45 +79,116 @@ def upload_and_ingest_tab():
         st.write(f"Uploaded {len(uploaded_files)} file(s)")
         for file in uploaded_files:
             st.write(f"- {file.name}")
+
+    # Conversion profile for the upload, with optional per-file overrides
+    profile = st.selectbox(
+        "Conversion profile",
+        list(PROFILE_HELP),
+        index=1,
+        format_func=lambda name: f"{name} - {PROFILE_HELP[name]}",
+    )
+    file_profiles = {}
+    if uploaded_files and len(uploaded_files) > 1:
+        with st.expander("Per-file profiles"):
+            for file in uploaded_files:
+                choice = st.selectbox(file.name, ["(upload profile)"] + list(PROFILE_HELP), key=f"profile_{file.name}")
+                if choice in PROFILE_HELP:
+                    file_profiles[file.name] = choice
     
     # Ingest button
     if st.button("Ingest Files", type="primary", disabled=not uploaded_files):
         if uploaded_files:
-            with st.spinner("Ingesting files..."):
-                try:
-                    # Save uploaded files temporarily
-                    file_paths = save_uploaded_files(uploaded_files)
-                    
-                    # Run ingestion pipeline
-                    ingestor = IngestPDF()
-                    ingestor.run_ingestion_pipeline(file_paths)
-                    
-                    # Mark ingestion as completed
-                    st.session_state.ingestion_completed = True
-                    st.session_state.uploaded_files = file_paths
-                                        
-                    # Clean up temporary files
-                    for file_path in file_paths:
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
-                            
-                except Exception as e:
-                    st.error(f"Error during ingestion: {str(e)}")
+            try:
+                # Queue an ingestion job on the query service; it runs in the background
+                files = [(file.name, file.getvalue()) for file in uploaded_files]
+                job = get_client().ingest(files, profile=profile, file_profiles=file_profiles,
+                                          tenant=current_workspace())
+
+                # Keep the job id in the URL so a page refresh keeps tracking it
+                st.query_params["job"] = job["job_id"]
+                st.session_state.ingestion_completed = False
+                st.session_state.uploaded_files = [file.name for file in uploaded_files]
+
+            except ServiceBusyError:
+                st.error("The service is busy ingesting other files. Please try again shortly.")
+            except Exception as e:
+                st.error(f"Error during ingestion: {str(e)}")
         else:
             st.warning("Please upload files first.")
-    
+
     # Show ingestion status
-    if st.session_state.ingestion_completed:
+    if "job" in st.query_params:
+        ingestion_status()
+    elif st.session_state.ingestion_completed:
         st.success("Files have been ingested and are ready for querying!")
 
+
+@st.fragment(run_every=2)
+def ingestion_status():
+    """Poll the current ingestion job and show per-stage progress"""
+    job_id = st.query_params.get("job")
+    if not job_id:
+        return
+    try:
+        job = get_client().job(job_id)
+    except ServiceError as e:
+        if e.status_code == 404:
+            # Job no longer known to the service (e.g. it restarted)
+            del st.query_params["job"]
+            st.rerun()
+        st.error(f"Could not fetch ingestion status: {e.detail}")
+        return
+    except Exception as e:
+        st.error(f"Could not fetch ingestion status: {str(e)}")
+        return
+
+    status = job["status"]
+    st.write(f"Ingestion of {', '.join(job['files'])}: **{status}** ({job['elapsed_s']:.0f}s)")
+    for stage, label in STAGE_LABELS.items():
+        progress = job["stages"][stage]
+        done, total = progress["done"], progress["total"]
+        text = f"{label}: {done}/{total}" if total else f"{label}: waiting"
+        if progress["per_second"]:
+            text += f" ({progress['per_second']:.1f}/s)"
+        st.progress(min(done / total, 1.0) if total else 0.0, text=text)
+
+    conversion = job.get("report", {}).get("conversion")
+    if conversion and (conversion["fast_pages"] or conversion["docling_pages"]):
+        text = f"Pages: {conversion['fast_pages']} extracted directly"
+        if conversion["fast_pages_per_second"]:
+            text += f" ({conversion['fast_pages_per_second']:.1f}/s)"
+        text += f", {conversion['docling_pages']} with Docling"
+        if conversion["docling_pages_per_second"]:
+            text += f" ({conversion['docling_pages_per_second']:.2f}/s)"
+        if conversion["docling_reasons"]:
+            reasons = ", ".join(f"{n} {reason}" for reason, n in conversion["docling_reasons"].items())
+            text += f" [{reasons}]"
+        st.caption(text)
+
+    if status in ("queued", "running"):
+        if st.button("Cancel ingestion"):
+            get_client().cancel_job(job_id)
+        return
+
+    if status == "completed":
+        st.success("Files have been ingested and are ready for querying!")
+        if not st.session_state.ingestion_completed:
+            st.session_state.ingestion_completed = True
+            # Refresh the whole page so the query tab picks up the new state
+            st.rerun()
+    elif status == "failed":
+        st.error(f"Error during ingestion: {job['error']}")
+    else:
+        st.warning("Ingestion was cancelled.")
+
 def ask_questions_tab():
     """Tab for asking questions"""
     st.subheader("Ask Questions")
     
-    # Check if ingestion has been completed
+    # Queries are answered from whatever has been ingested so far
     if not st.session_state.ingestion_completed:
-        st.warning("Please upload and ingest files first in the 'Upload Files' tab.")
-        return
+        st.info("Answers only cover documents that have finished ingesting. "
+                "Upload files in the 'Upload Files' tab if you haven't yet.")
     
     # Query input
     user_query = st.text_area(
@@ -107,22 +202,14 @@ def ask_questions_tab():
         if user_query.strip():
             with st.spinner("Processing your query..."):
                 try:
-                    # Create initial state for the graph
-                    initial_state = RAGAgentState(
-                        query=user_query,
-                        answer="",
-                        status="processing",
-                        is_weather_query=False,
-                        location=""
-                    )
-                    
-                    # Build and run graph
-                    graph = build_graph(initial_state)
-                    final_state = graph.invoke(initial_state)
+                    # Run the graph on the query service
+                    final_state = get_client().query(user_query, tenant=current_workspace())
                     
                     # Update session state with the answer
                     st.session_state.answer = final_state['answer']
-                    
+                
+                except ServiceBusyError:
+                    st.error("The service is busy. Please try again shortly.")
                 except Exception as e:
                     st.error(f"Error processing query: {str(e)}")
         else:
@@ -139,6 +226,7 @@ def main():
     
     with col2:
         st.title("AI Assistant")
+        workspace_sidebar()
         
         # Create tabs
         tab1, tab2 = st.tabs(["Upload Files", "Ask Questions"])
@@ -0,0 +1,164 @@
+"""
+Chunk memory benchmark.
+
+Builds the in-memory state ingestion holds for N chunks (default 10,000) and
+reports the peak resident set size, each representation in a fresh interpreter:
+- legacy: one dict per chunk with its own metadata dict, each vector as a
+  list of Python floats (as parsed from the embedding response), and one
+  `PointStruct` per chunk with its own payload and `str(datetime.now())` timestamp
+- columnar: a `ChunkBatch` (src/utils/chunk_batch.py) with interned metadata,
+  the vectors as one float32 matrix, and payloads built one upload batch at a time
+
+Chunks are synthetic: `--chars` characters of text each, in sections of
+`--section-chunks` chunks that share their header metadata, like the chunker's
+output. Results are printed per 10k chunks and appended as one JSON line per
+run to --output.
+
+Usage:
+    python -m benchmarks.chunk_memory
+    python -m benchmarks.chunk_memory --chunks 50000 --dimension 384
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from benchmarks.cold_start import _git_commit
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "chunk_memory.jsonl")
+UPLOAD_BATCH = 100
+
+
+def synthetic_chunks(count: int, chars: int, section_chunks: int) -> Iterator[Dict]:
+    """Chunk dicts as the chunker yields them, with header metadata shared per section."""
+    words = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit")
+    for i in range(count):
+        text = " ".join(words[(i + j) % len(words)] for j in range(chars // 6 + 1))[:chars]
+        section = i // section_chunks
+        yield {"text": text, "metadata": {"Header_1": f"Chapter {section // 10}", "Header_2": f"Section {section}"}}
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def _peak_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def build_legacy(count: int, chars: int, section_chunks: int, dimension: int) -> List:
+    import numpy as np
+    from qdrant_client.models import PointStruct
+
+    rng = np.random.default_rng(0)
+    chunks = list(synthetic_chunks(count, chars, section_chunks))
+    points = []
+    for start in range(0, count, UPLOAD_BATCH):
+        batch = chunks[start:start + UPLOAD_BATCH]
+        embeddings = rng.random((len(batch), dimension), dtype=np.float32).tolist()
+        for offset, (doc, vector) in enumerate(zip(batch, embeddings)):
+            metadata = {"source": "doc.pdf", "file_hash": "0" * 64, "chunk_size": len(doc["text"]),
+                        "timestamp": str(datetime.now())}
+            metadata.update(doc["metadata"])
+            points.append(PointStruct(id=start + offset, vector=vector,
+                                      payload={"page_content": doc["text"], "metadata": metadata}))
+    return [chunks, points]
+
+
+def build_columnar(count: int, chars: int, section_chunks: int, dimension: int) -> List:
+    import numpy as np
+    from src.utils.chunk_batch import ChunkBatch
+
+    rng = np.random.default_rng(0)
+    chunks = ChunkBatch.from_chunks(synthetic_chunks(count, chars, section_chunks))
+    chunks.vectors = np.empty((count, dimension), dtype=np.float32)
+    common = {"source": "doc.pdf", "file_hash": "0" * 64}
+    for start in range(0, count, UPLOAD_BATCH):
+        batch = chunks.slice(start, start + UPLOAD_BATCH)
+        batch.vectors[:] = rng.random((len(batch), dimension), dtype=np.float32)
+        # Payloads only live until their batch is uploaded
+        payloads = batch.payloads({**common, "timestamp": str(datetime.now())})
+        del payloads
+    return [chunks]
+
+
+BUILDERS = {"legacy": build_legacy, "columnar": build_columnar}
+
+
+def measure(mode: str, count: int, chars: int, section_chunks: int, dimension: int) -> dict:
+    """Peak RSS of building one representation, run in this process."""
+    import numpy as np  # noqa: F401  imported before the baseline so it is not counted
+    import qdrant_client.models  # noqa: F401
+    import src.utils.chunk_batch  # noqa: F401
+
+    baseline = _rss_bytes()
+    held = BUILDERS[mode](count, chars, section_chunks, dimension)
+    peak = _peak_rss_bytes()
+    retained = _rss_bytes()
+    del held
+    scale = 10_000 / count
+    return {
+        "peak_rss_mb": round(peak / 1024 ** 2, 1),
+        "peak_increase_mb_per_10k": round((peak - baseline) * scale / 1024 ** 2, 1),
+        "retained_mb_per_10k": round((retained - baseline) * scale / 1024 ** 2, 1),
+    }
+
+
+def _run_isolated(mode: str, args) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.chunk_memory", "--_mode", mode, "--chunks", str(args.chunks),
+         "--chars", str(args.chars), "--section-chunks", str(args.section_chunks),
+         "--dimension", str(args.dimension)],
+        capture_output=True, text=True, check=True, cwd=os.getcwd(),
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare the memory of the legacy and columnar chunk representations")
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--chars", type=int, default=1500, help="Characters of text per chunk")
+    parser.add_argument("--section-chunks", type=int, default=8, help="Chunks per section sharing metadata")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSONL file to append results to")
+    parser.add_argument("--_mode", choices=list(BUILDERS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args._mode:
+        print(json.dumps(measure(args._mode, args.chunks, args.chars, args.section_chunks, args.dimension)))
+        return
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "chunks": args.chunks,
+        "chars": args.chars,
+        "section_chunks": args.section_chunks,
+        "dimension": args.dimension,
+    }
+    for mode in BUILDERS:
+        record[mode] = _run_isolated(mode, args)
+    legacy, columnar = record["legacy"]["peak_increase_mb_per_10k"], record["columnar"]["peak_increase_mb_per_10k"]
+    record["reduction"] = round(1 - columnar / legacy, 3) if legacy else 0.0
+
+    print(f"{args.chunks} chunks of {args.chars} characters, {args.dimension}-dimensional vectors")
+    for mode in BUILDERS:
+        stats = record[mode]
+        print(f"  {mode:<9} peak +{stats['peak_increase_mb_per_10k']:7.1f} MB per 10k chunks  "
+              f"retained {stats['retained_mb_per_10k']:7.1f} MB  (peak RSS {stats['peak_rss_mb']:.1f} MB)")
+    print(f"Peak memory reduction {record['reduction']:.1%}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Chunking benchmark.
+
+Compares the single-pass token-aware chunker (src/utils/chunker.py) with the
+previous two-stage splitter (`MarkdownHeaderTextSplitter` followed by
+`RecursiveCharacterTextSplitter` at 2000 characters with 50 overlap) on a
+corpus of Markdown files and PDFs, and reports per splitter:
+- seconds and MB/second over the corpus (median of `--repeat` runs)
+- chunk count, and the reduction of the token chunker against the old splitter
+- mean and max estimated tokens per chunk, and chunks over the token budget
+
+PDFs are turned into Markdown with the pypdf extraction of the page triage
+(every page, headings from font sizes), so no Docling install is needed.
+
+Usage:
+    python -m benchmarks.chunking --corpus path/to/docs
+    python -m benchmarks.chunking --corpus path/to/docs --chunk-tokens 384 --repeat 5
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.cold_start import _git_commit
+from src.utils.chunker import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, MarkdownChunker, estimate_tokens
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "chunking.jsonl")
+
+
+def load_corpus(corpus: str) -> Dict[str, str]:
+    """Markdown of every .md and .pdf file under `corpus`, keyed by path."""
+    from src.utils import pdf_triage
+
+    documents = {}
+    for path in sorted(glob.glob(os.path.join(corpus, "**", "*"), recursive=True)):
+        if path.endswith(".md"):
+            with open(path, encoding="utf-8") as f:
+                documents[path] = f.read()
+        elif path.endswith(".pdf"):
+            pages, triage = pdf_triage.triage_pdf(path)
+            body_size = pdf_triage.body_font_size(triage)
+            documents[path] = "\n\n".join(
+                pdf_triage.lines_to_markdown(pdf_triage.extract_lines(page), body_size) for page in pages
+            )
+    return documents
+
+
+def legacy_splitter(chunk_size: int = 2000, chunk_overlap: int = 50) -> Callable[[str], List[str]]:
+    from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+
+    md_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=[("#", "Header_1"), ("##", "Header_2")])
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return lambda markdown: [doc.page_content for doc in text_splitter.split_documents(md_splitter.split_text(markdown))]
+
+
+def token_splitter(chunk_tokens: int, chunk_overlap: int) -> Callable[[str], List[str]]:
+    chunker = MarkdownChunker(chunk_tokens, chunk_overlap)
+    return lambda markdown: [chunk["text"] for chunk in chunker.iter_chunks(markdown)]
+
+
+def measure(split: Callable[[str], List[str]], documents: Dict[str, str], repeat: int, budget: int) -> dict:
+    """Time `split` over all documents and describe the chunks it produced."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = [chunk for markdown in documents.values() for chunk in split(markdown)]
+        samples.append(time.perf_counter() - start)
+    seconds = statistics.median(samples)
+    megabytes = sum(len(markdown.encode("utf-8")) for markdown in documents.values()) / 1024 ** 2
+    tokens = [estimate_tokens(chunk) for chunk in chunks]
+    return {
+        "seconds": round(seconds, 4),
+        "mb_per_second": round(megabytes / seconds, 2) if seconds else 0.0,
+        "chunks": len(chunks),
+        "mean_tokens": round(statistics.mean(tokens), 1) if tokens else 0.0,
+        "max_tokens": max(tokens, default=0),
+        "over_budget": sum(1 for count in tokens if count > budget),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare the token chunker with the two-stage splitter")
+    parser.add_argument("--corpus", required=True, help="Directory of Markdown and PDF files")
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_TOKENS)
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per splitter")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSONL file to append results to")
+    args = parser.parse_args(argv)
+
+    documents = load_corpus(args.corpus)
+    if not documents:
+        parser.error(f"No Markdown or PDF files found in {args.corpus}")
+
+    legacy = measure(legacy_splitter(), documents, args.repeat, args.chunk_tokens)
+    tokens = measure(token_splitter(args.chunk_tokens, args.chunk_overlap), documents, args.repeat,
+                     args.chunk_tokens)
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "corpus": {"files": len(documents), "chars": sum(len(markdown) for markdown in documents.values())},
+        "chunk_tokens": args.chunk_tokens,
+        "chunk_overlap": args.chunk_overlap,
+        "legacy": legacy,
+        "tokens": tokens,
+        "chunk_reduction": round(1 - tokens["chunks"] / legacy["chunks"], 3) if legacy["chunks"] else 0.0,
+        "speedup": round(legacy["seconds"] / tokens["seconds"], 2) if tokens["seconds"] else 0.0,
+    }
+
+    print(f"Corpus: {len(documents)} files, {record['corpus']['chars']} characters")
+    for name in ("legacy", "tokens"):
+        stats = record[name]
+        print(f"  {name:<7} {stats['seconds']:7.3f}s  {stats['mb_per_second']:7.2f} MB/s  "
+              f"{stats['chunks']:5d} chunks  mean {stats['mean_tokens']:6.1f} tokens  "
+              f"max {stats['max_tokens']:5d}  over budget {stats['over_budget']}")
+    print(f"Chunk reduction {record['chunk_reduction']:.1%}, speed-up {record['speedup']:.2f}x")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Cold-start benchmark.
+
+Measures, each in a fresh interpreter:
+- import: wall-clock time to import each entry-point module
+- warm_up: time of each warm-up step (see src/utils/warmup.py)
+- first_query (with --query): latency of the first and second graph run,
+  with and without a warm-up beforehand
+
+Results are printed and appended as one JSON line per run to --output, so the
+numbers can be tracked across commits.
+
+Usage:
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --repeat 5 --query "What's the weather in Paris?"
+    RAG_CASSETTE_MODE=replay python -m benchmarks.cold_start --query "What are RAG?"
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+ENTRY_MODULES = [
+    "app",
+    "src.service.server",
+    "src.graphs.builder",
+    "src.utils.retriever",
+    "src.utils.ingest_pdf_docling_genaiembeddings",
+]
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "cold_start.jsonl")
+
+IMPORT_SNIPPET = """
+import time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+WARM_UP_SNIPPET = """
+import json, time, warnings
+warnings.simplefilter("ignore")
+from src.utils.warmup import run_warm_up
+start = time.perf_counter()
+steps = run_warm_up(include_ingestion={include_ingestion})
+print(json.dumps({{"total": time.perf_counter() - start, "steps": steps}}))
+"""
+
+FIRST_QUERY_SNIPPET = """
+import json, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+from src.graphs.builder import build_graph
+from src.graphs.type import RAGAgentState, initial_state
+imported = time.perf_counter() - start
+warm_up = 0.0
+if {warm}:
+    from src.utils.warmup import run_warm_up
+    t = time.perf_counter()
+    run_warm_up()
+    warm_up = time.perf_counter() - t
+graph = build_graph(RAGAgentState)
+latencies = []
+for _ in range(2):
+    t = time.perf_counter()
+    graph.invoke(initial_state({query!r}))
+    latencies.append(time.perf_counter() - t)
+print(json.dumps({{"import": imported, "warm_up": warm_up, "first": latencies[0], "second": latencies[1]}}))
+"""
+
+
+def _run(snippet: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", snippet], capture_output=True, text=True, check=True, cwd=os.getcwd()
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def measure_imports(modules: Sequence[str], repeat: int) -> dict:
+    """Median and min import time of each module over `repeat` fresh interpreters."""
+    results = {}
+    for module in modules:
+        try:
+            samples = [float(_run(IMPORT_SNIPPET.format(module=module))) for _ in range(repeat)]
+            results[module] = {"median_s": round(statistics.median(samples), 4), "min_s": round(min(samples), 4)}
+        except subprocess.CalledProcessError as e:
+            results[module] = {"error": e.stderr.strip().splitlines()[-1] if e.stderr else str(e)}
+    return results
+
+
+def measure_warm_up(include_ingestion: bool) -> dict:
+    return json.loads(_run(WARM_UP_SNIPPET.format(include_ingestion=include_ingestion)))
+
+
+def measure_first_query(query: str, warm: bool) -> dict:
+    return json.loads(_run(FIRST_QUERY_SNIPPET.format(query=query, warm=warm)))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure import time and warm-up cost")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module")
+    parser.add_argument("--modules", nargs="*", default=ENTRY_MODULES)
+    parser.add_argument("--include-ingestion", action="store_true", help="Include Docling in the warm-up phase")
+    parser.add_argument("--query", default=None, help="Also time the first and second graph run for this query")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSONL file to append results to")
+    args = parser.parse_args(argv)
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "import": measure_imports(args.modules, args.repeat),
+        "warm_up": measure_warm_up(args.include_ingestion),
+    }
+    if args.query:
+        record["first_query"] = {
+            "cold": measure_first_query(args.query, warm=False),
+            "warm": measure_first_query(args.query, warm=True),
+        }
+
+    print("Import time (fresh interpreter):")
+    for module, stats in record["import"].items():
+        if "error" in stats:
+            print(f"  {module:<50} error: {stats['error']}")
+        else:
+            print(f"  {module:<50} median {stats['median_s']:.3f}s  min {stats['min_s']:.3f}s")
+    print(f"Warm-up: {record['warm_up']['total']:.3f}s")
+    for step, stats in record["warm_up"]["steps"].items():
+        suffix = f"  ({stats['error']})" if stats["error"] else ""
+        print(f"  {step:<50} {stats['seconds']:.3f}s{suffix}")
+    for label, stats in record.get("first_query", {}).items():
+        print(f"First query ({label}): import {stats['import']:.3f}s, warm-up {stats['warm_up']:.3f}s, "
+              f"first {stats['first']:.3f}s, second {stats['second']:.3f}s")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Docling profile benchmark.
+
+Converts every PDF of a corpus directory with each conversion profile (see
+src/utils/docling_profiles.py) and reports per profile:
+- seconds and pages/second of the conversion (page triage included)
+- pages converted by Docling and by pypdf
+- tables and pictures found in the Docling document structure
+- characters of Markdown produced
+
+and, once for the corpus, how page triage splits its pages between pypdf and
+Docling (by triage reason), which the profiles' Docling settings apply to.
+
+Conversions bypass the conversion cache, so every run converts from scratch. Each
+profile is measured `--repeat` times and the median is reported. Results are
+printed and appended as one JSON line per run to --output, so the numbers can
+be tracked across commits and machines. Conversions need the usual ingestion
+settings (QDRANT_API_KEY) and Docling's models, which are downloaded from the
+Hugging Face Hub on first use.
+
+Usage:
+    python -m benchmarks.docling_profiles --corpus data/sample_pdfs
+    python -m benchmarks.docling_profiles --corpus data/sample_pdfs --profiles fast accurate --no-triage
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from benchmarks.cold_start import _git_commit
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "docling_profiles.jsonl")
+
+
+def convert_corpus(paths: List[str], profile: str, page_triage: bool) -> dict:
+    """Convert all files once with a profile and collect timing and structure counts."""
+    from src.utils.ingest_pdf_docling_genaiembeddings import IngestPDF
+
+    ingest = IngestPDF(page_triage=page_triage, profile=profile)
+    tables = pictures = chars = 0
+    start = time.perf_counter()
+    for path in paths:
+        markdown, structure = ingest.convert_pages(path, profile=profile)
+        chars += len(markdown)
+        for run in structure["docling_runs"]:
+            document = run["document"] or {}
+            tables += len(document.get("tables", []))
+            pictures += len(document.get("pictures", []))
+    seconds = time.perf_counter() - start
+    pages = ingest.conversion_stats["fast_pages"] + ingest.conversion_stats["docling_pages"]
+    return {
+        "seconds": seconds,
+        "pages": pages,
+        "docling_pages": ingest.conversion_stats["docling_pages"],
+        "fast_pages": ingest.conversion_stats["fast_pages"],
+        "tables": tables,
+        "pictures": pictures,
+        "markdown_chars": chars,
+    }
+
+
+def triage_corpus(paths: List[str]) -> dict:
+    """Pages of the corpus per triage route and reason, and the seconds triage took."""
+    from src.utils import pdf_triage
+
+    routes, reasons = Counter(), Counter()
+    start = time.perf_counter()
+    for path in paths:
+        _, pages = pdf_triage.triage_pdf(path)
+        routes.update(page.route for page in pages)
+        reasons.update(f"{page.route}:{page.reason}" for page in pages)
+    return {
+        "pages": sum(routes.values()),
+        "routes": dict(routes),
+        "reasons": dict(sorted(reasons.items())),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def measure_profile(paths: List[str], profile: str, page_triage: bool, repeat: int) -> dict:
+    """Median conversion time of the corpus over `repeat` runs, with the counts of the last run."""
+    try:
+        runs = [convert_corpus(paths, profile, page_triage) for _ in range(repeat)]
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    result = dict(runs[-1])
+    result["seconds"] = round(statistics.median(run["seconds"] for run in runs), 3)
+    result["pages_per_second"] = round(result["pages"] / result["seconds"], 2) if result["seconds"] else 0.0
+    return result
+
+
+def main(argv: Optional[List[str]] = None):
+    from src.utils import docling_shards
+    from src.utils.docling_profiles import PROFILES
+
+    parser = argparse.ArgumentParser(description="Compare Docling conversion profiles on a PDF corpus")
+    parser.add_argument("--corpus", required=True, help="Directory of PDF files")
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES))
+    parser.add_argument("--repeat", type=int, default=1, help="Conversions of the corpus per profile")
+    parser.add_argument("--no-triage", action="store_true", help="Send every page to Docling")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSONL file to append results to")
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(os.path.join(args.corpus, "**", "*.pdf"), recursive=True))
+    if not paths:
+        parser.error(f"No PDF files found in {args.corpus}")
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "corpus": {"files": len(paths), "bytes": sum(os.path.getsize(path) for path in paths)},
+        "page_triage": not args.no_triage,
+        "workers": docling_shards.CONVERT_WORKERS,
+        "cpu_count": os.cpu_count(),
+        "triage": triage_corpus(paths),
+        "profiles": {},
+    }
+    try:
+        for profile in args.profiles:
+            record["profiles"][profile] = {
+                "settings": PROFILES[profile].to_dict(),
+                **measure_profile(paths, profile, not args.no_triage, args.repeat),
+            }
+    finally:
+        docling_shards.shutdown()
+
+    triage = record["triage"]
+    print(f"Corpus: {len(paths)} files, {triage['pages']} pages, page triage {'on' if record['page_triage'] else 'off'}")
+    print(f"  triage   {triage['seconds']:.2f}s  " + "  ".join(f"{reason} {count}"
+                                                         for reason, count in triage["reasons"].items()))
+    for profile, stats in record["profiles"].items():
+        if "error" in stats:
+            print(f"  {profile:<10} error: {stats['error']}")
+        else:
+            print(f"  {profile:<10} {stats['seconds']:8.2f}s  {stats['pages_per_second']:7.2f} pages/s  "
+                  f"docling pages {stats['docling_pages']:4d}  tables {stats['tables']:3d}  "
+                  f"pictures {stats['pictures']:3d}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
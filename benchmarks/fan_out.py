@@ -0,0 +1,127 @@
+"""
+Multi-intent fan-out benchmark.
+
+Runs weather questions that also ask about the documents ("What's the weather
+in Paris and what does the manual say about cold starts?") through the graph,
+which routes them to the weather and retriever nodes concurrently, and
+reports per query:
+- end-to-end latency
+- the time spent in each branch
+- the latency of running the branches one after the other (routing plus the
+  sum of the branches) against the fan-out's critical path (routing plus the
+  slower branch)
+
+Queries run one at a time so the latencies are not skewed by queueing. By
+default the providers are simulated with the latency profile of
+benchmarks/offline.py; `--live` runs the real nodes against the configured
+Gemini, Qdrant and OpenWeather APIs. Results are appended as one JSON line per
+run to --output.
+
+Usage:
+    python -m benchmarks.fan_out
+    python -m benchmarks.fan_out --requests 50 --latency-scale 0.1
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+from src.graphs.builder import build_graph
+from src.graphs.nodes.retriever_node import retriever_node
+from src.graphs.nodes.routing_node import routing_node
+from src.graphs.nodes.weather_node import weather_node
+from src.graphs.type import RAGAgentState, initial_state
+from benchmarks.cold_start import _git_commit
+from benchmarks.load_test import _latency_stats
+from benchmarks.offline import OfflineProviders, offline_nodes
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "fan_out.jsonl")
+
+MIXED_QUERIES = [
+    "What does the manual say about cold starts, and what's the weather in Oslo?",
+    "Summarize the report's safety section and tell me the weather in London",
+    "What are the main findings of the paper, and what's the temperature in Paris?",
+    "What does the document recommend for wet conditions, and is it raining in Tokyo?",
+]
+
+
+def _timed(name: str, node: Callable, timings: Dict[str, float], lock: threading.Lock) -> Callable:
+    def timed_node(state):
+        start = time.perf_counter()
+        try:
+            return node(state)
+        finally:
+            with lock:
+                timings[name] = time.perf_counter() - start
+
+    return timed_node
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure the latency of multi-intent queries run as parallel branches")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--live", action="store_true", help="Use the live APIs instead of simulated providers")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Scale offline latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSONL file to append results to")
+    args = parser.parse_args(argv)
+
+    if args.live:
+        nodes = {"routing": routing_node, "weather": weather_node, "retriever": retriever_node}
+    else:
+        nodes = offline_nodes(OfflineProviders(scale=args.latency_scale, seed=args.seed))
+    timings: Dict[str, float] = {}
+    lock = threading.Lock()
+    graph = build_graph(
+        RAGAgentState, nodes={name: _timed(name, node, timings, lock) for name, node in nodes.items()},
+        speculative=False,
+    )
+
+    rng = random.Random(args.seed)
+    latencies: Dict[str, List[float]] = {"end_to_end": [], "weather": [], "retriever": [],
+                                         "sequential": [], "critical_path": []}
+    fanned_out = 0
+    for _ in range(args.requests):
+        timings.clear()
+        start = time.perf_counter()
+        state = graph.invoke(initial_state(rng.choice(MIXED_QUERIES)))
+        latencies["end_to_end"].append(time.perf_counter() - start)
+        if state["status"] != "MergeNodeCompleted":
+            continue
+        fanned_out += 1
+        latencies["weather"].append(timings["weather"])
+        latencies["retriever"].append(timings["retriever"])
+        latencies["sequential"].append(timings["routing"] + timings["weather"] + timings["retriever"])
+        latencies["critical_path"].append(timings["routing"] + max(timings["weather"], timings["retriever"]))
+
+    summary = {name: _latency_stats(values) for name, values in latencies.items()}
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "live": args.live,
+        "requests": args.requests,
+        "latency_scale": args.latency_scale,
+        "fanned_out": fanned_out,
+        "latency_s": summary,
+    }
+    sequential, end_to_end = summary["sequential"]["mean"], summary["end_to_end"]["mean"]
+    record["mean_latency_reduction_vs_sequential"] = round(1 - end_to_end / sequential, 3) if sequential else 0.0
+
+    print(f"{args.requests} multi-intent queries, {'live' if args.live else 'offline'} providers, "
+          f"{fanned_out} fanned out to both branches")
+    for name, stats in summary.items():
+        print(f"  {name:<13} mean {stats['mean']:.3f}s  p50 {stats['p50']:.3f}s  p95 {stats['p95']:.3f}s")
+    print(f"  mean latency -{record['mean_latency_reduction_vs_sequential']:.1%} against running the branches in turn")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
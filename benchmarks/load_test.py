@@ -0,0 +1,335 @@
+"""
+Load-testing driver for the compiled RAG graph.
+
+Replays a weighted mix of weather and document queries against the graph and
+reports latency percentiles, error rates and throughput, overall and per node.
+
+Two load models are supported:
+- closed loop: a fixed number of concurrent users, each sending its next query
+  as soon as the previous one returns (`--concurrency`).
+- open loop: queries arrive as a Poisson process at a target rate (`--qps`),
+  independent of how fast the graph answers. Latency is measured from the
+  scheduled arrival time, so queueing delay is not hidden.
+
+Usage:
+    python -m benchmarks.load_test --mode closed --concurrency 8 --requests 200
+    python -m benchmarks.load_test --mode open --qps 5 --duration 60
+    python -m benchmarks.load_test --offline --sweep 1,2,4,8,16,32 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.graphs.builder import build_graph
+from src.graphs.type import RAGAgentState, initial_state
+from benchmarks.offline import OfflineProviders, offline_nodes
+
+DEFAULT_QUERY_MIX = os.path.join(os.path.dirname(__file__), "query_mix.json")
+
+# The nodes flatten provider failures into answer strings, so these prefixes
+# are counted as errors alongside raised exceptions.
+ERROR_PREFIXES = (
+    "Unexpected error:",
+    "Error getting weather data:",
+    "Error parsing JSON response",
+    "Couldn't determine location",
+)
+
+# A sweep step counts as saturated once throughput grows by less than this.
+SATURATION_GAIN = 0.10
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Linearly interpolated percentile of `values` (pct in [0, 100])."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class QueryMix:
+    """Weighted sampler over categories of queries."""
+
+    def __init__(self, mix: Dict[str, dict], seed: Optional[int] = None):
+        if not mix:
+            raise ValueError("Query mix must contain at least one category")
+        self.categories = list(mix)
+        self.weights = [mix[c].get("weight", 1.0) for c in self.categories]
+        self.queries = {c: mix[c]["queries"] for c in self.categories}
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_file(cls, path: str, seed: Optional[int] = None) -> "QueryMix":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), seed=seed)
+
+    def sample(self) -> Tuple[str, str]:
+        """Return a random (category, query) pair."""
+        category = self._random.choices(self.categories, weights=self.weights)[0]
+        return category, self._random.choice(self.queries[category])
+
+
+@dataclass
+class RequestResult:
+    category: str
+    latency: float
+    node_latencies: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadTestReport:
+    mode: str
+    level: float
+    wall_time: float
+    results: List[RequestResult]
+
+    def summary(self) -> dict:
+        """Aggregate the per-request results into a JSON-serializable dict."""
+        latencies = [r.latency for r in self.results if r.error is None]
+        errors: Dict[str, int] = {}
+        for r in self.results:
+            if r.error is not None:
+                errors[r.error] = errors.get(r.error, 0) + 1
+
+        nodes: Dict[str, List[float]] = {}
+        for r in self.results:
+            for node, seconds in r.node_latencies.items():
+                nodes.setdefault(node, []).append(seconds)
+
+        categories: Dict[str, List[float]] = {}
+        for r in self.results:
+            if r.error is None:
+                categories.setdefault(r.category, []).append(r.latency)
+
+        total = len(self.results)
+        return {
+            "mode": self.mode,
+            "level": self.level,
+            "requests": total,
+            "wall_time_s": round(self.wall_time, 3),
+            "throughput_rps": round(len(latencies) / self.wall_time, 3) if self.wall_time else 0.0,
+            "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+            "errors": errors,
+            "latency_s": _latency_stats(latencies),
+            "categories": {c: _latency_stats(v) for c, v in categories.items()},
+            "nodes": {
+                node: dict(_latency_stats(v), throughput_rps=round(len(v) / self.wall_time, 3))
+                for node, v in nodes.items()
+            },
+        }
+
+    def format(self) -> str:
+        """Render the summary as a plain-text table."""
+        s = self.summary()
+        lat = s["latency_s"]
+        lines = [
+            f"{s['mode']} loop @ {s['level']:g}: {s['requests']} requests in {s['wall_time_s']:.1f}s",
+            f"  throughput {s['throughput_rps']:.2f} req/s, error rate {s['error_rate']:.2%}",
+            f"  latency p50 {lat['p50']:.3f}s  p95 {lat['p95']:.3f}s  p99 {lat['p99']:.3f}s  max {lat['max']:.3f}s",
+        ]
+        for error, count in s["errors"].items():
+            lines.append(f"  error {error!r}: {count}")
+        for category, stats in s["categories"].items():
+            lines.append(f"  [{category}] n={stats['count']} p50 {stats['p50']:.3f}s p95 {stats['p95']:.3f}s")
+        for node, stats in s["nodes"].items():
+            lines.append(
+                f"  node {node:<10} n={stats['count']:<5} {stats['throughput_rps']:.2f}/s "
+                f"p50 {stats['p50']:.3f}s p95 {stats['p95']:.3f}s p99 {stats['p99']:.3f}s"
+            )
+        return "\n".join(lines)
+
+
+def _latency_stats(values: Sequence[float]) -> dict:
+    if not values:
+        return {"count": 0, "mean": float("nan"), "p50": float("nan"), "p95": float("nan"),
+                "p99": float("nan"), "max": float("nan")}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+class LoadTester:
+    """Drives concurrent queries through a compiled graph."""
+
+    def __init__(self, graph, query_mix: QueryMix, workers: int = 64):
+        """
+        Args:
+            graph: Compiled graph (see `build_graph`)
+            query_mix: Sampler for the queries to replay
+            workers: Size of the thread pool the synchronous nodes run on. Must be
+                at least the target concurrency, or the pool becomes the bottleneck.
+        """
+        self.graph = graph
+        self.query_mix = query_mix
+        self.workers = workers
+
+    async def _run_one(self, category: str, query: str, started: float) -> RequestResult:
+        node_latencies = {}
+        last = time.perf_counter()
+        answer = ""
+        try:
+            async for update in self.graph.astream(initial_state(query), stream_mode="updates"):
+                now = time.perf_counter()
+                for node, node_state in update.items():
+                    node_latencies[node] = now - last
+                    if node_state and node_state.get("answer"):
+                        answer = node_state["answer"]
+                last = now
+        except Exception as e:
+            return RequestResult(category, time.perf_counter() - started, node_latencies, type(e).__name__)
+
+        error = next((p.rstrip(":") for p in ERROR_PREFIXES if answer.startswith(p)), None)
+        return RequestResult(category, time.perf_counter() - started, node_latencies, error)
+
+    def _install_executor(self):
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=self.workers))
+
+    async def run_closed(self, concurrency: int, requests: Optional[int] = None,
+                         duration: Optional[float] = None) -> LoadTestReport:
+        """
+        Run `concurrency` users back to back until `requests` have been sent or
+        `duration` seconds have elapsed.
+        """
+        if requests is None and duration is None:
+            raise ValueError("Either requests or duration must be set")
+        self._install_executor()
+        results: List[RequestResult] = []
+        sent = 0
+        start = time.perf_counter()
+
+        async def user():
+            nonlocal sent
+            while True:
+                if requests is not None and sent >= requests:
+                    return
+                if duration is not None and time.perf_counter() - start >= duration:
+                    return
+                sent += 1
+                category, query = self.query_mix.sample()
+                results.append(await self._run_one(category, query, time.perf_counter()))
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        return LoadTestReport("closed", concurrency, time.perf_counter() - start, results)
+
+    async def run_open(self, qps: float, requests: Optional[int] = None, duration: Optional[float] = None,
+                       max_in_flight: int = 1000, seed: Optional[int] = None) -> LoadTestReport:
+        """
+        Send queries as a Poisson process with mean rate `qps`. Arrivals that find
+        `max_in_flight` requests outstanding are recorded as "Overloaded" errors.
+        """
+        if requests is None and duration is None:
+            raise ValueError("Either requests or duration must be set")
+        self._install_executor()
+        arrivals = random.Random(seed)
+        results: List[RequestResult] = []
+        tasks = set()
+        start = time.perf_counter()
+        next_arrival = start
+        sent = 0
+
+        while True:
+            if requests is not None and sent >= requests:
+                break
+            if duration is not None and next_arrival - start >= duration:
+                break
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            sent += 1
+            category, query = self.query_mix.sample()
+            if len(tasks) >= max_in_flight:
+                results.append(RequestResult(category, 0.0, error="Overloaded"))
+            else:
+                task = asyncio.create_task(self._run_one(category, query, next_arrival))
+                task.add_done_callback(lambda t: (tasks.discard(t), results.append(t.result())))
+                tasks.add(task)
+            next_arrival += arrivals.expovariate(qps)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        return LoadTestReport("open", qps, time.perf_counter() - start, results)
+
+
+def find_saturation(reports: Sequence[LoadTestReport]) -> Optional[LoadTestReport]:
+    """
+    Return the first sweep step after which adding load no longer buys at least
+    `SATURATION_GAIN` more throughput, or None if throughput kept scaling.
+    """
+    for previous, current in zip(reports, reports[1:]):
+        before = previous.summary()["throughput_rps"]
+        after = current.summary()["throughput_rps"]
+        if before and (after - before) / before < SATURATION_GAIN:
+            return previous
+    return None
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Load-test the compiled RAG graph")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent users (closed loop)")
+    parser.add_argument("--qps", type=float, default=2.0, help="Target arrival rate (open loop)")
+    parser.add_argument("--sweep", type=str, default=None,
+                        help="Comma-separated concurrency (closed) or QPS (open) levels to step through")
+    parser.add_argument("--requests", type=int, default=None, help="Requests per level")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds per level")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="Thread pool size for graph nodes")
+    parser.add_argument("--query-mix", type=str, default=DEFAULT_QUERY_MIX)
+    parser.add_argument("--offline", action="store_true", help="Use simulated providers instead of live APIs")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Scale offline latencies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Offline provider failure rate")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Print JSON summaries")
+    args = parser.parse_args(argv)
+
+    if args.requests is None and args.duration is None:
+        args.requests = 100
+
+    default_level = args.concurrency if args.mode == "closed" else args.qps
+    levels = [float(x) for x in args.sweep.split(",")] if args.sweep else [default_level]
+
+    nodes = None
+    if args.offline:
+        nodes = offline_nodes(OfflineProviders(scale=args.latency_scale, error_rate=args.error_rate, seed=args.seed))
+    graph = build_graph(RAGAgentState, nodes=nodes)
+
+    workers = args.workers or max(64, int(max(levels)) * 2)
+    tester = LoadTester(graph, QueryMix.from_file(args.query_mix, seed=args.seed), workers=workers)
+
+    reports = []
+    for level in levels:
+        if args.mode == "closed":
+            run = tester.run_closed(int(level), requests=args.requests, duration=args.duration)
+        else:
+            run = tester.run_open(level, requests=args.requests, duration=args.duration,
+                                  max_in_flight=args.max_in_flight, seed=args.seed)
+        report = asyncio.run(run)
+        reports.append(report)
+        print(json.dumps(report.summary()) if args.json else report.format())
+
+    if len(reports) > 1:
+        knee = find_saturation(reports)
+        if knee is None:
+            print("\nThroughput still scaling at the highest level; no saturation point reached.")
+        else:
+            print(f"\nSaturation at {knee.mode} loop level {knee.level:g} "
+                  f"({knee.summary()['throughput_rps']:.2f} req/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Offline stand-ins for the graph nodes.
+
+The stand-ins keep the same state contract as the real nodes but replace the
+Gemini, Qdrant and OpenWeather calls with sleeps drawn from a latency profile,
+so the graph can be exercised without API keys or network access.
+"""
+import random
+import re
+import time
+from typing import Callable, Dict, Optional
+
+from src.graphs.speculative import Prefetcher, take_prefetched
+from src.graphs.type import RAGAgentState
+
+# Median latency (seconds) of each external call made by the real nodes.
+DEFAULT_LATENCIES = {
+    "classify": 0.45,   # Gemini routing classification
+    "geocode": 0.12,    # OpenWeather geocoding
+    "weather": 0.15,    # OpenWeather current weather
+    "embed": 0.15,      # Gemini query embedding
+    "search": 0.06,     # Qdrant similarity search
+    "generate": 1.50,   # Gemini answer generation
+}
+
+WEATHER_KEYWORDS = ("weather", "temperature", "forecast", "rain", "raining", "snow", "sunny", "humid", "wind")
+DOCUMENT_KEYWORDS = ("document", "manual", "report", "paper", "study", "authors")
+LOCATION_PATTERN = re.compile(r"\b(?:in|at|for)\s+([A-Z][\w\s]*?)(?:\s+(?:today|tomorrow|now|right now))?[?.!]*$")
+
+
+class OfflineProviders:
+    """Simulated external providers with log-normal latency."""
+
+    def __init__(self, latencies: Optional[Dict[str, float]] = None, scale: float = 1.0,
+                 jitter: float = 0.25, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latencies = dict(DEFAULT_LATENCIES)
+        self.latencies.update(latencies or {})
+        self.scale = scale
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def call(self, name: str):
+        """Block for one simulated call to the named provider."""
+        median = self.latencies[name] * self.scale
+        time.sleep(median * self._random.lognormvariate(0, self.jitter))
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise RuntimeError(f"Simulated {name} failure")
+
+    def classify(self, query: str):
+        """Keyword-based stand-in for the Gemini weather classification."""
+        self.call("classify")
+        is_weather = any(word in query.lower() for word in WEATHER_KEYWORDS)
+        match = LOCATION_PATTERN.search(query.strip())
+        location = match.group(1).strip() if is_weather and match else None
+        return is_weather, location
+
+
+def offline_nodes(providers: Optional[OfflineProviders] = None) -> Dict[str, Callable]:
+    """
+    Build stand-in node functions for `build_graph(..., nodes=...)`.
+
+    Args:
+        providers: Simulated providers to use. Defaults to `OfflineProviders()`.
+
+    Returns:
+        Dict mapping graph node names to stand-in node functions
+    """
+    providers = providers or OfflineProviders()
+
+    def routing_node(state: RAGAgentState) -> RAGAgentState:
+        state["is_weather_query"], state["location"] = providers.classify(state["query"])
+        # Weather questions that also mention the documents fan out to both branches
+        state["needs_documents"] = state["is_weather_query"] and any(
+            word in state["query"].lower() for word in DOCUMENT_KEYWORDS
+        )
+        state["status"] = "RoutingNodeCompleted"
+        return state
+
+    def weather_node(state: RAGAgentState) -> RAGAgentState:
+        if state["location"] is None or state["location"].strip() == "":
+            state["answer"] = "Couldn't determine location"
+            state["status"] = "WeatherNodeCompleted"
+            return state
+        try:
+            providers.call("geocode")
+            providers.call("weather")
+            state["answer"] = f"The weather in {state['location']} is clear sky with a temperature of 18.0°C."
+        except Exception as e:
+            state["answer"] = f"Error getting weather data: {str(e)}"
+        state["status"] = "WeatherNodeCompleted"
+        return state
+
+    def retriever_node(state: RAGAgentState) -> RAGAgentState:
+        try:
+            if take_prefetched(state.get("prefetch_id")) is None:
+                providers.call("embed")
+                providers.call("search")
+            providers.call("generate")
+            state["answer"] = f"Offline answer for: {state['query']}"
+        except Exception as e:
+            state["answer"] = f"Unexpected error: {str(e)}"
+        state["status"] = "RetrieverNodeCompleted"
+        return state
+
+    return {
+        "routing": routing_node,
+        "weather": weather_node,
+        "retriever": retriever_node,
+    }
+
+
+def offline_prefetcher(providers: Optional[OfflineProviders] = None, workers: int = 8) -> Prefetcher:
+    """
+    Build a prefetcher for `build_graph(..., speculative=True)` whose
+    retrievals are the simulated embedding and search calls.
+    """
+    providers = providers or OfflineProviders()
+
+    def retrieve(query: str, tenant: Optional[str]):
+        providers.call("embed")
+        providers.call("search")
+        return [{"page_content": f"Offline chunk for: {query}", "metadata": {}}]
+
+    return Prefetcher(retrieve, workers=workers)
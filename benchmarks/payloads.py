@@ -0,0 +1,111 @@
+"""
+Slim payload benchmark.
+
+Stores the same synthetic chunks as Qdrant points with full payloads
+(`page_content` and metadata) and with slim payloads (tenant and file hash,
+text in the local chunk store, src/utils/chunk_store.py), and reports:
+- payload bytes per point kept by Qdrant
+- bytes returned per search, and the chunk store's size on disk
+- search latency, including the chunk store lookup for slim points
+
+Runs against an in-memory Qdrant, so the latencies exclude the network time
+saved by smaller responses. Results are appended as one JSON line per run to
+--output.
+
+Usage:
+    python -m benchmarks.payloads
+    python -m benchmarks.payloads --points 20000 --searches 500
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Optional, Sequence
+
+from qdrant_client import QdrantClient, models
+
+from src.utils.chunk_store import ChunkStore, slim_payload
+from src.utils.tenancy import tenant_filter
+from benchmarks.cold_start import _git_commit
+from benchmarks.load_test import _latency_stats
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "payloads.jsonl")
+WORDS = ("engine", "cold", "start", "pressure", "valve", "manual", "safety", "operation", "sensor", "battery",
+         "temperature", "check", "before", "after", "the", "of", "and", "to", "with", "procedure")
+
+
+def _chunk(rng: random.Random, index: int) -> dict:
+    text = " ".join(rng.choice(WORDS) for _ in range(300))[:2000]
+    return {"page_content": text, "metadata": {"source": "manual.pdf", "file_hash": "f" * 64, "tenant_id": "acme",
+                                               "timestamp": "2026-10-19 12:00:00", "chunk_size": len(text),
+                                               "Header_1": f"Section {index // 20}"}}
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare full and slim Qdrant payloads")
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--k", type=int, default=7)
+    parser.add_argument("--dimension", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSONL file to append results to")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    chunks = [_chunk(rng, i) for i in range(args.points)]
+    vectors = [[rng.gauss(0, 1) for _ in range(args.dimension)] for _ in range(args.points)]
+    ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(args.points)]
+    queries = [[rng.gauss(0, 1) for _ in range(args.dimension)] for _ in range(args.searches)]
+    record = {"timestamp": datetime.now().isoformat(timespec="seconds"), "commit": _git_commit(),
+              "points": args.points, "searches": args.searches, "k": args.k}
+
+    with tempfile.TemporaryDirectory() as root:
+        store = ChunkStore("bench", root=root)
+        for mode in ("full", "slim"):
+            client = QdrantClient(":memory:")
+            client.create_collection("bench", vectors_config=models.VectorParams(
+                size=args.dimension, distance=models.Distance.COSINE))
+            if mode == "slim":
+                store.put_many(ids, chunks, "acme", "f" * 64)
+                payloads = [slim_payload("acme", "f" * 64)] * args.points
+            else:
+                payloads = chunks
+            client.upload_collection("bench", vectors=vectors, payload=payloads, ids=ids)
+
+            latencies, returned = [], 0
+            for query in queries:
+                start = time.perf_counter()
+                points = client.query_points("bench", query=query, query_filter=tenant_filter("acme"), limit=args.k,
+                                             with_payload=["page_content", "metadata"], with_vectors=False).points
+                if mode == "slim":
+                    store.get_many([point.id for point in points])
+                latencies.append(time.perf_counter() - start)
+                returned += sum(len(json.dumps(point.payload)) for point in points)
+            record[mode] = {
+                "payload_bytes_per_point": round(sum(len(json.dumps(p)) for p in payloads) / args.points, 1),
+                "returned_bytes_per_search": round(returned / args.searches, 1),
+                "latency_s": _latency_stats(latencies),
+            }
+        record["chunk_store"] = store.stats()
+        store.close()
+
+    print(f"{args.points} points, {args.searches} searches of k={args.k} (in-memory Qdrant)")
+    for mode in ("full", "slim"):
+        stats = record[mode]
+        print(f"  {mode:<4} payload {stats['payload_bytes_per_point']:.0f} B/point  "
+              f"returned {stats['returned_bytes_per_search']:.0f} B/search  "
+              f"latency mean {stats['latency_s']['mean'] * 1000:.2f}ms p95 {stats['latency_s']['p95'] * 1000:.2f}ms")
+    print(f"  chunk store {record['chunk_store']['bytes'] / args.points:.0f} B/chunk compressed")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
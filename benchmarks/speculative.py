@@ -0,0 +1,123 @@
+"""
+Speculative retrieval benchmark.
+
+Replays the same sampled query mix through the graph twice, once as usual and
+once with retrieval started concurrently with routing (src/graphs/speculative.py),
+and reports:
+- end-to-end latency per mode, overall and per query category
+- latency saved: retrieval time that overlapped routing on document queries
+- wasted work: retrievals started for queries routed to the weather node,
+  in seconds and in embedding/search calls, and the queries naming a weather
+  term that were not prefetched at all
+
+Queries run one at a time so the latencies are not skewed by queueing. By
+default the providers are simulated with the latency profile of
+benchmarks/offline.py; `--live` runs the real nodes against the configured
+Gemini, Qdrant and OpenWeather APIs; run it with RAG_ROUTER=llm, since
+`build_graph` does not speculate with the embedding router. Results are appended as one JSON line per
+run to --output.
+
+Usage:
+    python -m benchmarks.speculative
+    python -m benchmarks.speculative --requests 200 --latency-scale 0.1
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from src.graphs.builder import build_graph
+from src.graphs.intent_classifier import ROUTER
+from src.graphs.speculative import get_prefetcher
+from src.graphs.type import RAGAgentState, initial_state
+from benchmarks.cold_start import _git_commit
+from benchmarks.load_test import DEFAULT_QUERY_MIX, QueryMix, _latency_stats
+from benchmarks.offline import OfflineProviders, offline_nodes, offline_prefetcher
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "speculative.jsonl")
+
+
+def run_mode(graph, queries: Sequence[tuple]) -> Dict[str, List[float]]:
+    """Latencies of running the queries one after another, by category."""
+    latencies: Dict[str, List[float]] = {}
+    for category, query in queries:
+        start = time.perf_counter()
+        graph.invoke(initial_state(query))
+        latencies.setdefault(category, []).append(time.perf_counter() - start)
+    return latencies
+
+
+def _summary(latencies: Dict[str, List[float]]) -> dict:
+    return {
+        "latency_s": _latency_stats([x for values in latencies.values() for x in values]),
+        "categories": {category: _latency_stats(values) for category, values in latencies.items()},
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure latency saved and work wasted by speculative retrieval")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--query-mix", type=str, default=DEFAULT_QUERY_MIX)
+    parser.add_argument("--live", action="store_true", help="Use the live APIs instead of simulated providers")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Scale offline latencies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSONL file to append results to")
+    args = parser.parse_args(argv)
+
+    mix = QueryMix.from_file(args.query_mix, seed=args.seed)
+    queries = [mix.sample() for _ in range(args.requests)]
+
+    if args.live:
+        if ROUTER == "embedding":
+            parser.error("speculative retrieval is off with the embedding router; set RAG_ROUTER=llm")
+        nodes, prefetcher = None, get_prefetcher()
+    else:
+        providers = OfflineProviders(scale=args.latency_scale, seed=args.seed)
+        nodes, prefetcher = offline_nodes(providers), offline_prefetcher(providers)
+
+    baseline = run_mode(build_graph(RAGAgentState, nodes=nodes, speculative=False), queries)
+    speculative = run_mode(
+        build_graph(RAGAgentState, nodes=nodes, speculative=True, prefetcher=prefetcher), queries
+    )
+    # Discarded prefetches still running are counted once they finish
+    prefetcher.shutdown(wait=True)
+    stats = prefetcher.stats()
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "live": args.live,
+        "requests": args.requests,
+        "latency_scale": args.latency_scale,
+        "baseline": _summary(baseline),
+        "speculative": _summary(speculative),
+        "prefetch": stats,
+        "saved_s_per_document_query": round(stats["saved_seconds"] / stats["used"], 4) if stats["used"] else 0.0,
+        # Each discarded prefetch spent one embedding and one search call
+        "wasted_calls": {"embed": stats["discarded"], "search": stats["discarded"]},
+    }
+    before, after = record["baseline"]["latency_s"]["mean"], record["speculative"]["latency_s"]["mean"]
+    record["mean_latency_reduction"] = round(1 - after / before, 3) if before else 0.0
+
+    print(f"{args.requests} queries, {'live' if args.live else 'offline'} providers")
+    for mode in ("baseline", "speculative"):
+        lat = record[mode]["latency_s"]
+        print(f"  {mode:<11} mean {lat['mean']:.3f}s  p50 {lat['p50']:.3f}s  p95 {lat['p95']:.3f}s")
+        for category, cat in record[mode]["categories"].items():
+            print(f"    [{category}] n={cat['count']} mean {cat['mean']:.3f}s p95 {cat['p95']:.3f}s")
+    print(f"  saved  {stats['saved_seconds']:.2f}s over {stats['used']} document queries "
+          f"({record['saved_s_per_document_query']:.3f}s each), mean latency -{record['mean_latency_reduction']:.1%}")
+    print(f"  wasted {stats['wasted_seconds']:.2f}s on {stats['discarded']} discarded prefetches "
+          f"({stats['cancelled']} cancelled before starting, {stats['failed']} failed), "
+          f"{stats['skipped']} weather queries not prefetched")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
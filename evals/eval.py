@@ -2,134 +2,235 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langsmith import Client
 from evals import prompts, grader
 from src.utils.retriever import Retriever
-from langsmith.evaluation import aevaluate, evaluate
+from src.utils.cassette import configure_cassette
+from src.utils.llm_cache import get_llm_cache
+from langsmith.evaluation import aevaluate
 from src.graphs.builder import build_graph
-from src.graphs.type import RAGAgentState
+from src.graphs.type import RAGAgentState, initial_state
+from datetime import datetime
+from typing import Optional
+import argparse
 import asyncio
+import json
+import os
+import time
+
+GRADER_MODEL = "gemini-2.0-flash-lite"
+DEFAULT_DATASET_PATH = os.path.join(os.path.dirname(__file__), "datasets", "rag_eval.jsonl")
+RESULTS_DIR = os.path.join(".eval_cache", "results")
+
+
+def _doc_string(documents: list) -> str:
+    return "\n\n".join(doc['page_content'] for doc in documents)
+
+
+def load_local_dataset(path: str) -> list:
+    """Load examples from a JSONL file of {"inputs": {...}, "outputs": {...}} lines"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
 
 class Eval:
-    def __init__(self, dataset_name: str = "assignment-langgraph-dataset"):
+    def __init__(self, dataset_name: str = "assignment-langgraph-dataset", dataset_path: Optional[str] = None,
+                 grade_cache: bool = True):
+        """
+        Args:
+            dataset_name: LangSmith dataset to evaluate on
+            dataset_path: Local JSONL dataset to use instead of LangSmith. Results
+                are then summarized locally and nothing is uploaded.
+            grade_cache: Reuse grades for unchanged grader inputs from the LLM cache
+        """
         self.dataset_name = dataset_name
-        self.langsmith_client = Client()
+        self.dataset_path = dataset_path
+        self.langsmith_client = Client() if dataset_path is None else None
+        self.grade_cache = grade_cache
+        self._retriever = None
+
+        # Grader clients are built once and shared by every example.
+        # with_structured_output() forces the grader to return the specified format
+        grader_llm = ChatGoogleGenerativeAI(model=GRADER_MODEL, temperature=0)
+        self.correctness_llm = grader_llm.with_structured_output(grader.CorrectnessGrade)
+        self.relevance_llm = grader_llm.with_structured_output(grader.RelevanceGrade)
+        self.grounded_llm = grader_llm.with_structured_output(grader.GroundedGrade)
+        self.retrieval_relevance_llm = grader_llm.with_structured_output(grader.RetrievalRelevanceGrade)
+
+    @property
+    def retriever(self) -> Retriever:
+        if self._retriever is None:
+            self._retriever = Retriever()
+        return self._retriever
+
+    async def _grade(self, name: str, llm, schema, messages: list):
+        """Invoke a grader, reusing the cached grade for identical inputs"""
+        async def grade():
+            return (await llm.ainvoke(messages)).model_dump()
+
+        result = await get_llm_cache().acall(
+            "grader", GRADER_MODEL, messages, grade,
+            params={"grader": name, "temperature": 0}, cache=self.grade_cache,
+        )
+        return schema.model_validate(result)
 
     # Correctness: Response vs reference answer
     # how similar/correct is the RAG answer, relative to a ground-truth answer
-    def correctness(self, inputs: dict, outputs: dict, reference_outputs: dict) -> bool:
+    async def correctness(self, inputs: dict, outputs: dict, reference_outputs: dict) -> bool:
         """An evaluator for RAG answer accuracy"""
-        correctness_llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-lite", temperature=0).with_structured_output(grader.CorrectnessGrade)
-        # with_structured_output() forces LangSmith to return response in specified format
         answers = f"""\
                     QUESTION: {inputs['question']}
                     GROUND TRUTH ANSWER: {reference_outputs['answer']}
                     STUDENT ANSWER: {outputs['answer']}"""
-        grade = correctness_llm.invoke([
-                {"role": "system", "content": prompts.correctness_instructions}, 
+        grade = await self._grade("correctness", self.correctness_llm, grader.CorrectnessGrade, [
+                {"role": "system", "content": prompts.correctness_instructions},
                 {"role": "user", "content": answers}
         ])
         return grade.correct
-    
+
     # Relevance: Response vs input
     # how well does the generated response address the initial user input
-    def relevance(self, inputs: dict, outputs: dict) -> bool:
+    async def relevance(self, inputs: dict, outputs: dict) -> bool:
         """An evaluator for RAG answer relevance"""
-        relevance_llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-lite", temperature=0).with_structured_output(grader.RelevanceGrade)
         answer = f"QUESTION: {inputs['question']}\nSTUDENT ANSWER: {outputs['answer']}"
-        grade = relevance_llm.invoke([
-            {"role": "system", "content": prompts.relevance_instructions}, 
+        grade = await self._grade("relevance", self.relevance_llm, grader.RelevanceGrade, [
+            {"role": "system", "content": prompts.relevance_instructions},
             {"role": "user", "content": answer}
         ])
         return grade.relevant
 
     # Groundedness: Response vs retrieved docs
     # to what extent does the generated response agree with the retrieved context
-    def grounded(self, inputs: dict, outputs: dict) -> bool:
+    async def grounded(self, inputs: dict, outputs: dict) -> bool:
         """An evaluator for RAG answer groundedness"""
-        grounded_llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-lite", temperature=0).with_structured_output(grader.GroundedGrade)
-        doc_string = "\n\n".join(doc.page_content for doc in outputs["documents"])
+        doc_string = _doc_string(outputs.get("documents", []))
         answer = f"FACTS: {doc_string}\nSTUDENT ANSWER: {outputs['answer']}"
-        grade = grounded_llm.invoke([{"role": "system", "content": prompts.grounded_instructions}, {"role": "user", "content": answer}])
+        grade = await self._grade("grounded", self.grounded_llm, grader.GroundedGrade, [{"role": "system", "content": prompts.grounded_instructions}, {"role": "user", "content": answer}])
         return grade.grounded
 
     # Retrieval relevance: Retrieved docs vs input
     # how relevant are my retrieved results for this query
-    def retrieval_relevance(self, inputs: dict, outputs: dict) -> bool:
+    async def retrieval_relevance(self, inputs: dict, outputs: dict) -> bool:
         """An evaluator for RAG answer retrieval relevance"""
-        retrieval_relevance_llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-lite", temperature=0).with_structured_output(grader.RetrievalRelevanceGrade)
-        doc_string = "\n\n".join(doc.page_content for doc in outputs["documents"])
+        doc_string = _doc_string(outputs.get("documents", []))
         answer = f"FACTS: {doc_string}\nQUESTION: {inputs['question']}"
         # Run evaluator
-        grade = retrieval_relevance_llm.invoke([
-            {"role": "system", "content": prompts.retrieval_relevance_instructions}, 
+        grade = await self._grade("retrieval_relevance", self.retrieval_relevance_llm, grader.RetrievalRelevanceGrade, [
+            {"role": "system", "content": prompts.retrieval_relevance_instructions},
             {"role": "user", "content": answer}
         ])
         return grade.relevant
 
+    async def all_graders(self, inputs: dict, outputs: dict, reference_outputs: dict) -> dict:
+        """Run the four graders concurrently for one example"""
+        correct, grounded, relevant, retrieval_relevant = await asyncio.gather(
+            self.correctness(inputs, outputs, reference_outputs),
+            self.grounded(inputs, outputs),
+            self.relevance(inputs, outputs),
+            self.retrieval_relevance(inputs, outputs),
+        )
+        return {"results": [
+            {"key": "correctness", "score": correct},
+            {"key": "grounded", "score": grounded},
+            {"key": "relevance", "score": relevant},
+            {"key": "retrieval_relevance", "score": retrieval_relevant},
+        ]}
+
+    async def _run_local(self, target, experiment_prefix: str, max_concurrency: int) -> dict:
+        """Evaluate `target` on the local JSONL dataset and write per-example results to disk"""
+        examples = load_local_dataset(self.dataset_path)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_example(example: dict) -> dict:
+            async with semaphore:
+                inputs, reference_outputs = example["inputs"], example.get("outputs", {})
+                if hasattr(target, "ainvoke"):
+                    outputs = await target.ainvoke(inputs)
+                else:
+                    outputs = await target(inputs)
+                grades = await self.all_graders(inputs, outputs, reference_outputs)
+                return {
+                    "inputs": inputs,
+                    "answer": outputs.get("answer"),
+                    "scores": {r["key"]: r["score"] for r in grades["results"]},
+                }
+
+        rows = await asyncio.gather(*(run_example(example) for example in examples))
+
+        metrics = rows[0]["scores"].keys() if rows else []
+        summary = {
+            "experiment": experiment_prefix,
+            "examples": len(rows),
+            "scores": {m: sum(bool(r["scores"][m]) for r in rows) / len(rows) for m in metrics},
+            "llm_cache": get_llm_cache().stats(),
+        }
+
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        results_path = os.path.join(RESULTS_DIR, f"{experiment_prefix}-{datetime.now():%Y%m%d-%H%M%S}.jsonl")
+        with open(results_path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        summary["results_path"] = results_path
+
+        print(json.dumps(summary, indent=2))
+        return summary
+
+    async def _evaluate(self, target, experiment_prefix: str, max_concurrency: int):
+        if self.dataset_path is not None:
+            return await self._run_local(target, experiment_prefix, max_concurrency)
+        return await aevaluate(
+            target,
+            data=self.dataset_name,
+            evaluators=[self.all_graders],
+            experiment_prefix=experiment_prefix,
+            max_concurrency=max_concurrency,
+        )
+
     async def run_graph_evaluator(self):
         def example_to_state(inputs: dict) -> dict:
-            return {
-                "query": inputs['question'],
-                "answer": "",
-                "status": "Pending",
-                "is_weather_query": False,
-                "location": ""
-            }
+            return initial_state(inputs['question'])
 
         app = build_graph(RAGAgentState)
         target = example_to_state | app
 
-        experiment_results = await aevaluate(
-            target,
-            data=self.dataset_name,
-            evaluators=[self.correctness, self.grounded, self.relevance, self.retrieval_relevance],
-            experiment_prefix="rag-doc-relevance",
-            max_concurrency=4,
-        )
+        start = time.perf_counter()
+        experiment_results = await self._evaluate(target, "rag-doc-relevance", max_concurrency=4)
 
-        print("\nRAG Graph Evaluation completed!")
+        print(f"\nRAG Graph Evaluation completed in {time.perf_counter() - start:.1f}s!")
 
         return experiment_results
-    
-    def retriever_wrapper(self, inputs: dict) -> dict:
-        """Wrapper function to convert retriever output to expected format"""
-        retriever = Retriever()
-        
-        # Get the response from retriever
-        response = retriever.generate_response(inputs['question'])
-        
-        # Get the documents that were used for retrieval
-        docs = retriever.retrieve(inputs['question'])
-        
-        # Convert docs to the format expected by evaluators
-        formatted_docs = []
-        for doc in docs:
-            # Create a simple object with page_content attribute
-            class Document:
-                def __init__(self, page_content, metadata):
-                    self.page_content = page_content
-                    self.metadata = metadata
-            
-            formatted_docs.append(Document(doc['page_content'], doc['metadata']))
-        
-        return {
-            "answer": response,
-            "documents": formatted_docs
-        }
 
-    def run_retrieval_evaluator(self):
-        experiment_results = evaluate(
-            self.retriever_wrapper,
-            data=self.dataset_name,
-            evaluators=[self.correctness, self.grounded, self.relevance, self.retrieval_relevance],
-            max_concurrency=3,
-            experiment_prefix="retriever_evals"
-        )
+    async def retriever_wrapper(self, inputs: dict) -> dict:
+        """Run the retriever once and return the answer with the documents it was based on"""
+        return await asyncio.to_thread(self.retriever.generate_response_with_sources, inputs['question'])
 
-        print("\nRAG Retrieval Evaluation completed!")
+    async def run_retrieval_evaluator(self):
+        start = time.perf_counter()
+        experiment_results = await self._evaluate(self.retriever_wrapper, "retriever_evals", max_concurrency=3)
+
+        print(f"\nRAG Retrieval Evaluation completed in {time.perf_counter() - start:.1f}s!")
 
         return experiment_results
 
+
+async def main(evaluator: Eval):
+    start = time.perf_counter()
+    await evaluator.run_retrieval_evaluator()
+    await evaluator.run_graph_evaluator()
+    print(f"Total evaluation time: {time.perf_counter() - start:.1f}s")
+
+
 if __name__ == "__main__":
-    retrieval_eval_results = Eval().run_retrieval_evaluator()
-    graph_eval_results = Eval().run_graph_evaluator()
+    parser = argparse.ArgumentParser(description="Run the RAG evaluations")
+    parser.add_argument("--dataset-path", nargs="?", const=DEFAULT_DATASET_PATH, default=None,
+                        help=f"Evaluate on a local JSONL dataset instead of LangSmith (default {DEFAULT_DATASET_PATH})")
+    parser.add_argument("--cassette", choices=["off", "record", "replay"], default=None,
+                        help="Record or replay every LLM, embedding, search and weather call")
+    parser.add_argument("--cassette-path", default=None)
+    parser.add_argument("--no-grade-cache", action="store_true", help="Re-grade every example")
+    args = parser.parse_args()
+
+    if args.cassette:
+        configure_cassette(args.cassette, args.cassette_path)
+
+    asyncio.run(main(Eval(dataset_path=args.dataset_path, grade_cache=not args.no_grade_cache)))
 
-    print("Check LangSmith dashboard for detailed results.")
+    if args.dataset_path is None:
+        print("Check LangSmith dashboard for detailed results.")
@@ -0,0 +1,142 @@
+"""
+Routing evaluation: embedding intent classifier vs. LLM router.
+
+Routes every labeled query of evals/datasets/router_eval.jsonl with
+- llm: the Gemini classification prompt (`llm_route`)
+- classifier: the nearest-centroid classifier on the query embedding alone
+- embedding: the routing node's default, the classifier with LLM routing
+  for queries it considers weather questions or ambiguous; queries naming a
+  weather term go to the LLM without being embedded
+
+and reports weather/document accuracy, location accuracy on weather queries,
+latency (overall and on weather queries), the share of queries that needed
+an LLM call and the share the embedding router sent straight to the LLM
+without embedding them. The classifier's
+embedding call is counted in its latency although retrieval reuses the
+vector. Per-query rows are written to .eval_cache/results.
+
+Usage:
+    python -m evals.router_eval
+    python -m evals.router_eval --cassette replay
+"""
+from src.graphs.intent_classifier import MIXED, WEATHER, get_intent_classifier, looks_like_weather
+from src.graphs.nodes.routing_node import llm_route
+from src.utils.cassette import configure_cassette
+from src.utils.retriever import Retriever
+from benchmarks.load_test import _latency_stats
+from datetime import datetime
+from typing import List, Optional
+import argparse
+import json
+import os
+import time
+
+DEFAULT_DATASET_PATH = os.path.join(os.path.dirname(__file__), "datasets", "router_eval.jsonl")
+RESULTS_DIR = os.path.join(".eval_cache", "results")
+ROUTERS = ("llm", "classifier", "embedding")
+
+
+def load_router_dataset(path: str) -> List[dict]:
+    """Load {"query", "is_weather", "location"} examples from a JSONL file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _same_location(predicted: Optional[str], expected: Optional[str]) -> bool:
+    return (predicted or "").strip().lower() == (expected or "").strip().lower()
+
+
+def route_example(example: dict, retriever: Retriever) -> dict:
+    """Route one query with each router and time them"""
+    query = example["query"]
+    classifier = get_intent_classifier(retriever.embeddings)
+    row = {"query": query, "is_weather": example["is_weather"], "location": example.get("location")}
+
+    start = time.perf_counter()
+    llm = llm_route(query)
+    row["llm"] = {"is_weather": bool(llm["is_weather_query"]), "location": llm["location"],
+                  "seconds": time.perf_counter() - start, "llm_calls": 1}
+
+    start = time.perf_counter()
+    vector = retriever.embed_query(query)
+    label, margin = classifier.classify_vector(vector)
+    classified = time.perf_counter() - start
+    row["classifier"] = {"is_weather": label in (WEATHER, MIXED), "location": None, "margin": round(margin, 4),
+                         "seconds": classified, "llm_calls": 0}
+
+    if looks_like_weather(query):
+        # Routed like the routing node: straight to the LLM, without an embedding
+        start = time.perf_counter()
+        routed = llm_route(query)
+        row["embedding"] = {"is_weather": bool(routed["is_weather_query"]), "location": routed["location"],
+                            "seconds": time.perf_counter() - start, "llm_calls": 1, "short_circuit": True}
+    elif classifier.is_document(vector):
+        row["embedding"] = dict(row["classifier"])
+    else:
+        start = time.perf_counter()
+        routed = llm_route(query)
+        row["embedding"] = {"is_weather": bool(routed["is_weather_query"]), "location": routed["location"],
+                            "seconds": classified + time.perf_counter() - start, "llm_calls": 1}
+    return row
+
+
+def summarize(rows: List[dict]) -> dict:
+    """Accuracy and latency per router"""
+    summary = {"examples": len(rows)}
+    weather_rows = [row for row in rows if row["is_weather"]]
+    for router in ROUTERS:
+        results = [row[router] for row in rows]
+        correct = sum(result["is_weather"] == row["is_weather"] for row, result in zip(rows, results))
+        summary[router] = {
+            "accuracy": round(correct / len(rows), 4) if rows else 0.0,
+            "weather_recall": round(sum(row[router]["is_weather"] for row in weather_rows) / len(weather_rows), 4)
+            if weather_rows else 0.0,
+            "location_accuracy": round(
+                sum(_same_location(row[router]["location"], row["location"]) for row in weather_rows)
+                / len(weather_rows), 4) if weather_rows and router != "classifier" else None,
+            "llm_call_rate": round(sum(result["llm_calls"] for result in results) / len(rows), 4) if rows else 0.0,
+            "latency_s": _latency_stats([result["seconds"] for result in results]),
+            "weather_latency_s": _latency_stats([row[router]["seconds"] for row in weather_rows]),
+        }
+    summary["embedding"]["short_circuit_rate"] = round(
+        sum(row["embedding"].get("short_circuit", False) for row in rows) / len(rows), 4) if rows else 0.0
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the embedding intent classifier with the LLM router")
+    parser.add_argument("--dataset-path", default=DEFAULT_DATASET_PATH)
+    parser.add_argument("--cassette", choices=["off", "record", "replay"], default=None,
+                        help="Record or replay every LLM and embedding call")
+    parser.add_argument("--cassette-path", default=None)
+    args = parser.parse_args(argv)
+
+    if args.cassette:
+        configure_cassette(args.cassette, args.cassette_path)
+
+    retriever = Retriever()
+    # Fit the centroids up front so the one-off example embedding is not timed
+    get_intent_classifier(retriever.embeddings).centroids
+
+    rows = [route_example(example, retriever) for example in load_router_dataset(args.dataset_path)]
+    summary = summarize(rows)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"router_evals-{datetime.now():%Y%m%d-%H%M%S}.jsonl")
+    with open(results_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    summary["results_path"] = results_path
+
+    for router in ROUTERS:
+        stats = summary[router]
+        location = f"  location {stats['location_accuracy']:.1%}" if stats["location_accuracy"] is not None else ""
+        print(f"{router:<11} accuracy {stats['accuracy']:.1%}  weather recall {stats['weather_recall']:.1%}{location}  "
+              f"LLM calls {stats['llm_call_rate']:.0%}  latency mean {stats['latency_s']['mean']:.3f}s "
+              f"p95 {stats['latency_s']['p95']:.3f}s  weather p95 {stats['weather_latency_s']['p95']:.3f}s")
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,68 @@
+from typing import Callable, Dict, List, Optional, Union
 from langgraph.graph import StateGraph, START, END
+from src.graphs.intent_classifier import ROUTER, looks_like_weather
 from src.graphs.nodes.routing_node import routing_node
 from src.graphs.nodes.weather_node import weather_node
 from src.graphs.nodes.retriever_node import retriever_node
-from src.graphs.type import RAGAgentState
+from src.graphs.nodes.merge_node import merge_node
+from src.graphs.type import RAGAgentState, fans_out
+from src.graphs.speculative import SPECULATIVE_RETRIEVAL, Prefetcher, get_prefetcher, speculative_routing
 
-def routing_condition(state: RAGAgentState) -> bool:
-    if state["is_weather_query"]:
+# Keys written by every branch, kept per branch when both run in the same step
+_BRANCH_OUTPUTS = ("answer", "status", "error")
+
+
+def routing_condition(state: RAGAgentState) -> Union[str, List[str]]:
+    if fans_out(state):
+        # Multi-intent query: both branches run concurrently
+        return ["weather", "retriever"]
+    elif state["is_weather_query"]:
         return "weather"
     else:
         return "retriever"
 
 
-def _build_base_graph(state: RAGAgentState) -> StateGraph:
+def branch_condition(state: RAGAgentState) -> str:
+    return "merge" if fans_out(state) else END
+
+
+def _branch(name: str, node: Callable) -> Callable:
+    """
+    Wrap a weather/retriever node so it only returns the keys it changed.
+
+    When both branches run, their answer, status and error go to
+    `branch_answers[name]` instead, as concurrent writes to the same key
+    are not allowed; the merge node combines them.
+    """
+    def branch_node(state: RAGAgentState) -> dict:
+        before = dict(state)
+        after = node(dict(state))
+        update = {key: value for key, value in after.items() if key not in before or before[key] != value}
+        if fans_out(before):
+            outputs = {key: update.pop(key, None) for key in _BRANCH_OUTPUTS}
+            update["branch_answers"] = {name: {"answer": after.get("answer"), "error": outputs["error"]}}
+        return update
+
+    return branch_node
+
+
+def _build_base_graph(state: RAGAgentState, nodes: Optional[Dict[str, Callable]] = None) -> StateGraph:
+
+    # Allow callers (e.g. the load-testing driver) to swap in stand-in nodes
+    # while keeping the same graph topology.
+    node_funcs = {
+        "routing": routing_node,
+        "weather": weather_node,
+        "retriever": retriever_node,
+    }
+    node_funcs.update(nodes or {})
 
     builder = StateGraph(RAGAgentState)
 
-    builder.add_node("routing", routing_node)
-    builder.add_node("weather", weather_node)
-    builder.add_node("retriever", retriever_node)
+    builder.add_node("routing", node_funcs["routing"])
+    builder.add_node("weather", _branch("weather", node_funcs["weather"]))
+    builder.add_node("retriever", _branch("retriever", node_funcs["retriever"]))
+    builder.add_node("merge", merge_node)
 
     builder.add_edge(START, "routing")
     builder.add_conditional_edges(
@@ -27,11 +72,31 @@ def _build_base_graph(state: RAGAgentState) -> StateGraph:
         }
     )
 
-    builder.add_edge("weather", END)
-    builder.add_edge("retriever", END)
+    builder.add_conditional_edges("weather", branch_condition, {"merge": "merge", END: END})
+    builder.add_conditional_edges("retriever", branch_condition, {"merge": "merge", END: END})
+    builder.add_edge("merge", END)
 
     return builder.compile()
 
-def build_graph(state: RAGAgentState) -> StateGraph:
-    builder = _build_base_graph(state)
-    return builder
\ No newline at end of file
+def build_graph(state: RAGAgentState, nodes: Optional[Dict[str, Callable]] = None,
+                speculative: Optional[bool] = None, prefetcher: Optional[Prefetcher] = None) -> StateGraph:
+    """
+    Compile the RAG graph.
+
+    Args:
+        state: State schema
+        nodes: Stand-in node functions by node name
+        speculative: Start retrieval concurrently with routing, except for queries that name a weather term.
+            Defaults to RAG_SPECULATIVE_RETRIEVAL. Always off for the default routing node with the embedding
+            router, which embeds the query itself.
+        prefetcher: Prefetcher running the speculative retrievals. Defaults to `get_prefetcher()`.
+    """
+    if speculative is None:
+        speculative = SPECULATIVE_RETRIEVAL
+    nodes = dict(nodes or {})
+    routing = nodes.get("routing", routing_node)
+    if speculative and not (routing is routing_node and ROUTER == "embedding"):
+        nodes["routing"] = speculative_routing(routing, prefetcher or get_prefetcher(),
+                                               prefetch=lambda query: not looks_like_weather(query))
+    builder = _build_base_graph(state, nodes)
+    return builder
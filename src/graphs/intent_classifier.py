@@ -0,0 +1,142 @@
+"""
+Embedding-based intent classifier for routing.
+
+Queries are classified by their nearest centroid among the query embeddings
+of labeled example queries (src/graphs/intent_examples.json). The query
+vector is the one retrieval searches with, so a document question is routed
+and retrieved with a single embedding call and no LLM call. Queries closest
+to the weather centroid, or to the centroid of mixed questions (weather plus
+documents), or too close to two labels to call, still go to the LLM router,
+which also extracts their location and detects mixed questions. The
+centroids are fitted with one batched embedding request, made by the
+service's warm-up at start-up (or by the first routed query otherwise) within
+a deadline and behind the embedding provider's circuit breaker. Queries that
+name a weather term (`looks_like_weather`) go to the LLM router straight
+away, so weather questions do not wait for an embedding first.
+
+Settings (environment variables):
+    RAG_ROUTER               "embedding" (default) or "llm" to always route with the LLM
+    RAG_INTENT_MIN_MARGIN    Cosine similarity margin over the runner-up needed to skip the LLM (default 0.02)
+"""
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils import resilience
+from src.utils.cassette import get_cassette
+from src.utils.embeddings import EmbeddingProvider
+
+from dotenv import load_dotenv
+load_dotenv()
+
+ROUTERS = ("embedding", "llm")
+ROUTER = os.getenv("RAG_ROUTER", "embedding")
+INTENT_MIN_MARGIN = float(os.getenv("RAG_INTENT_MIN_MARGIN", "0.02"))
+INTENT_EXAMPLES_PATH = os.path.join(os.path.dirname(__file__), "intent_examples.json")
+
+DOCUMENT = "document"
+WEATHER = "weather"
+# Weather questions that also ask about the documents; routed by the LLM so both branches run
+MIXED = "mixed"
+
+# Words that make a query an obvious weather (or mixed) question, routed by the LLM without embedding it
+WEATHER_TERMS = re.compile(
+    r"\b(weather|forecast|temperatures?|rain|raining|rainy|drizzl\w*|snow|snowing|snowy|sunny|cloudy|"
+    r"humid|humidity|windy|storms?|stormy|thunderstorms?|foggy|degrees)\b",
+    re.IGNORECASE,
+)
+
+
+def looks_like_weather(query: str) -> bool:
+    """Whether a query names a weather term, so it needs the LLM router whatever its embedding."""
+    return WEATHER_TERMS.search(query) is not None
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class IntentClassifier:
+    """Nearest-centroid classifier over query embeddings."""
+
+    def __init__(self, embeddings: EmbeddingProvider, examples: Dict[str, List[str]],
+                 min_margin: float = INTENT_MIN_MARGIN):
+        """
+        Args:
+            embeddings: Provider the queries to classify are embedded with
+            examples: Example queries by label
+            min_margin: Similarity margin over the runner-up label below which a query counts as uncertain
+        """
+        if DOCUMENT not in examples or WEATHER not in examples:
+            raise ValueError(f"Intent examples need both a '{DOCUMENT}' and a '{WEATHER}' label")
+        self.embeddings = embeddings
+        self.examples = examples
+        self.min_margin = min_margin
+        self.labels = list(examples)
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, embeddings: EmbeddingProvider, path: str = INTENT_EXAMPLES_PATH, **kwargs) -> "IntentClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(embeddings, json.load(f), **kwargs)
+
+    @property
+    def centroids(self) -> np.ndarray:
+        """Unit-length centroid of each label's example embeddings, fitted on first use."""
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    self._centroids = self._fit()
+        return self._centroids
+
+    def _fit(self) -> np.ndarray:
+        texts = [text for label in self.labels for text in self.examples[label]]
+        embeddings = self.embeddings
+        embed = lambda: embeddings.embed_queries(texts).tolist()
+        # One batched request; recorded and guarded like the retriever's query embeddings
+        vectors = get_cassette().call(
+            "embedding", {"model": embeddings.model, "task_type": "retrieval_query", "content": texts},
+            lambda: resilience.call(embeddings.name, "intent_fit", embed) if embeddings.remote else embed(),
+        )
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        centroids, start = [], 0
+        for label in self.labels:
+            count = len(self.examples[label])
+            centroids.append(vectors[start:start + count].mean(axis=0))
+            start += count
+        return _normalize(np.stack(centroids))
+
+    def classify_vector(self, vector: Sequence[float]) -> Tuple[str, float]:
+        """
+        Classify an embedded query.
+
+        Returns:
+            The nearest label and its cosine similarity margin over the runner-up
+        """
+        similarities = self.centroids @ _normalize(np.asarray(vector, dtype=np.float32))
+        order = np.argsort(similarities)[::-1]
+        return self.labels[order[0]], float(similarities[order[0]] - similarities[order[1]])
+
+    def is_document(self, vector: Sequence[float]) -> bool:
+        """Whether an embedded query is confidently a document question, so it needs no LLM routing."""
+        label, margin = self.classify_vector(vector)
+        return label == DOCUMENT and margin >= self.min_margin
+
+
+_classifiers: Dict[Tuple[str, str], IntentClassifier] = {}
+_classifiers_lock = threading.Lock()
+
+
+def get_intent_classifier(embeddings: EmbeddingProvider) -> IntentClassifier:
+    """Process-wide classifier for queries embedded with the given provider."""
+    key = (embeddings.name, embeddings.model)
+    with _classifiers_lock:
+        if key not in _classifiers:
+            _classifiers[key] = IntentClassifier.from_file(embeddings)
+        return _classifiers[key]
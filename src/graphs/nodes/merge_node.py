@@ -0,0 +1,17 @@
+from src.graphs.type import RAGAgentState
+
+# Order in which the branch answers of a multi-intent query are presented
+BRANCH_ORDER = ("weather", "retriever")
+
+
+def merge_node(state: RAGAgentState) -> RAGAgentState:
+    """
+    Node responsible for combining the answers of the branches of a multi-intent query.
+    """
+    branch_answers = state.get("branch_answers") or {}
+    branches = [branch_answers[name] for name in BRANCH_ORDER if name in branch_answers]
+    state["answer"] = "\n\n".join(branch["answer"] for branch in branches if branch.get("answer"))
+    # A degraded branch degrades the combined answer
+    state["error"] = next((branch["error"] for branch in branches if branch.get("error")), None)
+    state["status"] = "MergeNodeCompleted"
+    return state
@@ -1,5 +1,7 @@
+from src.graphs.speculative import take_prefetched
 from src.graphs.type import RAGAgentState
 from src.utils.retriever import Retriever
+from src.utils import resilience
 
 def retriever_node(state: RAGAgentState) -> RAGAgentState:
     """
@@ -9,12 +11,18 @@ def retriever_node(state: RAGAgentState) -> RAGAgentState:
         if not state.get("query"):
             state["error"] = "Query is required but not provided"
         else:
-            retriever = Retriever()
-            response = retriever.generate_response(state["query"])
-            state["answer"] = response
+            retriever = Retriever(tenant=state.get("tenant"))
+            documents = take_prefetched(state.get("prefetch_id"))
+            with resilience.deadline_scope(state.get("deadline")):
+                response = retriever.generate_response_with_sources(
+                    state["query"], documents=documents, vector=state.get("query_vector")
+                )
+            state["answer"] = response["answer"]
+            state["documents"] = response["documents"]
         
     except Exception as e:
         state["answer"] = f"Unexpected error: {str(e)}"
+        state["error"] = resilience.error_code(e)
     
     
     state["status"] = "RetrieverNodeCompleted"
@@ -1,33 +1,119 @@
 from src.graphs.type import RAGAgentState
-from langchain_google_genai import GoogleGenerativeAI
+from src.graphs.intent_classifier import ROUTER, get_intent_classifier, looks_like_weather
 from src.utils.prompts import WEATHER_CLASSIFICATION_PROMPT
+from src.utils.cassette import get_cassette
+from src.utils.clients import get_llm
+from src.utils.llm_cache import get_llm_cache, llm_params
+from src.utils import resilience
+from src.utils.retriever import Retriever
+from typing import List, Optional
 import json
+import logging
 
 from dotenv import load_dotenv
 load_dotenv()
 
-def routing_node(state: RAGAgentState) -> RAGAgentState:
+logger = logging.getLogger(__name__)
+
+
+def parse_classification(response: str) -> Optional[dict]:
+    """The JSON object of a classification response, or None if it is not valid JSON."""
+    try:
+        # Extract JSON from markdown code blocks
+        result = json.loads(response.strip().strip("```").strip("json"))
+    except json.JSONDecodeError:
+        return None
+    return result if isinstance(result, dict) else None
+
+
+def llm_route(query: str) -> dict:
     """
-    Node responsible for routing the user query to the appropriate node.
+    Classify a query with the LLM and extract the location of weather queries.
+
+    Returns:
+        Dict with `is_weather_query`, `location` and `needs_documents` (a weather query that also asks
+        about the documents), and an error `answer` if the response could not be parsed
     """
     # Initialize Gemini LLM
-    llm = GoogleGenerativeAI(model="gemini-2.0-flash")
-    
+    llm = get_llm("gemini-2.0-flash")
+
     # Classify if the query is about weather and extract location
-    classification_prompt = WEATHER_CLASSIFICATION_PROMPT.format(query=state["query"])
-    classification_response = llm.invoke(classification_prompt)
-    
-    try:
-        # Extract JSON from markdown code blocks
-        response_text = classification_response.strip().strip("```").strip("json")
-        result = json.loads(response_text)
-        state["is_weather_query"] = result.get("is_weather", False)
-        state["location"] = result.get("location", None)
+    classification_prompt = WEATHER_CLASSIFICATION_PROMPT.format(query=query)
+    classification_response = get_cassette().call(
+        "llm", {"model": llm.model, "prompt": classification_prompt},
+        lambda: get_llm_cache().call(
+            "router", llm.model, classification_prompt,
+            lambda: resilience.call("gemini", "classify", lambda: llm.invoke(classification_prompt)),
+            params=llm_params(llm),
+            # Unparseable responses are retried on the next identical query instead of served for the TTL
+            cacheable=lambda response: parse_classification(response) is not None,
+        ),
+    )
+
+    result = parse_classification(classification_response)
+    if result is None:
+        return {"is_weather_query": False, "location": None, "needs_documents": False,
+                "answer": "Error parsing JSON response"}
+    is_weather = result.get("is_weather", False)
+    return {"is_weather_query": is_weather, "location": result.get("location", None),
+            "needs_documents": bool(is_weather and result.get("needs_documents", False))}
+
+
+def routing_embeds_query(query: str) -> bool:
+    """Whether `routing_node` embeds a query with the intent classifier instead of sending it to the LLM first."""
+    return ROUTER == "embedding" and not looks_like_weather(query)
+
+
+def embedding_route(query: str, tenant: Optional[str] = None) -> Optional[List[float]]:
+    """
+    Embed a query for retrieval and classify it with the intent classifier.
+
+    Returns:
+        The query vector if the query is confidently a document question,
+        None if it needs LLM routing
+    """
+    retriever = Retriever(tenant=tenant)
+    vector = retriever.embed_query(query)
+    if get_intent_classifier(retriever.embeddings).is_document(vector):
+        return vector
+    return None
+
+
+def routing_node(state: RAGAgentState) -> RAGAgentState:
+    """
+    Node responsible for routing the user query to the appropriate node.
+
+    Document questions are recognized from the query embedding, which the
+    retriever node then searches with; the LLM only classifies queries that
+    look like weather questions (extracting their location) or are ambiguous.
+    Queries naming a weather term skip the embedding and go to the LLM directly.
+    The LLM flags weather questions that also ask about the documents so both
+    branches run.
+    If the LLM is unavailable or the deadline passes, the query is answered
+    from the documents and the reason is recorded in `error`.
+    """
+    with resilience.deadline_scope(state.get("deadline")):
+        vector = None
+        if routing_embeds_query(state["query"]):
+            try:
+                vector = embedding_route(state["query"], state.get("tenant"))
+            except Exception as e:
+                logger.warning("Embedding router failed, routing with the LLM: %s", e)
+
+        if vector is not None:
+            state["is_weather_query"] = False
+            state["needs_documents"] = False
+            state["location"] = None
+            state["query_vector"] = vector
+        else:
+            try:
+                state.update(llm_route(state["query"]))
+            except Exception as e:
+                logger.warning("LLM router failed, routing to the documents: %s", e)
+                state["is_weather_query"] = False
+                state["needs_documents"] = False
+                state["location"] = None
+                state["error"] = resilience.error_code(e)
 
-    except json.JSONDecodeError:
-        state["is_weather_query"] = False
-        state["location"] = None
-        state["answer"] = "Error parsing JSON response"
-    
     state["status"] = "RoutingNodeCompleted"
-    return state
\ No newline at end of file
+    return state
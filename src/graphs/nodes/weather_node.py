@@ -1,5 +1,6 @@
 from src.graphs.type import RAGAgentState
 from src.utils.openweather import OpenWeatherService
+from src.utils import resilience
 
 def weather_node(state: RAGAgentState) -> RAGAgentState:
     """
@@ -13,17 +14,16 @@ def weather_node(state: RAGAgentState) -> RAGAgentState:
     
     try:
         service = OpenWeatherService()
-        # Step 1: Use Geocoding API to get coordinates from location name
-        geocoded = service.geocode_location(state["location"])
-        lat, lon = geocoded["lat"], geocoded["lon"]
-
-        # Step 2: Use Current Weather API to get weather data using coordinates
-        weather_data = service.get_weather(lat, lon)
+        with resilience.deadline_scope(state.get("deadline")):
+            # Served from memory for recently asked locations; otherwise geocodes
+            # the location name (unless known) and fetches the current weather
+            weather_data = service.current_weather(state["location"])
         response_text = f"The weather in {weather_data['location']} is {weather_data['description']} with a temperature of {weather_data['temperature']}°C."
         state["answer"] = response_text
 
     except Exception as e:
         state["answer"] = f"Error getting weather data: {str(e)}"
+        state["error"] = resilience.error_code(e)
         
     state["status"] = "WeatherNodeCompleted"
     return state
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""
+Speculative retrieval, run concurrently with routing.
+
+Most queries are document questions, so with speculation on the graph starts
+the query embedding and vector search on a worker thread when routing starts,
+instead of after it. Document questions then take the prefetched chunks
+(`take_prefetched`) and only wait for whatever part of the search outlasted
+routing; weather questions discard them (`discard_prefetched`), cancelling
+the prefetch if it has not started yet. A prefetch nobody takes or discards,
+because the graph failed or was abandoned after routing, is discarded once it
+is older than `ttl` seconds.
+
+Queries that name a weather term are not prefetched, since they almost always
+route to the weather node. With the embedding router (RAG_ROUTER=embedding)
+`build_graph` turns speculation off altogether: that router embeds the query
+itself and the retriever node searches with its vector, so a prefetch would
+only embed the query a second time.
+
+`Prefetcher.stats()` reports the latency saved by used prefetches and the
+work spent on discarded ones.
+
+Settings (environment variables):
+    RAG_SPECULATIVE_RETRIEVAL  Start retrieval concurrently with routing (default 0)
+    RAG_SPECULATIVE_WORKERS    Prefetches run concurrently (default 8)
+    RAG_SPECULATIVE_TTL        Seconds after which an unclaimed prefetch is discarded (default 120)
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from src.graphs.type import fans_out
+from src.utils.resilience import deadline_scope
+
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_RETRIEVAL = os.getenv("RAG_SPECULATIVE_RETRIEVAL", "0") == "1"
+SPECULATIVE_WORKERS = int(os.getenv("RAG_SPECULATIVE_WORKERS", "8"))
+SPECULATIVE_TTL = float(os.getenv("RAG_SPECULATIVE_TTL", "120"))
+
+
+class _Prefetch:
+    __slots__ = ("owner", "future", "expires", "started", "finished")
+
+    def __init__(self, owner: "Prefetcher", expires: float):
+        self.owner = owner
+        self.future: Optional[Future] = None
+        self.expires = expires
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished - self.started) if self.started and self.finished else 0.0
+
+
+# Prefetches handed to the graph state by id, until a node takes or discards them
+_inflight: Dict[str, _Prefetch] = {}
+_inflight_lock = threading.Lock()
+
+
+class Prefetcher:
+    """Runs retrievals ahead of routing on a bounded thread pool and accounts for their outcome."""
+
+    def __init__(self, retrieve: Callable[[str, Optional[str]], List[dict]], workers: int = SPECULATIVE_WORKERS,
+                 ttl: float = SPECULATIVE_TTL, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            retrieve: Retrieves the chunks for (query, tenant)
+            workers: Prefetches run concurrently; further ones queue
+            ttl: Seconds after which a prefetch no node took or discarded is discarded
+            clock: Time source for the TTL (for tests)
+        """
+        self.retrieve = retrieve
+        self.ttl = ttl
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self.counts = {"started": 0, "used": 0, "discarded": 0, "cancelled": 0, "failed": 0, "expired": 0,
+                       "skipped": 0}
+        self.saved_seconds = 0.0
+        self.wasted_seconds = 0.0
+
+    def start(self, query: str, tenant: Optional[str] = None) -> str:
+        """Start retrieving for a query and return the prefetch id to put in the graph state."""
+        self._expire()
+        prefetch = _Prefetch(self, self._clock() + self.ttl)
+
+        def run():
+            prefetch.started = time.perf_counter()
+            try:
+                return self.retrieve(query, tenant)
+            finally:
+                prefetch.finished = time.perf_counter()
+
+        prefetch_id = uuid.uuid4().hex
+        with _inflight_lock:
+            _inflight[prefetch_id] = prefetch
+        # Run in the caller's context so the prefetch is bound by the request's deadline
+        prefetch.future = self._executor.submit(contextvars.copy_context().run, run)
+        with self._lock:
+            self.counts["started"] += 1
+        return prefetch_id
+
+    def _expire(self):
+        """Discard this prefetcher's prefetches that outlived the TTL unclaimed."""
+        now = self._clock()
+        with _inflight_lock:
+            expired = [prefetch_id for prefetch_id, prefetch in _inflight.items()
+                       if prefetch.owner is self and prefetch.expires <= now]
+        for prefetch_id in expired:
+            if _discard(_pop(prefetch_id)):
+                with self._lock:
+                    self.counts["expired"] += 1
+
+    def _skipped(self):
+        with self._lock:
+            self.counts["skipped"] += 1
+
+    def _used(self, prefetch: _Prefetch, waited: float, failed: bool):
+        with self._lock:
+            if failed:
+                self.counts["failed"] += 1
+            else:
+                self.counts["used"] += 1
+                # Without speculation the whole retrieval would have run after routing
+                self.saved_seconds += max(prefetch.seconds - waited, 0.0)
+
+    def _discarded(self, prefetch: _Prefetch):
+        with self._lock:
+            if prefetch.started is None:
+                self.counts["cancelled"] += 1
+            else:
+                self.counts["discarded"] += 1
+                self.wasted_seconds += prefetch.seconds
+
+    def stats(self) -> dict:
+        """Prefetch outcomes, latency saved by used prefetches and time spent on discarded ones."""
+        with self._lock:
+            return {
+                **self.counts,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "wasted_seconds": round(self.wasted_seconds, 3),
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Stop the workers; with `wait`, after the prefetches already running finished."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _pop(prefetch_id: Optional[str]) -> Optional[_Prefetch]:
+    if not prefetch_id:
+        return None
+    with _inflight_lock:
+        return _inflight.pop(prefetch_id, None)
+
+
+def take_prefetched(prefetch_id: Optional[str]) -> Optional[List[dict]]:
+    """
+    Wait for a prefetch and return its chunks.
+
+    Returns:
+        The prefetched chunks, or None if there is no such prefetch or it
+        failed; the caller then retrieves as usual
+    """
+    prefetch = _pop(prefetch_id)
+    if prefetch is None:
+        return None
+    start = time.perf_counter()
+    try:
+        documents = prefetch.future.result()
+    except Exception as e:
+        logger.warning("Speculative retrieval failed, retrieving again: %s", e)
+        prefetch.owner._used(prefetch, time.perf_counter() - start, failed=True)
+        return None
+    prefetch.owner._used(prefetch, time.perf_counter() - start, failed=False)
+    return documents
+
+
+def _discard(prefetch: Optional[_Prefetch]) -> bool:
+    if prefetch is None:
+        return False
+    if prefetch.future.cancel():
+        prefetch.owner._discarded(prefetch)
+    else:
+        # Account for its time once it finishes
+        prefetch.future.add_done_callback(lambda _: prefetch.owner._discarded(prefetch))
+    return True
+
+
+def discard_prefetched(prefetch_id: Optional[str]):
+    """Drop a prefetch the query turned out not to need, cancelling it if it has not started."""
+    _discard(_pop(prefetch_id))
+
+
+def speculative_routing(routing: Callable, prefetcher: Prefetcher,
+                        prefetch: Optional[Callable[[str], bool]] = None) -> Callable:
+    """
+    Wrap a routing node so retrieval starts alongside it.
+
+    The prefetch id is stored in the state's `prefetch_id` for document
+    questions (including weather questions that also ask about the documents)
+    and the prefetch is discarded for weather questions.
+
+    Args:
+        routing: Routing node
+        prefetcher: Prefetcher running the retrievals
+        prefetch: Whether a query is worth prefetching; by default every query is
+    """
+    def routing_node(state):
+        if prefetch is not None and not prefetch(state["query"]):
+            prefetcher._skipped()
+            return routing(state)
+        with deadline_scope(state.get("deadline")):
+            prefetch_id = prefetcher.start(state["query"], state.get("tenant"))
+        try:
+            state = routing(state)
+        except BaseException:
+            discard_prefetched(prefetch_id)
+            raise
+        if state.get("is_weather_query") and not fans_out(state):
+            discard_prefetched(prefetch_id)
+        else:
+            state["prefetch_id"] = prefetch_id
+        return state
+
+    return routing_node
+
+
+_default_prefetcher: Optional[Prefetcher] = None
+_default_lock = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    """Process-wide prefetcher running the real retriever."""
+    global _default_prefetcher
+    with _default_lock:
+        if _default_prefetcher is None:
+            from src.utils.retriever import Retriever
+            _default_prefetcher = Prefetcher(lambda query, tenant: Retriever(tenant=tenant).retrieve(query))
+        return _default_prefetcher
@@ -1,4 +1,13 @@
-from typing import TypedDict, List
+from typing import Annotated, Dict, TypedDict, List, Optional
+
+from src.utils.resilience import new_deadline
+from src.utils.tenancy import DEFAULT_TENANT
+
+
+def merge_branch_answers(current: Optional[Dict[str, dict]], update: Optional[Dict[str, dict]]) -> Dict[str, dict]:
+    """Reducer combining the answers of branches that ran in the same step."""
+    return {**(current or {}), **(update or {})}
+
 
 class RAGAgentState(TypedDict):
     """
@@ -8,4 +17,46 @@ class RAGAgentState(TypedDict):
     answer: str
     status: str
     is_weather_query: bool
-    location: str
\ No newline at end of file
+    # Weather query that also asks about the documents: the weather and retriever nodes both run
+    needs_documents: bool
+    location: str
+    documents: List[dict]
+    tenant: str
+    # Speculative retrieval started with routing, if any (see src/graphs/speculative.py)
+    prefetch_id: Optional[str]
+    # Query embedding computed by the routing classifier, reused for search
+    query_vector: Optional[List[float]]
+    # Absolute time (epoch seconds) by which provider calls must return (see src/utils/resilience.py)
+    deadline: Optional[float]
+    # Why the answer is degraded, if it is ("deadline_exceeded", "circuit_open", "provider_error")
+    error: Optional[str]
+    # Answer and error of each branch of a multi-intent query, by node name, combined by the merge node
+    branch_answers: Annotated[Dict[str, dict], merge_branch_answers]
+
+
+def initial_state(query: str, tenant: Optional[str] = None, deadline: Optional[float] = None) -> RAGAgentState:
+    """
+    Build the state a graph run starts from for the given user query,
+    retrieving from the documents of `tenant` (the default tenant if not given).
+    Provider calls must return by `deadline` (RAG_REQUEST_DEADLINE seconds from now if not given).
+    """
+    return RAGAgentState(
+        query=query,
+        answer="",
+        status="processing",
+        is_weather_query=False,
+        needs_documents=False,
+        location="",
+        documents=[],
+        tenant=tenant or DEFAULT_TENANT,
+        prefetch_id=None,
+        query_vector=None,
+        deadline=deadline or new_deadline(),
+        error=None,
+        branch_answers={},
+    )
+
+
+def fans_out(state: RAGAgentState) -> bool:
+    """Whether the query was routed to both the weather and the retriever node."""
+    return bool(state.get("is_weather_query") and state.get("needs_documents"))
@@ -0,0 +1,131 @@
+import json
+import os
+import requests
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class ServiceError(Exception):
+    """Raised when the query service returns an error response."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ServiceBusyError(ServiceError):
+    """Raised when the query service rejects a request because its queues are full (HTTP 429)."""
+
+
+class QueryServiceClient:
+    """Client for the headless query service (`src/service/server.py`)."""
+
+    def __init__(self, base_url: Optional[str] = None, timeout: float = 120):
+        self.base_url = (base_url or os.getenv("RAG_SERVICE_URL", "http://127.0.0.1:8000")).rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _check(self, response: requests.Response) -> requests.Response:
+        if response.ok:
+            return response
+        try:
+            detail = response.json().get("detail", response.text)
+        except ValueError:
+            detail = response.text
+        error = ServiceBusyError if response.status_code == 429 else ServiceError
+        raise error(response.status_code, str(detail))
+
+    def health(self) -> Dict[str, Any]:
+        return self._check(self.session.get(f"{self.base_url}/health", timeout=self.timeout)).json()
+
+    @staticmethod
+    def _with_tenant(body: Dict[str, Any], tenant: Optional[str]) -> Dict[str, Any]:
+        if tenant:
+            body["tenant"] = tenant
+        return body
+
+    def query(self, query: str, tenant: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run a query through the graph.
+
+        Args:
+            query: User query
+            tenant: Tenant whose documents are searched; the service default when not given
+
+        Returns:
+            Dict with the final `answer`, `status`, `is_weather_query` and `location`
+        """
+        response = self.session.post(f"{self.base_url}/query", json=self._with_tenant({"query": query}, tenant),
+                                     timeout=self.timeout)
+        return self._check(response).json()
+
+    def stream(self, query: str, tenant: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield one event per completed graph node, then a final `result` event."""
+        with self.session.post(f"{self.base_url}/query/stream", json=self._with_tenant({"query": query}, tenant),
+                               timeout=self.timeout, stream=True) as response:
+            self._check(response)
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def batch(self, queries: List[str], tenant: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Run several queries concurrently on the service; results are in input order."""
+        response = self.session.post(f"{self.base_url}/query/batch",
+                                     json=self._with_tenant({"queries": queries}, tenant), timeout=self.timeout)
+        return self._check(response).json()["results"]
+
+    def ingest(self, files: List[Tuple[str, bytes]], profile: Optional[str] = None,
+               file_profiles: Optional[Dict[str, str]] = None, tenant: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Upload PDF files and queue an ingestion job.
+
+        Args:
+            files: List of (file name, file content) pairs
+            profile: Docling profile for the upload (fast, balanced or accurate);
+                the service default when not given
+            file_profiles: Per-file profile overrides, keyed by file name
+            tenant: Tenant the documents are ingested for; only its queries see them
+
+        Returns:
+            Dict describing the queued job, including its `job_id`
+        """
+        payload = [("files", (name, content, "application/pdf")) for name, content in files]
+        data = {}
+        if profile:
+            data["profile"] = profile
+        if file_profiles:
+            data["file_profiles"] = json.dumps(file_profiles)
+        if tenant:
+            data["tenant"] = tenant
+        response = self.session.post(f"{self.base_url}/ingest", files=payload, data=data, timeout=self.timeout)
+        return self._check(response).json()
+
+    def job(self, job_id: str) -> Dict[str, Any]:
+        """
+        Status of an ingestion job.
+
+        Returns:
+            Dict with `status` (queued, running, completed, failed or cancelled),
+            `error`, `elapsed_s` and per-stage `stages` progress
+        """
+        response = self.session.get(f"{self.base_url}/ingest/jobs/{job_id}", timeout=self.timeout)
+        return self._check(response).json()
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """Recent ingestion jobs, newest first."""
+        response = self.session.get(f"{self.base_url}/ingest/jobs", timeout=self.timeout)
+        return self._check(response).json()["jobs"]
+
+    def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        response = self.session.delete(f"{self.base_url}/ingest/jobs/{job_id}", timeout=self.timeout)
+        return self._check(response).json()
+
+    def profiles(self) -> Dict[str, Any]:
+        """Docling profiles the service offers, with `default` naming the one used when none is given."""
+        response = self.session.get(f"{self.base_url}/ingest/profiles", timeout=self.timeout)
+        return self._check(response).json()
+
+    def drop_tenant(self, tenant: str) -> Dict[str, Any]:
+        """Delete every document ingested for a tenant; returns the number of `points_deleted`."""
+        response = self.session.delete(f"{self.base_url}/tenants/{tenant}", timeout=self.timeout)
+        return self._check(response).json()
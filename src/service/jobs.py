@@ -0,0 +1,134 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from src.service.pool import BoundedPool
+from src.utils.ingest_progress import IngestionCancelled, IngestionProgress
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class IngestionJob:
+    """One background ingestion run over a set of uploaded files."""
+
+    def __init__(self, file_paths: List[str], work_dir: Optional[str] = None, options: Optional[Dict] = None):
+        self.id = uuid.uuid4().hex
+        self.file_paths = file_paths
+        self.work_dir = work_dir
+        # Keyword arguments passed on to the ingest callable (e.g. the Docling profile)
+        self.options = options or {}
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.progress = IngestionProgress()
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "files": [os.path.basename(path) for path in self.file_paths],
+            "options": self.options,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_s": round(end - self.started_at, 2) if self.started_at else 0.0,
+            "stages": self.progress.snapshot(self.started_at),
+            "report": self.progress.report(),
+        }
+
+
+class IngestionJobManager:
+    """
+    Runs ingestion jobs on a bounded worker pool and keeps their status.
+
+    Submitting raises `QueueFullError` when every worker and queue slot is
+    taken. Finished jobs are kept for status queries until `history` newer
+    jobs have been submitted.
+    """
+
+    def __init__(self, ingest: Callable[..., None], pool: BoundedPool,
+                 history: int = 100):
+        """
+        Args:
+            ingest: Callable running the pipeline over file paths, reporting to the progress
+                tracker, with the job's options as keyword arguments
+            pool: Worker pool the jobs run on
+            history: Number of jobs kept for status queries
+        """
+        self.ingest = ingest
+        self.pool = pool
+        self.history = history
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, file_paths: List[str], work_dir: Optional[str] = None,
+               options: Optional[Dict] = None) -> IngestionJob:
+        """
+        Queue an ingestion job.
+
+        Args:
+            file_paths: PDF files to ingest
+            work_dir: Directory holding the files, removed once the job finishes
+            options: Keyword arguments for the ingest callable
+
+        Returns:
+            The queued job
+        """
+        job = IngestionJob(file_paths, work_dir, options)
+        self.pool.submit_many_sync([lambda: self._run(job)])
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status not in FINISHED_STATES:
+                    break
+                self._jobs.popitem(last=False)
+        return job
+
+    def _run(self, job: IngestionJob):
+        try:
+            if job.progress.cancelled:
+                job.status = CANCELLED
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+            self.ingest(job.file_paths, job.progress, **job.options)
+            job.status = COMPLETED
+        except IngestionCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            if job.work_dir:
+                shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestionJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """Request cancellation; the pipeline stops at its next batch boundary."""
+        job = self.get(job_id)
+        if job is not None and job.status not in FINISHED_STATES:
+            job.progress.cancel()
+        return job
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List
+
+
+class QueueFullError(Exception):
+    """Raised when a pool has no free worker or queue slot for new work."""
+
+
+class BoundedPool:
+    """
+    Thread pool with a hard cap on running plus queued work.
+
+    A slot is held until the work actually finishes, even if the caller stopped
+    waiting because of a timeout, so admission always reflects real load.
+    """
+
+    def __init__(self, workers: int, queue_size: int, name: str):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _acquire(self, slots: int):
+        with self._lock:
+            if self._pending + slots > self.capacity:
+                raise QueueFullError(f"{self._pending} of {self.capacity} slots in use")
+            self._pending += slots
+
+    def _release(self, _=None):
+        with self._lock:
+            self._pending -= 1
+
+    def submit_many_sync(self, fns: List[Callable]) -> List[Future]:
+        """Admit all of `fns` or none of them, and return concurrent futures."""
+        self._acquire(len(fns))
+        futures = []
+        for fn in fns:
+            future = self.executor.submit(fn)
+            future.add_done_callback(self._release)
+            futures.append(future)
+        return futures
+
+    def submit_many(self, fns: List[Callable]) -> List[asyncio.Future]:
+        """Admit all of `fns` or none of them, and return awaitable futures."""
+        return [asyncio.wrap_future(future) for future in self.submit_many_sync(fns)]
+
+    def submit(self, fn: Callable) -> asyncio.Future:
+        return self.submit_many([fn])[0]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
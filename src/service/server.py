@@ -0,0 +1,388 @@
+"""
+Headless HTTP query service.
+
+Exposes the compiled graph (query, stream, batch) and document ingestion over
+HTTP, so the graph can be scaled horizontally behind a load balancer and the
+Streamlit app can act as a thin client. Ingestion runs as background jobs:
+POST /ingest returns a job id straight away and GET /ingest/jobs/{job_id}
+reports per-stage progress until the job finishes.
+
+Run with:
+    python -m src.service.server --host 0.0.0.0 --port 8000 --processes 2
+
+Settings (environment variables):
+    RAG_SERVICE_WORKERS         Graph executions run concurrently per process (default 8)
+    RAG_SERVICE_QUEUE_SIZE      Queries allowed to wait for a worker before 429 (default 32)
+    RAG_SERVICE_TIMEOUT         Seconds before a query returns 504, and the deadline of its provider calls (default 60)
+    RAG_SERVICE_COALESCE        Serve concurrent identical queries with one graph execution (default 1)
+    RAG_SERVICE_INGEST_WORKERS  Ingestion jobs executed concurrently (default 1)
+    RAG_SERVICE_INGEST_QUEUE_SIZE  Ingestion jobs allowed to wait before 429 (default 4)
+    RAG_SERVICE_WARMUP          Warm up clients and connections in the background at start-up (default 1)
+    RAG_SERVICE_WARMUP_INGESTION  Also preload Docling during warm-up (default 0)
+    WEATHER_REFRESH             Keep the weather of popular locations warm in the background (default 1)
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+
+from src.graphs.builder import build_graph
+from src.graphs.speculative import SPECULATIVE_RETRIEVAL, get_prefetcher
+from src.graphs.type import RAGAgentState, initial_state
+from src.utils import docling_shards, embeddings, resilience
+from src.utils.docling_profiles import PROFILES, DEFAULT_PROFILE, validate_profiles
+from src.utils.llm_cache import get_llm_cache
+from src.utils.ingest_progress import IngestionProgress
+from src.utils.tenancy import validate_tenant
+from src.utils.weather_cache import WEATHER_REFRESH, get_weather_cache
+from src.utils.warmup import start_warm_up
+from src.service.jobs import IngestionJobManager
+from src.service.pool import BoundedPool, QueueFullError
+from src.service.singleflight import SingleFlight, normalize_query
+
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("RAG_SERVICE_WORKERS", "8"))
+QUEUE_SIZE = int(os.getenv("RAG_SERVICE_QUEUE_SIZE", "32"))
+REQUEST_TIMEOUT = float(os.getenv("RAG_SERVICE_TIMEOUT", "60"))
+COALESCE = os.getenv("RAG_SERVICE_COALESCE", "1") == "1"
+INGEST_WORKERS = int(os.getenv("RAG_SERVICE_INGEST_WORKERS", "1"))
+INGEST_QUEUE_SIZE = int(os.getenv("RAG_SERVICE_INGEST_QUEUE_SIZE", "4"))
+WARMUP = os.getenv("RAG_SERVICE_WARMUP", "1") == "1"
+WARMUP_INGESTION = os.getenv("RAG_SERVICE_WARMUP_INGESTION", "0") == "1"
+
+# Fields of the final graph state returned to clients.
+RESPONSE_FIELDS = ("answer", "status", "is_weather_query", "location", "error")
+
+
+class TenantRequest(BaseModel):
+    # Documents searched are those ingested for this tenant; the default tenant if not given
+    tenant: Optional[str] = None
+
+    @field_validator("tenant")
+    @classmethod
+    def _check_tenant(cls, tenant: Optional[str]) -> Optional[str]:
+        return validate_tenant(tenant) if tenant else None
+
+
+class QueryRequest(TenantRequest):
+    query: str = Field(min_length=1)
+
+
+class BatchQueryRequest(TenantRequest):
+    queries: List[str] = Field(min_length=1)
+
+
+def _response(state: Dict) -> Dict:
+    return {key: state.get(key) for key in RESPONSE_FIELDS}
+
+
+def _default_ingest(file_paths: List[str], progress: IngestionProgress, profile: Optional[str] = None,
+                    file_profiles: Optional[Dict[str, str]] = None, tenant: Optional[str] = None):
+    from src.utils.ingest_pdf_docling_genaiembeddings import IngestPDF
+    IngestPDF().run_ingestion_pipeline(file_paths, progress, profile=profile, file_profiles=file_profiles,
+                                       tenant=tenant)
+
+
+def _default_drop_tenant(tenant: str) -> int:
+    from src.utils.clients import get_qdrant_client
+    from src.utils.tenancy import drop_tenant
+    return drop_tenant(get_qdrant_client(), "uploaded-pdfs", tenant)
+
+
+def upload_name(filename: Optional[str]) -> str:
+    """
+    File name an upload is saved and reported under: the last component of
+    the client's name, with either path separator.
+
+    Raises:
+        ValueError: If the name does not name a file (empty, ".", ".." or ending in a separator)
+    """
+    name = (filename or "").replace("\\", "/").rsplit("/", 1)[-1].strip()
+    if name in ("", ".", ".."):
+        raise ValueError(f"Upload file name {filename!r} is not a file name")
+    return name
+
+
+def _save_uploads(files: List[UploadFile], temp_dir: str) -> List[str]:
+    """
+    Copy uploaded files to disk, each in its own directory so uploads with the
+    same name do not overwrite each other while keeping the name ingestion
+    reports and matches `file_profiles` against.
+
+    Returns:
+        Paths of the saved files, in upload order
+    """
+    file_paths = []
+    for index, upload in enumerate(files):
+        file_dir = os.path.join(temp_dir, str(index))
+        os.makedirs(file_dir)
+        file_path = os.path.join(file_dir, upload_name(upload.filename))
+        with open(file_path, "wb") as f:
+            shutil.copyfileobj(upload.file, f)
+        file_paths.append(file_path)
+    return file_paths
+
+
+def create_app(graph=None, ingest: Optional[Callable[..., None]] = None,
+               workers: int = WORKERS, queue_size: int = QUEUE_SIZE, timeout: float = REQUEST_TIMEOUT,
+               ingest_workers: int = INGEST_WORKERS, ingest_queue_size: int = INGEST_QUEUE_SIZE,
+               warmup: Optional[bool] = None, drop_tenant: Optional[Callable[[str], int]] = None,
+               coalesce: bool = COALESCE, weather_refresh: Optional[bool] = None) -> FastAPI:
+    """
+    Create the service application.
+
+    Args:
+        graph: Compiled graph to serve. Defaults to `build_graph(RAGAgentState)`.
+        ingest: Callable that ingests a list of PDF file paths, reporting to an
+            `IngestionProgress`, and accepts `profile`, `file_profiles` and `tenant`
+            keyword arguments. Defaults to the Docling + Gemini pipeline.
+        workers, queue_size, timeout: Query pool size, extra queued queries
+            allowed before returning 429, and per-request timeout in seconds.
+        ingest_workers, ingest_queue_size: Concurrent ingestion jobs and extra
+            queued jobs allowed before returning 429.
+        warmup: Warm up provider clients in the background at start-up.
+            Defaults to RAG_SERVICE_WARMUP when serving the default graph.
+        drop_tenant: Callable that deletes a tenant's documents and returns
+            the number of points deleted. Defaults to dropping it from Qdrant.
+        coalesce: Serve concurrent identical queries (same tenant, same query up
+            to case and whitespace) from one graph execution.
+        weather_refresh: Keep the current weather of popular locations fresh
+            in the background. Defaults to WEATHER_REFRESH when serving the default graph.
+
+    Returns:
+        FastAPI application
+    """
+    if warmup is None:
+        warmup = WARMUP and graph is None
+    if weather_refresh is None:
+        weather_refresh = WEATHER_REFRESH and graph is None
+    graph = graph if graph is not None else build_graph(RAGAgentState)
+    ingest = ingest or _default_ingest
+    drop_tenant = drop_tenant or _default_drop_tenant
+    query_pool = BoundedPool(workers, queue_size, "query")
+    ingest_pool = BoundedPool(ingest_workers, ingest_queue_size, "ingest")
+    jobs = IngestionJobManager(ingest, ingest_pool)
+    flights = SingleFlight() if coalesce else None
+    refresher = None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        nonlocal refresher
+        if warmup:
+            start_warm_up(include_ingestion=WARMUP_INGESTION)
+        if weather_refresh:
+            from src.utils.openweather import start_weather_refresher
+            try:
+                refresher = start_weather_refresher()
+            except ValueError as e:
+                logger.warning("Weather refresher not started: %s", e)
+        yield
+        if refresher is not None:
+            refresher.stop()
+        query_pool.shutdown()
+        ingest_pool.shutdown()
+        docling_shards.shutdown()
+        embeddings.shutdown()
+
+    app = FastAPI(title="AI Assistant Query Service", lifespan=lifespan)
+
+    def admit(pool: BoundedPool, fns: List[Callable]) -> List[asyncio.Future]:
+        try:
+            return pool.submit_many(fns)
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail=f"Server busy: {e}", headers={"Retry-After": "1"})
+
+    def run_queries(queries: List[str], tenant: Optional[str]) -> List:
+        """Admit graph executions for the queries, joining identical ones already in flight."""
+        # Provider calls give up when the request would time out, queueing time included
+        deadline = time.time() + timeout
+        fns = [lambda q=q: graph.invoke(initial_state(q, tenant, deadline)) for q in queries]
+        if flights is None:
+            return admit(query_pool, fns)
+        tenant = validate_tenant(tenant)
+        keys = [(tenant, normalize_query(q)) for q in queries]
+        return flights.join(keys, lambda indexes: admit(query_pool, [fns[i] for i in indexes]))
+
+    @app.get("/health")
+    def health():
+        return {
+            "status": "ok",
+            "queries_pending": query_pool.pending,
+            "query_capacity": query_pool.capacity,
+            "ingestions_pending": ingest_pool.pending,
+            "ingest_capacity": ingest_pool.capacity,
+            "llm_cache": get_llm_cache().stats(),
+            "resilience": resilience.stats(),
+            "weather_cache": {**get_weather_cache().stats(),
+                              **({"refresher": refresher.stats()} if refresher is not None else {})},
+            **({"coalescing": flights.stats()} if flights is not None else {}),
+            **({"speculative_retrieval": get_prefetcher().stats()} if SPECULATIVE_RETRIEVAL else {}),
+        }
+
+    @app.post("/query")
+    async def query(request: QueryRequest):
+        future = run_queries([request.query], request.tenant)[0]
+        try:
+            state = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"Query timed out after {timeout:g}s")
+        return _response(state)
+
+    @app.post("/query/batch")
+    async def query_batch(request: BatchQueryRequest):
+        futures = run_queries(request.queries, request.tenant)
+        try:
+            states = await asyncio.wait_for(asyncio.gather(*futures), timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"Batch timed out after {timeout:g}s")
+        return {"results": [_response(state) for state in states]}
+
+    @app.post("/query/stream")
+    async def query_stream(request: QueryRequest):
+        """Stream one NDJSON line per completed node, then the final result."""
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        done = object()
+        deadline = time.time() + timeout
+
+        def run():
+            try:
+                state = initial_state(request.query, request.tenant, deadline)
+                for update in graph.stream(state, stream_mode="updates"):
+                    for node, node_state in update.items():
+                        loop.call_soon_threadsafe(events.put_nowait, (node, node_state or {}))
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, done)
+
+        future = admit(query_pool, [run])[0]
+
+        async def body():
+            deadline = loop.time() + timeout
+            final: Dict = {}
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    yield json.dumps({"event": "error", "detail": f"Query timed out after {timeout:g}s"}) + "\n"
+                    return
+                if event is done:
+                    break
+                node, node_state = event
+                final.update(node_state)
+                yield json.dumps({"event": "node", "node": node, "status": node_state.get("status")}) + "\n"
+            try:
+                await future
+            except Exception as e:
+                yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+                return
+            yield json.dumps({"event": "result", **_response(final)}) + "\n"
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    @app.post("/ingest", status_code=202)
+    async def ingest_files(files: List[UploadFile] = File(...), profile: Optional[str] = Form(None),
+                           file_profiles: Optional[str] = Form(None), tenant: Optional[str] = Form(None)):
+        """
+        Queue an ingestion job for the uploaded files and return its id.
+
+        `profile` selects the Docling profile for the upload; `file_profiles`
+        is a JSON object of per-file overrides keyed by file name. The
+        documents are only searchable by queries of the same `tenant`.
+        """
+        try:
+            file_profiles = json.loads(file_profiles) if file_profiles else {}
+            if not isinstance(file_profiles, dict):
+                raise ValueError("file_profiles must be a JSON object of file name to profile")
+            validate_profiles([profile, *file_profiles.values()])
+            validate_tenant(tenant)
+            for upload in files:
+                upload_name(upload.filename)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        options = {}
+        if profile:
+            options["profile"] = profile
+        if file_profiles:
+            options["file_profiles"] = file_profiles
+        if tenant:
+            options["tenant"] = tenant
+
+        temp_dir = tempfile.mkdtemp()
+        # Copying the uploads blocks, so it runs off the event loop
+        file_paths = await run_in_threadpool(_save_uploads, files, temp_dir)
+
+        try:
+            job = jobs.submit(file_paths, work_dir=temp_dir, options=options)
+        except QueueFullError as e:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise HTTPException(status_code=429, detail=f"Server busy: {e}", headers={"Retry-After": "5"})
+        return job.to_dict()
+
+    @app.delete("/tenants/{tenant}")
+    def delete_tenant(tenant: str):
+        """Delete every document ingested for a tenant."""
+        try:
+            validate_tenant(tenant)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return {"tenant": tenant, "points_deleted": drop_tenant(tenant)}
+
+    @app.get("/ingest/profiles")
+    def list_ingest_profiles():
+        return {"default": DEFAULT_PROFILE, "profiles": {name: p.to_dict() for name, p in PROFILES.items()}}
+
+    @app.get("/ingest/jobs")
+    def list_ingest_jobs():
+        return {"jobs": [job.to_dict() for job in jobs.list()]}
+
+    @app.get("/ingest/jobs/{job_id}")
+    def get_ingest_job(job_id: str):
+        job = jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown ingestion job {job_id}")
+        return job.to_dict()
+
+    @app.delete("/ingest/jobs/{job_id}")
+    def cancel_ingest_job(job_id: str):
+        """Cancel a queued or running job; it stops at the next batch boundary."""
+        job = jobs.cancel(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown ingestion job {job_id}")
+        return job.to_dict()
+
+    return app
+
+
+app = create_app()
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the AI Assistant query service")
+    parser.add_argument("--host", default=os.getenv("RAG_SERVICE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("RAG_SERVICE_PORT", "8000")))
+    parser.add_argument("--processes", type=int, default=int(os.getenv("RAG_SERVICE_PROCESSES", "1")),
+                        help="Number of server processes")
+    args = parser.parse_args()
+
+    uvicorn.run("src.service.server:app", host=args.host, port=args.port, workers=args.processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import asyncio
+import re
+from typing import Any, Callable, Dict, Hashable, List, Sequence
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, under which identical questions coalesce."""
+    return re.sub(r"\s+", " ", query).strip().casefold()
+
+
+class _Flight:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent executions of identical work.
+
+    Requests for a key that is already in flight wait for the running
+    execution instead of starting another one, so one execution serves every
+    concurrent waiter. Waiters are cancellation-safe: a waiter that is
+    cancelled (timeout, client disconnect) stops waiting without cancelling
+    the execution the others share; only when every waiter is gone is the
+    execution cancelled, which drops it if it has not started yet.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.requests = 0
+        self.executions = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def join(self, keys: Sequence[Hashable], start: Callable[[List[int]], List[asyncio.Future]]) -> List[Any]:
+        """
+        Join or start the executions for `keys`.
+
+        Args:
+            keys: Coalescing key per request; repeated keys share one execution
+            start: Starts the executions of the requests at the given indexes
+                (the first request of each key not in flight) and returns their
+                futures. If it raises (e.g. admission fails), nothing is joined.
+
+        Returns:
+            One awaitable per key, resolving to its execution's result
+        """
+        new: Dict[Hashable, int] = {}
+        for index, key in enumerate(keys):
+            if key not in self._flights and key not in new:
+                new[key] = index
+        futures = start(list(new.values())) if new else []
+        for key, future in zip(new, futures):
+            flight = self._flights[key] = _Flight(future)
+            future.add_done_callback(lambda f, key=key, flight=flight: self._landed(key, flight))
+        self.requests += len(keys)
+        self.executions += len(new)
+
+        flights = [self._flights[key] for key in keys]
+        for flight in flights:
+            flight.waiters += 1
+        return [self._wait(flight) for flight in flights]
+
+    def _landed(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.future.cancelled():
+            # Retrieved here so an execution nobody waits for anymore does not log an unretrieved error
+            flight.future.exception()
+
+    @staticmethod
+    async def _wait(flight: _Flight):
+        try:
+            return await asyncio.shield(flight.future)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.future.done():
+                flight.future.cancel()
+
+    def stats(self) -> dict:
+        """Requests, executions, and the share of requests served by another request's execution."""
+        coalesced = self.requests - self.executions
+        return {
+            "requests": self.requests,
+            "executions": self.executions,
+            "coalesced": coalesced,
+            "coalescing_ratio": round(coalesced / self.requests, 4) if self.requests else 0.0,
+            "in_flight": self.in_flight,
+        }
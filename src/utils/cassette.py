@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+MODES = ("off", "record", "replay")
+DEFAULT_CASSETTE_PATH = os.path.join("evals", "cassettes", "graph.jsonl")
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a call has no recorded response."""
+
+
+def content_hash(*parts: Any) -> str:
+    """Stable SHA-256 of JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    Record/replay store for external calls (LLM, embedding, vector search, weather API).
+
+    - off: calls go straight to the provider.
+    - record: calls go to the provider and responses are appended to the cassette.
+    - replay: responses are served from the cassette; a call that was never
+      recorded raises `CassetteMissError` instead of reaching the network.
+
+    Calls are keyed by a hash of their kind and request, so replays are
+    deterministic as long as the prompts and inputs are unchanged.
+    """
+
+    def __init__(self, path: str = DEFAULT_CASSETTE_PATH, mode: str = "off"):
+        if mode not in MODES:
+            raise ValueError(f"Invalid cassette mode '{mode}'. Expected one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self._entries: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        if mode != "off" and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry["response"]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def call(self, kind: str, request: Any, fn: Callable[[], Any]) -> Any:
+        """
+        Run `fn` through the cassette.
+
+        Args:
+            kind: Call category, e.g. "llm", "embedding", "search", "weather"
+            request: JSON-serializable description of everything that determines the response
+            fn: Performs the real call; its result must be JSON-serializable
+
+        Returns:
+            The recorded or live response
+        """
+        if self.mode == "off":
+            return fn()
+
+        key = content_hash(kind, request)
+        if key in self._entries:
+            return self._entries[key]
+        if self.mode == "replay":
+            raise CassetteMissError(f"No recorded {kind} response in {self.path} (key {key[:12]})")
+
+        response = fn()
+        with self._lock:
+            self._entries[key] = response
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "kind": kind, "response": response}, ensure_ascii=False) + "\n")
+        return response
+
+
+_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Cassette:
+    """
+    Process-wide cassette, configured from RAG_CASSETTE_MODE (off/record/replay)
+    and RAG_CASSETTE_PATH unless `configure_cassette` was called first.
+    """
+    global _cassette
+    if _cassette is None:
+        _cassette = Cassette(
+            path=os.getenv("RAG_CASSETTE_PATH", DEFAULT_CASSETTE_PATH),
+            mode=os.getenv("RAG_CASSETTE_MODE", "off"),
+        )
+    return _cassette
+
+
+def configure_cassette(mode: str, path: Optional[str] = None) -> Cassette:
+    """Replace the process-wide cassette."""
+    global _cassette
+    _cassette = Cassette(path=path or os.getenv("RAG_CASSETTE_PATH", DEFAULT_CASSETTE_PATH), mode=mode)
+    return _cassette
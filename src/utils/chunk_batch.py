@@ -0,0 +1,121 @@
+"""
+Columnar in-memory representation of the chunks of an ingestion run.
+
+A file of a few thousand chunks used to be held as a list of dicts, each
+with its own metadata dict, and its vectors as lists of boxed floats. A
+`ChunkBatch` keeps:
+- the chunk texts in one list
+- each distinct metadata dict once, in a table shared by all its slices,
+  with an int32 index per chunk (the chunks of a section share their
+  `Header_1`/`Header_2` metadata)
+- optionally, the vectors as one contiguous float32 matrix
+
+so the per-chunk overhead is a string and an array entry. Payload dicts for
+Qdrant are only built per upload batch (`payloads`) and dropped after it.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class Chunk:
+    """One chunk of a `ChunkBatch`; its metadata is shared and must not be modified."""
+
+    __slots__ = ("text", "metadata")
+
+    def __init__(self, text: str, metadata: Dict):
+        self.text = text
+        self.metadata = metadata
+
+    def to_dict(self) -> Dict:
+        return {"text": self.text, "metadata": dict(self.metadata)}
+
+
+class ChunkBatch:
+    """Chunk texts with interned metadata and, once embedded, their float32 vectors."""
+
+    __slots__ = ("texts", "metadata_ids", "metadata_table", "_metadata_index", "vectors")
+
+    def __init__(self, metadata_table: Optional[List[Dict]] = None):
+        """
+        Args:
+            metadata_table: Distinct metadata dicts to share with another batch
+        """
+        self.texts: List[str] = []
+        self.metadata_ids = np.zeros(0, dtype=np.int32)
+        self.metadata_table: List[Dict] = metadata_table if metadata_table is not None else []
+        self._metadata_index: Optional[Dict[Tuple, int]] = None
+        self.vectors: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Dict]) -> "ChunkBatch":
+        """
+        Build a batch from `{"text", "metadata"}` dicts, e.g. streamed from the chunker.
+
+        Each dict can be dropped as soon as it was added, so a whole file's
+        chunk dicts never exist at the same time.
+        """
+        batch = cls()
+        texts = batch.texts
+        ids: List[int] = []
+        for chunk in chunks:
+            texts.append(chunk["text"])
+            ids.append(batch._intern(chunk["metadata"]))
+        batch.metadata_ids = np.asarray(ids, dtype=np.int32)
+        return batch
+
+    def _intern(self, metadata: Dict) -> int:
+        if self._metadata_index is None:
+            self._metadata_index = {tuple(sorted(entry.items())): i for i, entry in enumerate(self.metadata_table)}
+        key = tuple(sorted(metadata.items()))
+        index = self._metadata_index.get(key)
+        if index is None:
+            index = self._metadata_index[key] = len(self.metadata_table)
+            self.metadata_table.append(dict(metadata))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __iter__(self) -> Iterator[Chunk]:
+        table = self.metadata_table
+        for text, index in zip(self.texts, self.metadata_ids.tolist()):
+            yield Chunk(text, table[index])
+
+    def __getitem__(self, index: int) -> Chunk:
+        return Chunk(self.texts[index], self.metadata_table[self.metadata_ids[index]])
+
+    def slice(self, start: int, stop: int) -> "ChunkBatch":
+        """Chunks `start` to `stop`, sharing this batch's metadata table (and a view of its vectors)."""
+        batch = ChunkBatch(self.metadata_table)
+        batch.texts = self.texts[start:stop]
+        batch.metadata_ids = self.metadata_ids[start:stop]
+        if self.vectors is not None:
+            batch.vectors = self.vectors[start:stop]
+        return batch
+
+    def payloads(self, common: Dict) -> List[Dict]:
+        """
+        Qdrant payloads of the chunks: `page_content` and the metadata, with
+        the `common` fields (source, file hash, timestamp) and `chunk_size` first.
+        """
+        table = self.metadata_table
+        return [
+            {"page_content": text, "metadata": {**common, "chunk_size": len(text), **table[index]}}
+            for text, index in zip(self.texts, self.metadata_ids.tolist())
+        ]
+
+    def to_dict(self) -> Dict:
+        """Columnar JSON-serializable form, as stored in checkpoints."""
+        return {
+            "texts": self.texts,
+            "metadata_ids": self.metadata_ids.tolist(),
+            "metadata_table": self.metadata_table,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ChunkBatch":
+        batch = cls(data["metadata_table"])
+        batch.texts = data["texts"]
+        batch.metadata_ids = np.asarray(data["metadata_ids"], dtype=np.int32)
+        return batch
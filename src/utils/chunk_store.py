@@ -0,0 +1,248 @@
+"""
+Local store of chunk texts, for collections with slim Qdrant payloads.
+
+By default every Qdrant point carries its chunk's `page_content` (up to 2000
+characters) and metadata in its payload, which Qdrant keeps in memory and
+returns with every hit. With RAG_SLIM_PAYLOADS=1 ingestion only stores the
+filterable fields in Qdrant (`metadata.tenant_id`, `metadata.file_hash`) and
+writes the text and metadata here, keyed by point id; the retriever resolves
+hits whose payload has no `page_content` from this store.
+
+Each collection has a directory under `root` with
+- `chunks.dat`: zlib-compressed JSON records, appended and read through a
+  read-only memory map
+- `index.sqlite`: point id -> offset and length of its record, with the
+  tenant and file hash the point belongs to, so a file's or a tenant's
+  chunks are deleted together with their points
+
+Records that are overwritten or deleted stay in `chunks.dat` until
+`compact()` rewrites it; `stats()` reports the bytes they take.
+
+The store may be shared by several service processes (`--processes N`, or a
+shared volume). Appends and compaction hold an exclusive `flock` on
+`chunks.lock` from writing the data file until the index is committed, and
+reads hold a shared one, so an offset in the index always points at its own
+record. Without `fcntl` (Windows) only one process may use a store.
+
+Settings (environment variables):
+    RAG_SLIM_PAYLOADS      Ingest new points with slim payloads and their text in this store (default 0)
+    RAG_CHUNK_STORE_DIR    Root directory of the stores (default .chunk_store)
+"""
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SLIM_PAYLOADS = os.getenv("RAG_SLIM_PAYLOADS", "0") == "1"
+CHUNK_STORE_DIR = os.getenv("RAG_CHUNK_STORE_DIR", ".chunk_store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_file ON chunks (tenant, file_hash);
+"""
+
+
+def slim_payload(tenant: str, file_hash: str) -> Dict:
+    """Qdrant payload of a point whose text is in the chunk store: only the fields searches filter on."""
+    return {"metadata": {"tenant_id": tenant, "file_hash": file_hash}}
+
+
+class ChunkStore:
+    """Compressed, memory-mapped chunk records of one collection, keyed by Qdrant point id."""
+
+    def __init__(self, collection_name: str, root: str = CHUNK_STORE_DIR, level: int = 6):
+        """
+        Args:
+            collection_name: Collection whose chunks are stored
+            root: Root directory of the stores
+            level: zlib compression level of new records
+        """
+        self.path = os.path.join(root, collection_name)
+        self.data_path = os.path.join(self.path, "chunks.dat")
+        self.index_path = os.path.join(self.path, "index.sqlite")
+        self.lock_path = os.path.join(self.path, "chunks.lock")
+        self.level = level
+        # Serializes threads; `_locked` adds the lock between processes
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_inode: Optional[int] = None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.index_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.path, exist_ok=True)
+            conn = sqlite3.connect(self.index_path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the store's lock shared with other processes (exclusive for writers). Hold `_lock` first."""
+        if fcntl is None:
+            yield
+            return
+        if self._lock_file is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._lock_file = open(self.lock_path, "a+b")
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _view(self, end: int) -> mmap.mmap:
+        """Memory map of the data file covering `end`, remapped when it grew or was compacted."""
+        stat = os.stat(self.data_path)
+        if self._map is None or self._mapped_inode != stat.st_ino or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            with open(self.data_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_inode = stat.st_ino
+        return self._map
+
+    def put_many(self, ids: List[str], records: List[Dict], tenant: str, file_hash: str):
+        """
+        Store the `{"page_content", "metadata"}` records of points, replacing earlier ones with the same ids.
+
+        Records are durable before this returns, so they can be written before
+        their points are uploaded and a point is never searchable without its text.
+        """
+        blobs = [zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"), self.level)
+                 for record in records]
+        with self._lock, self._locked(exclusive=True):
+            conn = self._connect()
+            with open(self.data_path, "ab") as f:
+                offset = f.tell()
+                for blob in blobs:
+                    f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            rows = []
+            for point_id, blob in zip(ids, blobs):
+                rows.append((str(point_id), tenant, file_hash, offset, len(blob)))
+                offset += len(blob)
+            conn.execute("BEGIN")
+            conn.executemany("INSERT OR REPLACE INTO chunks (id, tenant, file_hash, offset, length) "
+                             "VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Dict]:
+        """Records of the given point ids; ids that are not stored are left out."""
+        ids = [str(point_id) for point_id in ids]
+        if not ids or not self.exists():
+            return {}
+        with self._lock, self._locked(exclusive=False):
+            rows = self._connect().execute(
+                f"SELECT id, offset, length FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+            if not rows:
+                return {}
+            view = self._view(max(offset + length for _, offset, length in rows))
+            blobs = {point_id: view[offset:offset + length] for point_id, offset, length in rows}
+        return {point_id: json.loads(zlib.decompress(blob)) for point_id, blob in blobs.items()}
+
+    def _delete(self, where: str, params: tuple) -> int:
+        if not self.exists():
+            return 0
+        with self._lock:
+            return self._connect().execute(f"DELETE FROM chunks WHERE {where}", params).rowcount
+
+    def delete_file(self, file_hash: str, tenant: str) -> int:
+        """Delete a tenant's records of a file; returns the number deleted."""
+        return self._delete("tenant = ? AND file_hash = ?", (tenant, file_hash))
+
+    def drop_tenant(self, tenant: str) -> int:
+        """Delete every record of a tenant; returns the number deleted."""
+        return self._delete("tenant = ?", (tenant,))
+
+    def compact(self) -> int:
+        """
+        Rewrite the data file with only the live records.
+
+        Returns:
+            Bytes reclaimed
+        """
+        if not self.exists():
+            return 0
+        with self._lock, self._locked(exclusive=True):
+            conn = self._connect()
+            before = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+            rows = conn.execute("SELECT id, offset, length FROM chunks ORDER BY offset").fetchall()
+            view = self._view(max((offset + length for _, offset, length in rows), default=0)) if rows else None
+            temp_path = self.data_path + ".compact"
+            moved, offset = [], 0
+            with open(temp_path, "wb") as f:
+                for point_id, old_offset, length in rows:
+                    f.write(view[old_offset:old_offset + length])
+                    moved.append((offset, point_id))
+                    offset += length
+                f.flush()
+                os.fsync(f.fileno())
+            conn.execute("BEGIN")
+            conn.executemany("UPDATE chunks SET offset = ? WHERE id = ?", moved)
+            os.replace(temp_path, self.data_path)
+            conn.execute("COMMIT")
+        return before - offset
+
+    def stats(self) -> dict:
+        """Records stored, their compressed size, and the size of the data file including dead records."""
+        if not self.exists():
+            return {"records": 0, "bytes": 0, "file_bytes": 0}
+        with self._lock:
+            records, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks"
+            ).fetchone()
+        file_bytes = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        return {"records": records, "bytes": size, "file_bytes": file_bytes}
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+
+_stores: Dict[str, ChunkStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_chunk_store(collection_name: str) -> ChunkStore:
+    """Process-wide chunk store of a collection under RAG_CHUNK_STORE_DIR."""
+    with _stores_lock:
+        if collection_name not in _stores:
+            _stores[collection_name] = ChunkStore(collection_name)
+        return _stores[collection_name]
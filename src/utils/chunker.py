@@ -0,0 +1,290 @@
+"""
+Single-pass, token-aware Markdown chunker.
+
+Walks the converted Markdown once, line by line, and emits chunk dicts
+(`text`, `metadata`) directly instead of building header sections and then
+re-splitting them. It:
+- tracks the `#`/`##` header breadcrumbs and records them as `Header_1` and
+  `Header_2` metadata (the same keys `MarkdownHeaderTextSplitter` produced)
+- bounds chunks by estimated embedding-model tokens rather than characters
+- keeps Markdown tables and fenced code blocks atomic; a table larger than a
+  whole chunk is split between rows with its header row repeated
+- packs consecutive small `##` sections of the same `#` section into one
+  chunk, keeping their headings in the text, instead of emitting one tiny
+  chunk per section
+- carries `chunk_overlap` tokens of text into the next chunk when a section
+  is split
+"""
+import os
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Chunk budget and overlap in estimated tokens of the embedding model
+CHUNK_TOKENS = int(os.getenv("INGEST_CHUNK_TOKENS", "512"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("INGEST_CHUNK_OVERLAP_TOKENS", "16"))
+# Changes whenever the chunk boundaries produced for the same input change
+CHUNKER_VERSION = "tokens-1"
+
+HEADING = "heading"
+TABLE = "table"
+CODE = "code"
+TEXT = "text"
+
+_WORD = re.compile(r"\w+", re.ASCII)
+_PARAGRAPH = re.compile(r"\n[ \t]*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of subword tokens of a text.
+
+    Counts a token per punctuation mark or non-ASCII character and about one
+    per four characters of each ASCII word, which slightly overestimates
+    SentencePiece/BPE tokenizers on English text, so chunks stay within the
+    budget. Runs in a few C-level string passes rather than a Python loop per word.
+    """
+    rest, words = _WORD.subn("", text)
+    punctuation = len(rest) - rest.count(" ") - rest.count("\n") - rest.count("\t")
+    return punctuation - (-(len(text) - len(rest) + 3 * words) // 4)
+
+
+def _blocks(markdown: str) -> Iterator[Tuple[str, str]]:
+    """
+    Group lines into (kind, text) blocks: headings, tables, fenced code and paragraphs.
+
+    Paragraphs without table, heading or code-fence markers, i.e. most of a
+    document, are yielded whole without looking at their lines one by one.
+    """
+    kind = None
+    lines: List[str] = []
+    for paragraph in _PARAGRAPH.split(markdown):
+        if kind != CODE and "|" not in paragraph and "#" not in paragraph and "```" not in paragraph:
+            if lines:
+                yield kind, "\n".join(lines)
+                kind, lines = None, []
+            paragraph = paragraph.strip()
+            if paragraph:
+                yield TEXT, paragraph
+            continue
+        # The empty line ends the paragraph; inside a code block it is kept
+        for line in paragraph.splitlines() + [""]:
+            stripped = line.strip()
+            if kind == CODE:
+                lines.append(line)
+                if stripped.startswith("```"):
+                    yield CODE, "\n".join(lines)
+                    kind, lines = None, []
+                continue
+            if stripped.startswith("```"):
+                if lines:
+                    yield kind, "\n".join(lines)
+                kind, lines = CODE, [line]
+            elif stripped.startswith("|"):
+                if kind != TABLE and lines:
+                    yield kind, "\n".join(lines)
+                    lines = []
+                kind = TABLE
+                lines.append(stripped)
+            elif stripped.startswith(("# ", "## ")):
+                if lines:
+                    yield kind, "\n".join(lines)
+                yield HEADING, stripped
+                kind, lines = None, []
+            elif not stripped:
+                if lines:
+                    yield kind, "\n".join(lines)
+                kind, lines = None, []
+            else:
+                if kind == TABLE and lines:
+                    yield kind, "\n".join(lines)
+                    lines = []
+                kind = TEXT
+                lines.append(stripped)
+    if lines:
+        yield kind, "\n".join(lines)
+
+
+class MarkdownChunker:
+    """Token-bounded chunker over Markdown with header breadcrumbs and atomic tables."""
+
+    def __init__(self, chunk_size: int = CHUNK_TOKENS, chunk_overlap: int = CHUNK_OVERLAP_TOKENS,
+                 count_tokens: Callable[[str], int] = estimate_tokens, merge_sections: bool = True):
+        """
+        Args:
+            chunk_size: Maximum tokens per chunk. Only a single table row or
+                code block larger than this can exceed it.
+            chunk_overlap: Tokens of text repeated at the start of the next
+                chunk when a section is split
+            count_tokens: Token counter, e.g. the embedding model's tokenizer
+            merge_sections: Pack small `##` sections of the same `#` section together
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.count_tokens = count_tokens
+        self.merge_sections = merge_sections
+
+    def split(self, markdown: str) -> List[Dict]:
+        """Chunk a Markdown document into a list of `{"text", "metadata"}` dicts."""
+        return list(self.iter_chunks(markdown))
+
+    def iter_chunks(self, markdown: str) -> Iterator[Dict]:
+        """Chunk a Markdown document, yielding `{"text", "metadata"}` dicts in document order."""
+        headers: Dict[str, str] = {}
+        # Blocks of the chunk being built, as (kind, text, tokens)
+        buffer: List[Tuple[str, str, int]] = []
+        buffer_tokens = 0
+        buffer_headers: Dict[str, str] = {}
+
+        def emit(carry_overlap: bool) -> Iterator[Dict]:
+            nonlocal buffer, buffer_tokens, buffer_headers
+            # Headings at the end belong to the next chunk, whose metadata carries them;
+            # text of the previous section is then not carried over either
+            while buffer and buffer[-1][0] == HEADING:
+                buffer.pop()
+                carry_overlap = False
+            if buffer:
+                yield {"text": "\n\n".join(text for _, text, _ in buffer), "metadata": dict(buffer_headers)}
+            overlap = self._overlap(buffer[-1]) if carry_overlap and buffer else None
+            buffer = [overlap] if overlap else []
+            buffer_tokens = overlap[2] if overlap else 0
+            buffer_headers = dict(headers)
+
+        def add(kind: str, text: str, tokens: int) -> Iterator[Dict]:
+            nonlocal buffer_tokens, buffer_headers
+            if buffer and buffer_tokens + tokens > self.chunk_size:
+                yield from emit(carry_overlap=True)
+            if not buffer:
+                buffer_headers = dict(headers)
+            buffer.append((kind, text, tokens))
+            buffer_tokens += tokens
+
+        for kind, text in _blocks(markdown):
+            if kind == HEADING:
+                level = "Header_1" if text.startswith("# ") else "Header_2"
+                title = text.lstrip("#").strip()
+                if level == "Header_1" or not self.merge_sections:
+                    yield from emit(carry_overlap=False)
+                    if level == "Header_1":
+                        headers.pop("Header_2", None)
+                    headers[level] = title
+                    buffer_headers = dict(headers)
+                    continue
+                headers["Header_2"] = title
+                tokens = self.count_tokens(text)
+                if buffer and buffer_tokens + tokens < self.chunk_size:
+                    # Keep the heading in the text of a chunk that packs several sections
+                    buffer.append((HEADING, text, tokens))
+                    buffer_tokens += tokens
+                else:
+                    yield from emit(carry_overlap=False)
+                continue
+
+            tokens = self.count_tokens(text)
+            if tokens <= self.chunk_size:
+                yield from add(kind, text, tokens)
+                continue
+            if kind == TABLE:
+                pieces = self._split_table(text)
+            elif kind == TEXT:
+                pieces = self._split_text(text, tokens)
+            else:
+                pieces = [(text, tokens)]
+            for piece, piece_tokens in pieces:
+                yield from add(kind, piece, piece_tokens)
+
+        yield from emit(carry_overlap=False)
+
+    def _overlap(self, block: Tuple[str, str, int]) -> Optional[Tuple[str, str, int]]:
+        """Trailing words of a text block, up to `chunk_overlap` tokens."""
+        kind, text, _ = block
+        if kind != TEXT or self.chunk_overlap <= 0:
+            return None
+        words = text.split()
+        taken: List[str] = []
+        tokens = 0
+        for word in reversed(words):
+            word_tokens = self.count_tokens(word)
+            if tokens + word_tokens > self.chunk_overlap:
+                break
+            taken.append(word)
+            tokens += word_tokens
+        if not taken or len(taken) == len(words):
+            return None
+        return TEXT, " ".join(reversed(taken)), tokens
+
+    def _pack(self, units: List[Tuple[str, int]], separator: str, prefix: str = "") -> List[Tuple[str, int]]:
+        """
+        Greedily pack (text, tokens) units into pieces that leave room for the
+        overlap in a chunk, each starting with `prefix`.
+        """
+        prefix_tokens = self.count_tokens(prefix) if prefix else 0
+        budget = self.chunk_size - self.chunk_overlap
+        pieces: List[Tuple[str, int]] = []
+        current: List[str] = []
+        tokens = prefix_tokens
+        for unit, unit_tokens in units:
+            if current and tokens + unit_tokens > budget:
+                pieces.append((prefix + separator.join(current), tokens))
+                current, tokens = [], prefix_tokens
+            current.append(unit)
+            tokens += unit_tokens
+        if current:
+            pieces.append((prefix + separator.join(current), tokens))
+        return pieces
+
+    def _split_text(self, text: str, tokens: int) -> List[Tuple[str, int]]:
+        """Split an oversized paragraph between sentences, and long sentences between words."""
+        return self._split_by_length(_SENTENCE_END.split(text), tokens, len(text), sentences=True)
+
+    def _split_by_length(self, units: List[str], tokens: int, length: int,
+                         sentences: bool) -> List[Tuple[str, int]]:
+        """
+        Join sentences (or words) into pieces that fit the budget, cutting at
+        the character length the text's own characters-per-token ratio
+        predicts, so the units are not counted one by one. Pieces that still
+        come out too large are split again, sentences then between words.
+        """
+        budget = self.chunk_size - self.chunk_overlap
+        target = max(1, int(length * budget / max(tokens, 1) * 0.9))
+        groups: List[List[str]] = []
+        current: List[str] = []
+        size = 0
+        for unit in units:
+            if current and size + len(unit) > target:
+                groups.append(current)
+                current, size = [], 0
+            current.append(unit)
+            size += len(unit) + 1
+        if current:
+            groups.append(current)
+
+        pieces: List[Tuple[str, int]] = []
+        for group in groups:
+            piece = " ".join(group)
+            piece_tokens = self.count_tokens(piece)
+            if piece_tokens <= budget:
+                pieces.append((piece, piece_tokens))
+            elif len(group) > 1:
+                pieces.extend(self._split_by_length(group, piece_tokens, len(piece), sentences))
+            elif sentences and len(piece.split()) > 1:
+                pieces.extend(self._split_by_length(piece.split(), piece_tokens, len(piece), sentences=False))
+            else:
+                # A single word longer than the budget
+                pieces.append((piece, piece_tokens))
+        return pieces
+
+    def _split_table(self, table: str) -> List[Tuple[str, int]]:
+        """Split an oversized table between rows, repeating its header row and separator in each piece."""
+        rows = table.split("\n")
+        header: List[str] = []
+        if len(rows) > 2 and set(rows[1].replace("|", "").strip()) <= set("-: "):
+            header, rows = rows[:2], rows[2:]
+        prefix = "\n".join(header) + "\n" if header else ""
+        return self._pack([(row, self.count_tokens(row)) for row in rows], "\n", prefix)
+
@@ -0,0 +1,82 @@
+"""
+Shared, lazily created provider clients.
+
+Heavy SDKs (qdrant_client, langchain_google_genai, google.generativeai, docling)
+are imported on first use rather than at module import, and each client is created
+once per process so its connection pool survives between queries.
+"""
+import os
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Talk to Qdrant over gRPC (port QDRANT_GRPC_PORT) instead of REST; vectors travel as packed float32
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "0") == "1"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+
+_gemini_configured = False
+_gemini_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_qdrant_client():
+    """Qdrant Cloud client shared by the retriever and ingestion."""
+    qdrant_api_key = os.getenv("QDRANT_API_KEY")
+    if not qdrant_api_key:
+        raise ValueError("QDRANT_API_KEY environment variable is not set. Please set it with your QDrant Cloud API key.")
+
+    import qdrant_client
+    return qdrant_client.QdrantClient(
+        url=os.getenv("QDRANT_CLOUD_URL"),
+        api_key=qdrant_api_key,
+        prefer_grpc=QDRANT_PREFER_GRPC,
+        grpc_port=QDRANT_GRPC_PORT,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_llm(model: str = "gemini-2.0-flash"):
+    """Gemini text-generation client for the given model."""
+    from langchain_google_genai import GoogleGenerativeAI
+    return GoogleGenerativeAI(model=model)
+
+
+def get_gemini_client():
+    """The google.generativeai module, configured with the API key once."""
+    global _gemini_configured
+    import google.generativeai as gemini_client
+    if not _gemini_configured:
+        with _gemini_lock:
+            if not _gemini_configured:
+                gemini_client.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _gemini_configured = True
+    return gemini_client
+
+
+def get_document_converter(profile: Optional[str] = None, ocr: Optional[bool] = None):
+    """
+    Docling PDF converter for a conversion profile (see src/utils/docling_profiles.py).
+
+    Building a converter loads the layout models, so one is shared per
+    profile and OCR setting across ingestion runs.
+
+    Args:
+        profile: Profile name; defaults to INGEST_DOCLING_PROFILE
+        ocr: Run OCR; defaults to the profile's setting, with "auto" meaning on
+    """
+    from src.utils.docling_profiles import get_profile
+    settings = get_profile(profile)
+    return _document_converter(settings.name, settings.use_ocr(True) if ocr is None else ocr)
+
+
+@lru_cache(maxsize=None)
+def _document_converter(profile: str, ocr: bool):
+    from docling.datamodel.base_models import InputFormat
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    from src.utils.docling_profiles import get_profile
+
+    options = get_profile(profile).pipeline_options(ocr)
+    return DocumentConverter(format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=options)})
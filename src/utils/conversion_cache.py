@@ -0,0 +1,153 @@
+"""
+On-disk cache of Docling conversion output.
+
+Layout analysis is the most expensive ingestion step, so the converted
+Markdown and the document structure (`DoclingDocument.export_to_dict()`) are
+stored per PDF content hash and converter version. Re-uploading a file, or
+re-chunking and re-embedding it with other settings, then skips conversion.
+
+Entries are gzip-compressed JSON files in `<root>/<key>.json.gz`. When the
+cache grows beyond `max_bytes`, the least recently used entries are evicted.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CONVERSION_CACHE_DIR = os.getenv("CONVERSION_CACHE_DIR", ".conversion_cache")
+CONVERSION_CACHE_MAX_BYTES = int(os.getenv("CONVERSION_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+
+def docling_version() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return f"docling-{version('docling')}"
+    except PackageNotFoundError:
+        return "docling-unknown"
+
+
+class ConversionCache:
+    """Size-bounded LRU cache of converted documents, keyed by content hash and converter version."""
+
+    def __init__(self, root: str = CONVERSION_CACHE_DIR, max_bytes: int = CONVERSION_CACHE_MAX_BYTES,
+                 converter_version: Optional[str] = None):
+        """
+        Args:
+            root: Cache directory
+            max_bytes: Total size of the entries above which the oldest are evicted; 0 disables caching
+            converter_version: Identifies the converter and its settings. Defaults to the installed
+                Docling version, so upgrading Docling invalidates earlier conversions.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.converter_version = converter_version or docling_version()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, file_hash: str, variant: str = "") -> str:
+        key = f"{file_hash}:{self.converter_version}"
+        if variant:
+            key += f":{variant}"
+        key = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{key}.json.gz")
+
+    def get(self, file_hash: str, variant: str = "") -> Optional[dict]:
+        """
+        Cached conversion of a file.
+
+        Args:
+            file_hash: SHA-256 of the PDF
+            variant: Per-file conversion settings (e.g. the Docling profile)
+
+        Returns:
+            Dict with `markdown` and `document` (the document structure), or None on a miss
+        """
+        path = self._path(file_hash, variant)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        # Mark as recently used for eviction
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        self.hits += 1
+        return entry
+
+    def put(self, file_hash: str, markdown: str, document: Optional[dict] = None, variant: str = ""):
+        """
+        Store the conversion of a file, then evict old entries beyond `max_bytes`.
+
+        Args:
+            file_hash: SHA-256 of the PDF
+            markdown: Converted Markdown
+            document: Document structure
+            variant: Per-file conversion settings (e.g. the Docling profile)
+        """
+        if self.max_bytes <= 0:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(file_hash, variant)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        entry = {
+            "file_hash": file_hash,
+            "converter_version": self.converter_version,
+            "variant": variant,
+            "created_at": time.time(),
+            "markdown": markdown,
+            "document": document,
+        }
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def size(self) -> int:
+        """Total size of the cache entries in bytes."""
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(".json.gz"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, _, size in entries)
+            for _, path, size in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.info("Evicted conversion cache entry %s", path)
+                except FileNotFoundError:
+                    pass
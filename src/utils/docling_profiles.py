@@ -0,0 +1,107 @@
+"""
+Named Docling conversion profiles.
+
+Docling's defaults run OCR and the table-structure model on every page, which
+costs CPU time on born-digital PDFs without adding anything. A profile picks:
+- ocr: "off", "on", or "auto" (OCR only the shards that contain pages triaged
+  as scanned or unreadable; every page when triage is disabled)
+- table_mode: "off" (no table-structure model), "fast" or "accurate" TableFormer
+- images: also render picture images into the document structure
+- num_threads: intra-op threads of the layout and table models per worker
+
+Select a profile per upload or per file; the default comes from
+INGEST_DOCLING_PROFILE.
+"""
+import os
+from typing import Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Intra-op threads per Docling worker process (Docling's own default is 4)
+DOCLING_THREADS = int(os.getenv("INGEST_DOCLING_THREADS", "4"))
+
+OCR_MODES = ("off", "on", "auto")
+TABLE_MODES = ("off", "fast", "accurate")
+
+
+class DoclingProfile:
+    """Conversion settings for Docling's PDF pipeline."""
+
+    __slots__ = ("name", "ocr", "table_mode", "images", "num_threads")
+
+    def __init__(self, name: str, ocr: str = "auto", table_mode: str = "fast", images: bool = False,
+                 num_threads: int = DOCLING_THREADS):
+        if ocr not in OCR_MODES:
+            raise ValueError(f"Invalid OCR mode '{ocr}'. Expected one of {OCR_MODES}.")
+        if table_mode not in TABLE_MODES:
+            raise ValueError(f"Invalid table mode '{table_mode}'. Expected one of {TABLE_MODES}.")
+        self.name = name
+        self.ocr = ocr
+        self.table_mode = table_mode
+        self.images = images
+        self.num_threads = num_threads
+
+    def use_ocr(self, pages_need_ocr: bool) -> bool:
+        """Whether to run OCR on a shard, given whether triage found scanned pages in it"""
+        if self.ocr == "auto":
+            return pages_need_ocr
+        return self.ocr == "on"
+
+    def version(self) -> str:
+        """Settings that change the conversion output, for cache and checkpoint keys"""
+        return f"{self.name}:ocr={self.ocr}:tables={self.table_mode}:images={int(self.images)}"
+
+    def pipeline_options(self, ocr: bool):
+        """PdfPipelineOptions for this profile, with OCR on or off"""
+        from docling.datamodel.pipeline_options import AcceleratorOptions, PdfPipelineOptions, TableFormerMode
+
+        options = PdfPipelineOptions()
+        options.do_ocr = ocr
+        options.do_table_structure = self.table_mode != "off"
+        if options.do_table_structure:
+            options.table_structure_options.mode = (
+                TableFormerMode.ACCURATE if self.table_mode == "accurate" else TableFormerMode.FAST
+            )
+            options.table_structure_options.do_cell_matching = True
+        options.generate_picture_images = self.images
+        if self.images:
+            options.images_scale = 2.0
+        options.accelerator_options = AcceleratorOptions(num_threads=self.num_threads)
+        return options
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+PROFILES: Dict[str, DoclingProfile] = {
+    # Born-digital text: no OCR, tables come out as plain text
+    "fast": DoclingProfile("fast", ocr="off", table_mode="off"),
+    # OCR only where triage found scanned pages, fast table structure
+    "balanced": DoclingProfile("balanced", ocr="auto", table_mode="fast"),
+    # Full OCR, accurate table structure and picture images
+    "accurate": DoclingProfile("accurate", ocr="on", table_mode="accurate", images=True),
+}
+DEFAULT_PROFILE = os.getenv("INGEST_DOCLING_PROFILE", "balanced")
+
+
+def get_profile(name: Optional[str] = None) -> DoclingProfile:
+    """
+    Look up a profile by name.
+
+    Args:
+        name: Profile name; defaults to INGEST_DOCLING_PROFILE
+
+    Raises:
+        ValueError: If the profile does not exist
+    """
+    name = name or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown Docling profile '{name}'. Expected one of {list(PROFILES)}.")
+    return PROFILES[name]
+
+
+def validate_profiles(names: Iterable[Optional[str]]):
+    """Raise ValueError on the first unknown profile name."""
+    for name in names:
+        get_profile(name)
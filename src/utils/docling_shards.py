@@ -0,0 +1,112 @@
+"""
+Page-range sharding of Docling conversions.
+
+A long run of pages is split into shards of at most `shard_pages` pages that
+are converted in parallel worker processes (Docling's layout models are CPU
+bound and hold the GIL in places, so threads would not scale) and returned
+in page order. Callers join the shards' Markdown before splitting it on
+headers, so a section that starts in one shard carries its Header_1/Header_2
+context into the next.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Pages per shard; shorter page runs are converted as one unit
+SHARD_PAGES = int(os.getenv("INGEST_SHARD_PAGES", "40"))
+# Worker processes. Each Docling worker runs its models on several threads
+# (4 by default), so this defaults to a quarter of the cores.
+CONVERT_WORKERS = int(os.getenv("INGEST_CONVERT_WORKERS", str(max(1, (os.cpu_count() or 1) // 4))))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def shard_ranges(first: int, last: int, shard_pages: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Split the 1-based inclusive page range first..last into consecutive
+    shards of at most `shard_pages` (default SHARD_PAGES) pages, balanced in size.
+    """
+    shard_pages = shard_pages or SHARD_PAGES
+    pages = last - first + 1
+    if pages <= 0:
+        return []
+    count = max(1, -(-pages // max(shard_pages, 1)))
+    size, extra = divmod(pages, count)
+    ranges = []
+    start = first
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0) - 1
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def convert_page_range(file_path: str, first: int, last: int, profile: Optional[str] = None,
+                       ocr: Optional[bool] = None) -> Tuple[str, dict]:
+    """
+    Convert pages first..last (1-based, inclusive) of a PDF with Docling.
+
+    Args:
+        profile: Docling profile name (see src/utils/docling_profiles.py)
+        ocr: Run OCR; defaults to the profile's setting
+
+    Returns:
+        The Markdown of the pages and their document structure
+    """
+    from src.utils.clients import get_document_converter
+
+    document = get_document_converter(profile, ocr).convert(file_path, page_range=(first, last)).document
+    # Same export as langchain_docling's DoclingLoader with ExportType.MARKDOWN
+    return document.export_to_markdown(image_placeholder=""), document.export_to_dict()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers do not inherit the parent's model threads or locks
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def convert_shards(file_path: str, ranges: List[Tuple[int, int]], workers: Optional[int] = None,
+                   profile: Optional[str] = None, ocr: Optional[List[bool]] = None) -> List[Tuple[str, dict]]:
+    """
+    Convert page ranges of one PDF, in parallel when there is more than one
+    range and more than one worker.
+
+    Args:
+        file_path: PDF file
+        ranges: 1-based inclusive page ranges
+        workers: Worker processes (default CONVERT_WORKERS); with 1 the ranges
+            are converted in this process
+        profile: Docling profile name
+        ocr: Whether to run OCR, per range; defaults to the profile's setting
+
+    Returns:
+        (markdown, structure) per range, in the order of `ranges`
+    """
+    workers = workers or CONVERT_WORKERS
+    ocr = ocr or [None] * len(ranges)
+    if workers <= 1 or len(ranges) <= 1:
+        return [convert_page_range(file_path, first, last, profile, use_ocr)
+                for (first, last), use_ocr in zip(ranges, ocr)]
+    pool = _get_pool(workers)
+    futures = [pool.submit(convert_page_range, file_path, first, last, profile, use_ocr)
+               for (first, last), use_ocr in zip(ranges, ocr)]
+    return [future.result() for future in futures]
+
+
+def shutdown():
+    """Stop the worker processes, e.g. at service shutdown."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
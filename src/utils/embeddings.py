@@ -0,0 +1,324 @@
+"""
+Embedding providers shared by ingestion and retrieval.
+
+Both sides embed through an `EmbeddingProvider`, selected with EMBEDDING_PROVIDER:
+- gemini: the Gemini embedding API (models/embedding-001, 768 dimensions)
+- local: a sentence-transformers model on the local CPU, so ingestion does
+  not depend on an external API's latency, quota and cost. Texts are sorted
+  by length and encoded in batches of similar length, so little padding is
+  computed, and large inputs are spread over a pool of worker processes (one
+  per core by default). With LOCAL_EMBEDDING_BACKEND=onnx the model runs on
+  ONNX Runtime, optionally from an int8-quantized export (LOCAL_EMBEDDING_ONNX_FILE).
+
+A collection records the provider, model and dimension it was created with
+in its metadata. Ingestion refuses to add vectors of another model to it, and
+the retriever embeds queries with the provider recorded there, so documents
+and queries are always embedded by the same model.
+"""
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROVIDERS = ("gemini", "local")
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "gemini")
+
+GEMINI_EMBEDDING_MODEL = "models/embedding-001"
+GEMINI_EMBEDDING_DIMENSION = 768
+
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# "torch" or "onnx" (needs `optimum[onnxruntime]`)
+LOCAL_EMBEDDING_BACKEND = os.getenv("LOCAL_EMBEDDING_BACKEND", "torch")
+# ONNX file inside the model repository, e.g. onnx/model_qint8_avx512.onnx for int8 weights
+LOCAL_EMBEDDING_ONNX_FILE = os.getenv("LOCAL_EMBEDDING_ONNX_FILE", "")
+# Texts per forward pass
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+# Encoding processes; 1 encodes in the calling process
+LOCAL_EMBEDDING_PROCESSES = int(os.getenv("LOCAL_EMBEDDING_PROCESSES", str(os.cpu_count() or 1)))
+# Smaller inputs are encoded in-process, where the pool's hand-off would cost more than it saves
+LOCAL_EMBEDDING_POOL_MIN_TEXTS = int(os.getenv("LOCAL_EMBEDDING_POOL_MIN_TEXTS", "256"))
+
+# What collections created before the embedding was recorded were built with
+LEGACY_COLLECTION_EMBEDDING = {
+    "provider": "gemini", "model": GEMINI_EMBEDDING_MODEL, "dimension": GEMINI_EMBEDDING_DIMENSION,
+}
+
+
+class EmbeddingMismatchError(ValueError):
+    """Raised when a collection was built with other embeddings than the configured provider's."""
+
+
+class EmbeddingProvider:
+    """Embeds documents and queries into float32 matrices with one row per text."""
+
+    name = ""
+    # Texts per ingestion batch (one embedding call, checkpointed and uploaded together)
+    batch_size = 100
+    # Embeds through a network API, so query embeddings go through src/utils/resilience.py
+    remote = True
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @property
+    def dimension(self) -> int:
+        raise NotImplementedError
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def describe(self) -> Dict:
+        """Provider, model and dimension, as recorded in the collection metadata."""
+        return {"provider": self.name, "model": self.model, "dimension": self.dimension}
+
+    def close(self):
+        """Release worker processes or other resources held by the provider."""
+
+
+class GeminiEmbeddings(EmbeddingProvider):
+    """Gemini embedding API."""
+
+    name = "gemini"
+    # The API accepts at most 100 texts per request
+    batch_size = 100
+
+    def __init__(self, model: str = GEMINI_EMBEDDING_MODEL, dimension: int = GEMINI_EMBEDDING_DIMENSION,
+                 title: str = "Qdrant x Gemini"):
+        super().__init__(model)
+        self._dimension = dimension
+        self.title = title
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def _embed(self, texts: List[str], **kwargs) -> np.ndarray:
+        from src.utils.clients import get_gemini_client
+
+        client = get_gemini_client()
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(client.embed_content(
+                model=self.model, content=texts[start:start + self.batch_size], **kwargs
+            )["embedding"])
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dimension)
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return self._embed(texts, task_type="retrieval_document", title=self.title)
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        return self._embed(texts, task_type="retrieval_query")
+
+
+def encode_length_sorted(texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+    """
+    Encode texts longest first and return the vectors in input order.
+
+    Batches cut from the sorted list hold texts of similar length, so the
+    model pads each batch to little more than its texts' own length.
+
+    Args:
+        texts: Texts to encode
+        encode: Encodes a list of texts into a matrix with one row per text
+
+    Returns:
+        float32 matrix with the vector of `texts[i]` in row i
+    """
+    order = np.argsort([-len(text) for text in texts], kind="stable")
+    vectors = np.asarray(encode([texts[i] for i in order]), dtype=np.float32)
+    result = np.empty_like(vectors)
+    result[order] = vectors
+    return result
+
+
+class LocalEmbeddings(EmbeddingProvider):
+    """sentence-transformers model on the local CPU, with batched, length-sorted, multi-process encoding."""
+
+    name = "local"
+    # A batch is spread over the pool, so it is larger than a Gemini request
+    batch_size = 512
+    remote = False
+
+    def __init__(self, model: str = LOCAL_EMBEDDING_MODEL, backend: str = LOCAL_EMBEDDING_BACKEND,
+                 onnx_file: str = LOCAL_EMBEDDING_ONNX_FILE, encode_batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+                 processes: int = LOCAL_EMBEDDING_PROCESSES, pool_min_texts: int = LOCAL_EMBEDDING_POOL_MIN_TEXTS):
+        """
+        Args:
+            model: sentence-transformers model name or path
+            backend: "torch" or "onnx"
+            onnx_file: ONNX file to load with the onnx backend, e.g. an int8-quantized export
+            encode_batch_size: Texts per forward pass
+            processes: Encoding processes; with more than one, inputs of at
+                least `pool_min_texts` texts are spread over a process pool
+            pool_min_texts: Smallest input encoded on the pool
+        """
+        super().__init__(model)
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.encode_batch_size = encode_batch_size
+        self.processes = max(1, processes)
+        self.pool_min_texts = pool_min_texts
+        self._model = None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+
+                kwargs = {"device": "cpu", "backend": self.backend}
+                if self.backend == "onnx" and self.onnx_file:
+                    kwargs["model_kwargs"] = {"file_name": self.onnx_file}
+                self._model = SentenceTransformer(self.model, **kwargs)
+            return self._model
+
+    def _get_pool(self):
+        model = self._load()
+        with self._lock:
+            if self._pool is None:
+                self._pool = model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+            return self._pool
+
+    @property
+    def dimension(self) -> int:
+        return self._load().get_sentence_embedding_dimension()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        model = self._load()
+        if self.processes > 1 and len(texts) >= self.pool_min_texts:
+            pool = self._get_pool()
+            # Each process gets a few contiguous chunks of the sorted texts
+            chunk_size = max(self.encode_batch_size, -(-len(texts) // (self.processes * 4)))
+
+            def encode(sorted_texts: List[str]) -> np.ndarray:
+                return model.encode_multi_process(sorted_texts, pool, batch_size=self.encode_batch_size,
+                                                  chunk_size=chunk_size, normalize_embeddings=True)
+        else:
+            def encode(sorted_texts: List[str]) -> np.ndarray:
+                return model.encode(sorted_texts, batch_size=self.encode_batch_size, convert_to_numpy=True,
+                                    normalize_embeddings=True)
+        return encode_length_sorted(texts, encode)
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return self._encode(texts)
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        return self._encode(texts)
+
+    def describe(self) -> Dict:
+        return {**super().describe(), "backend": self.backend, "onnx_file": self.onnx_file}
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._model.stop_multi_process_pool(self._pool)
+                self._pool = None
+
+
+_providers: Dict[Tuple[str, str], EmbeddingProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_embedding_provider(name: Optional[str] = None, model: Optional[str] = None) -> EmbeddingProvider:
+    """
+    Embedding provider shared per process, so a local model is loaded once.
+
+    Args:
+        name: "gemini" or "local"; defaults to EMBEDDING_PROVIDER
+        model: Model of the provider; defaults to the provider's configured model
+
+    Raises:
+        ValueError: For an unknown provider
+    """
+    name = name or EMBEDDING_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown embedding provider '{name}'. Expected one of {PROVIDERS}")
+    if model is None:
+        model = GEMINI_EMBEDDING_MODEL if name == "gemini" else LOCAL_EMBEDDING_MODEL
+    with _providers_lock:
+        if (name, model) not in _providers:
+            _providers[name, model] = GeminiEmbeddings(model) if name == "gemini" else LocalEmbeddings(model)
+        return _providers[name, model]
+
+
+def shutdown():
+    """Stop the worker processes of the local providers; called at service shutdown."""
+    with _providers_lock:
+        for provider in _providers.values():
+            provider.close()
+
+
+def collection_metadata(provider: EmbeddingProvider) -> Dict:
+    """Collection metadata recording the embeddings of a new collection."""
+    return {"embedding": provider.describe()}
+
+
+_collection_embeddings: Dict[str, Dict] = {}
+_collection_lock = threading.Lock()
+
+
+def collection_embedding(client, collection_name: str) -> Optional[Dict]:
+    """
+    Provider, model and dimension a collection was created with, cached per process.
+
+    Args:
+        client: QdrantClient
+        collection_name: Collection to look up
+
+    Returns:
+        The recorded embedding (`LEGACY_COLLECTION_EMBEDDING` for collections
+        created before it was recorded), or None if the collection does not exist
+    """
+    with _collection_lock:
+        if collection_name in _collection_embeddings:
+            return _collection_embeddings[collection_name]
+    if not client.collection_exists(collection_name):
+        return None
+    metadata = client.get_collection(collection_name).config.metadata or {}
+    recorded = metadata.get("embedding") or LEGACY_COLLECTION_EMBEDDING
+    with _collection_lock:
+        _collection_embeddings[collection_name] = recorded
+    return recorded
+
+
+def forget_collection_embedding(collection_name: str):
+    """Drop the cached embedding of a collection, e.g. after it was recreated."""
+    with _collection_lock:
+        _collection_embeddings.pop(collection_name, None)
+
+
+def check_collection_embedding(client, collection_name: str, provider: EmbeddingProvider):
+    """
+    Make sure an existing collection was built with `provider`'s model.
+
+    Raises:
+        EmbeddingMismatchError: If the collection records another provider, model or dimension
+    """
+    recorded = collection_embedding(client, collection_name)
+    if recorded is None:
+        return
+    expected = provider.describe()
+    if any(recorded.get(key) != expected[key] for key in ("provider", "model", "dimension")):
+        raise EmbeddingMismatchError(
+            f"Collection '{collection_name}' holds {recorded.get('provider')} embeddings of "
+            f"{recorded.get('model')} ({recorded.get('dimension')} dimensions), but the configured "
+            f"provider is {expected['provider']} with {expected['model']} ({expected['dimension']} dimensions). "
+            f"Use another collection or set EMBEDDING_PROVIDER to match."
+        )
+
+
+def provider_for_embedding(recorded: Optional[Dict]) -> EmbeddingProvider:
+    """Provider for a recorded collection embedding; the configured default if there is none."""
+    if not recorded:
+        return get_embedding_provider()
+    return get_embedding_provider(recorded["provider"], recorded["model"])
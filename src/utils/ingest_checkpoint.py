@@ -0,0 +1,221 @@
+"""
+Local checkpoints for resumable ingestion.
+
+Each file being ingested gets a directory under
+`<root>/<collection>/<file sha256>/` holding:
+- manifest.json: which steps are durable (converted, embedded and upserted batches)
+- chunks.json: the converted and split chunks, in the columnar `ChunkBatch` form
+- embeddings/<batch>.npy: the vectors of each embedded batch, as a float32 matrix
+
+Everything is written atomically, so a rerun after a crash or a failed request
+resumes from the last durable step instead of converting and embedding again.
+Embedding files are removed once their batch is upserted, and only the
+manifest is kept once the whole file is upserted.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Callable, List, Optional, Tuple, Type, TypeVar, Union
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.utils.chunk_batch import ChunkBatch
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = os.getenv("INGEST_CHECKPOINT_DIR", ".ingest_checkpoints")
+
+T = TypeVar("T")
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json(path: str, data) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def retry_with_backoff(fn: Callable[[], T], description: str, attempts: int = 4, base_delay: float = 1.0,
+                       max_delay: float = 30.0, retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+                       sleep: Callable[[float], None] = time.sleep) -> T:
+    """
+    Call `fn` until it succeeds, waiting base_delay * 2**n seconds between attempts.
+
+    Args:
+        fn: Callable to run
+        description: What `fn` does, used in log and error messages
+        attempts: Total number of calls before giving up
+        base_delay: Delay before the second attempt, doubled for each further attempt
+        max_delay: Upper bound on a single delay
+        retry_on: Exception types that trigger a retry; anything else is raised at once
+        sleep: Sleep function (replaceable in tests)
+
+    Returns:
+        The result of `fn`
+
+    Raises:
+        RuntimeError: If every attempt failed, chained to the last error
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except retry_on as e:
+            if attempt == attempts:
+                raise RuntimeError(f"{description} failed after {attempts} attempts: {e}") from e
+            delay = min(base_delay * 2 ** (attempt - 1), max_delay)
+            logger.warning("%s failed (attempt %d/%d): %s; retrying in %.1fs",
+                           description, attempt, attempts, e, delay)
+            sleep(delay)
+
+
+class FileCheckpoint:
+    """Durable ingestion state of one file in one collection."""
+
+    def __init__(self, collection_name: str, file_path: str, root: str = CHECKPOINT_DIR,
+                 file_hash: Optional[str] = None, settings: Optional[dict] = None):
+        """
+        Args:
+            collection_name: Qdrant collection the file is ingested into
+            file_path: PDF file being ingested
+            root: Checkpoint root directory
+            file_hash: SHA-256 of the file, computed when not given
+            settings: Settings the chunks depend on (e.g. chunk size). A checkpoint
+                written with other settings is discarded.
+        """
+        self.file_hash = file_hash or file_sha256(file_path)
+        self.filename = os.path.basename(file_path)
+        self.settings = settings or {}
+        self.path = os.path.join(root, collection_name, self.file_hash)
+        self._manifest_path = os.path.join(self.path, "manifest.json")
+        self.manifest = None
+        if os.path.exists(self._manifest_path):
+            self.manifest = _read_json(self._manifest_path)
+            if self.manifest.get("settings", {}) != self.settings:
+                shutil.rmtree(self.path, ignore_errors=True)
+                self.manifest = None
+        if self.manifest is None:
+            self.manifest = {
+                "file_hash": self.file_hash,
+                "filename": self.filename,
+                "settings": self.settings,
+                "converted": False,
+                "num_chunks": 0,
+                "batch_size": None,
+                "num_batches": None,
+                "embedded_batches": [],
+                "upserted_batches": [],
+                "completed": False,
+                "updated_at": None,
+            }
+
+    def _save(self):
+        os.makedirs(self.path, exist_ok=True)
+        self.manifest["updated_at"] = time.time()
+        _write_json(self._manifest_path, self.manifest)
+
+    @property
+    def converted(self) -> bool:
+        return self.manifest["converted"]
+
+    @property
+    def completed(self) -> bool:
+        return self.manifest["completed"]
+
+    @property
+    def num_chunks(self) -> int:
+        return self.manifest["num_chunks"]
+
+    def save_chunks(self, chunks: Union[ChunkBatch, List[dict]]):
+        if not isinstance(chunks, ChunkBatch):
+            chunks = ChunkBatch.from_chunks(chunks)
+        os.makedirs(self.path, exist_ok=True)
+        _write_json(os.path.join(self.path, "chunks.json"), chunks.to_dict())
+        self.manifest["converted"] = True
+        self.manifest["num_chunks"] = len(chunks)
+        self._save()
+
+    def load_chunks(self) -> ChunkBatch:
+        data = _read_json(os.path.join(self.path, "chunks.json"))
+        if isinstance(data, list):
+            # Checkpoints written before chunks were stored column by column
+            return ChunkBatch.from_chunks(data)
+        return ChunkBatch.from_dict(data)
+
+    def set_batches(self, batch_size: int, num_batches: int):
+        """
+        Fix the batch layout. A layout change (e.g. a new batch size) drops the
+        embedded/upserted batch records, since their indices no longer line up.
+        """
+        if (self.manifest["batch_size"], self.manifest["num_batches"]) != (batch_size, num_batches):
+            self.manifest.update(batch_size=batch_size, num_batches=num_batches,
+                                 embedded_batches=[], upserted_batches=[])
+            shutil.rmtree(os.path.join(self.path, "embeddings"), ignore_errors=True)
+            self._save()
+
+    def is_embedded(self, batch: int) -> bool:
+        return batch in self.manifest["embedded_batches"]
+
+    def is_upserted(self, batch: int) -> bool:
+        return batch in self.manifest["upserted_batches"]
+
+    def _embedding_path(self, batch: int) -> str:
+        return os.path.join(self.path, "embeddings", f"{batch}.npy")
+
+    def save_embeddings(self, batch: int, embeddings: np.ndarray):
+        os.makedirs(os.path.join(self.path, "embeddings"), exist_ok=True)
+        path = self._embedding_path(batch)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.asarray(embeddings, dtype=np.float32))
+        os.replace(tmp_path, path)
+        self.manifest["embedded_batches"].append(batch)
+        self._save()
+
+    def load_embeddings(self, batch: int) -> np.ndarray:
+        path = self._embedding_path(batch)
+        if not os.path.exists(path):
+            # Checkpoints written before embeddings were stored as .npy
+            return np.asarray(_read_json(path[:-len(".npy")] + ".json"), dtype=np.float32)
+        return np.load(path)
+
+    def mark_upserted(self, batch: int):
+        self.manifest["upserted_batches"].append(batch)
+        if len(self.manifest["upserted_batches"]) == self.manifest["num_batches"]:
+            # Only the manifest is needed to skip a completed file
+            self.manifest["completed"] = True
+            self._save()
+            shutil.rmtree(os.path.join(self.path, "embeddings"), ignore_errors=True)
+            try:
+                os.remove(os.path.join(self.path, "chunks.json"))
+            except FileNotFoundError:
+                pass
+            return
+        self._save()
+        try:
+            os.remove(self._embedding_path(batch))
+        except FileNotFoundError:
+            pass
+
+
+def clear_checkpoints(collection_name: str, root: str = CHECKPOINT_DIR):
+    """Remove every checkpoint of a collection, e.g. after it was recreated."""
+    shutil.rmtree(os.path.join(root, collection_name), ignore_errors=True)
@@ -9,6 +9,8 @@ from langchain_qdrant import QdrantVectorStore
 from sentence_transformers import SentenceTransformer
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from src.utils.ingest_checkpoint import retry_with_backoff
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -146,13 +148,14 @@ class IngestPDF:
                 batch_size = 10
                 for i in range(0, len(points), batch_size):
                     batch = points[i:i + batch_size]
-                    try:
-                        self.client.upsert(
+                    # Retried with backoff; a batch that keeps failing stops ingestion
+                    retry_with_backoff(
+                        lambda: self.client.upsert(
                             collection_name=name,
                             points=batch
-                        )
-                    except Exception as batch_error:
-                        continue
+                        ),
+                        f"Upserting points {i}-{i + len(batch) - 1}",
+                    )
 
             try:
                 collection = self.client.get_collection(name)
@@ -210,9 +213,9 @@ class IngestPDF:
         
         # Create QdrantDB collection with all chunks
         if all_chunks:
+            # Storage failures propagate; only vector store creation is best-effort
+            collection, name = self.create_qdrant_db(all_chunks, "uploaded-pdfs")
             try:
-                collection, name = self.create_qdrant_db(all_chunks, "uploaded-pdfs")
-                
                 # Create and return vector store for compatibility
                 from langchain_qdrant import QdrantVectorStore
                 
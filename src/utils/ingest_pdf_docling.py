@@ -12,6 +12,8 @@ import os
 import logging
 from typing import List
 from datetime import datetime
+from src.utils.ingest_checkpoint import retry_with_backoff
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -143,13 +145,14 @@ class IngestPDF:
                 batch_size = 10
                 for i in range(0, len(points), batch_size):
                     batch = points[i:i + batch_size]
-                    try:
-                        self.client.upsert(
+                    # Retried with backoff; a batch that keeps failing stops ingestion
+                    retry_with_backoff(
+                        lambda: self.client.upsert(
                             collection_name=name,
                             points=batch
-                        )
-                    except Exception as batch_error:
-                        continue
+                        ),
+                        f"Upserting points {i}-{i + len(batch) - 1}",
+                    )
 
             try:
                 collection = self.client.get_collection(name)
@@ -206,9 +209,9 @@ class IngestPDF:
         
         # Create QdrantDB collection with all chunks
         if all_chunks:
+            # Storage failures propagate; only vector store creation is best-effort
+            collection, name = self.create_qdrant_db(all_chunks, "uploaded-pdfs")
             try:
-                collection, name = self.create_qdrant_db(all_chunks, "uploaded-pdfs")
-                
                 vector_store = QdrantVectorStore(
                     client=self.client,
                     collection_name=name,
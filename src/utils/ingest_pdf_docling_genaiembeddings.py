@@ -1,180 +1,490 @@
-import qdrant_client
-from qdrant_client.models import Distance, PointStruct, VectorParams
-
-
-from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
-from langchain_docling import DoclingLoader
-from langchain_docling.loader import ExportType
-
-import google.generativeai as gemini_client
+# Docling, qdrant_client and the embedding SDKs are imported
+# on first use: they are slow to import and not needed until a file is ingested.
+from src.utils.clients import get_document_converter, get_qdrant_client
+from src.utils.conversion_cache import ConversionCache, docling_version
+from src.utils.ingest_checkpoint import (
+    CHECKPOINT_DIR, FileCheckpoint, clear_checkpoints, file_sha256, retry_with_backoff
+)
+from src.utils.chunk_batch import ChunkBatch
+from src.utils.chunk_store import SLIM_PAYLOADS, get_chunk_store, slim_payload
+from src.utils.chunker import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, CHUNKER_VERSION, MarkdownChunker
+from src.utils.docling_profiles import get_profile
+from src.utils.embeddings import (
+    EmbeddingProvider, check_collection_embedding, collection_metadata, forget_collection_embedding,
+    get_embedding_provider,
+)
+from src.utils.ingest_progress import IngestionProgress
+from src.utils.qdrant_upload import PointUploader
+from src.utils.tenancy import (
+    DEFAULT_TENANT, checkpoint_namespace, create_tenant_index, tenant_conditions, tenant_hnsw_config, validate_tenant,
+)
+from src.utils import docling_shards, pdf_triage
 
 import os
-from typing import List
+import time
+import logging
+import uuid
+from collections import Counter, deque
+from typing import Dict, List, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Route born-digital text pages to pypdf and only the rest to Docling
+PAGE_TRIAGE = os.getenv("INGEST_PAGE_TRIAGE", "1") == "1"
+# Bumped when the triage rules change, so cached conversions are redone
+TRIAGE_VERSION = "triage-1"
+# Default chunking of the converted Markdown, in estimated embedding-model tokens
+CHUNK_SIZE = CHUNK_TOKENS
+CHUNK_OVERLAP = CHUNK_OVERLAP_TOKENS
+# Attempts per embedding or upsert request before the run fails
+MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "4"))
+# Namespace of the deterministic point ids derived from file hash and chunk index
+POINT_ID_NAMESPACE = uuid.UUID("6f2b7c1e-4c1a-4f3e-9a51-2d8f0e7b9c44")
+
+
+def count_pdf_pages(file_path: str) -> int:
+    """Page count from the PDF trailer; cheap compared to a Docling conversion"""
+    from pypdf import PdfReader
+    try:
+        return len(PdfReader(file_path).pages)
+    except Exception:
+        return 0
+
+
 class IngestPDF:
-    def __init__(self, collection_name: str = "uploaded-pdfs"):
+    def __init__(self, collection_name: str = "uploaded-pdfs", checkpoint_dir: str = CHECKPOINT_DIR,
+                 chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                 conversion_cache: Optional[ConversionCache] = None, page_triage: bool = PAGE_TRIAGE,
+                 profile: Optional[str] = None, embeddings: Optional[EmbeddingProvider] = None,
+                 slim_payloads: bool = SLIM_PAYLOADS):
         
         qdrant_api_key = os.getenv("QDRANT_API_KEY")
         if not qdrant_api_key:
             raise ValueError("QDRANT_API_KEY environment variable is not set. Please set it with your QDrant Cloud API key.")
         
-        qdrant_url = os.getenv("QDRANT_CLOUD_URL")
-        
-        self.client = qdrant_client.QdrantClient(
-            url=qdrant_url,
-            api_key=qdrant_api_key,
-        )
+        self.client = get_qdrant_client()
         self.collection_name = collection_name
-        
-        #gemini_client utilized for embeddings
-        gemini_client.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        self.checkpoint_dir = checkpoint_dir
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunker = MarkdownChunker(chunk_size, chunk_overlap)
+        self.page_triage = page_triage
+        # Default Docling profile; run_ingestion_pipeline can override it per file
+        self.profile = get_profile(profile).name
+        # Embeds the chunks; defaults to EMBEDDING_PROVIDER
+        self.embeddings = embeddings or get_embedding_provider()
+        # Keep only the filterable fields in Qdrant and the chunk texts in the local chunk store
+        self.slim_payloads = slim_payloads
+        self.chunk_store = get_chunk_store(collection_name)
+        self.conversion_cache = (conversion_cache if conversion_cache is not None
+                                 else ConversionCache(converter_version=self.converter_version()))
+        # Pages per route and time per step, accumulated over the files converted by this instance
+        self.conversion_stats = Counter()
+        self.triage_reasons = Counter()
+        self.profiles_used = Counter()
 
-    def docling_load_and_split(self, file_path):
-        try:
-            loader = DoclingLoader(
-                    file_path=file_path,
-                    export_type=ExportType.MARKDOWN
-            )
-            docs = loader.load()
-
-            if not docs:
-                return []
-            
-            md_splitter = MarkdownHeaderTextSplitter(
-                        headers_to_split_on=[
-                            ("#", "Header_1"),
-                            ("##", "Header_2"),
-                            ],
-                        )
-            md_splits = [split for doc in docs for split in md_splitter.split_text(doc.page_content)]
-
-            chunk_size = 2000
-            chunk_overlap = 50
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size, chunk_overlap=chunk_overlap
-            )
-            splits = text_splitter.split_documents(md_splits)
+    def converter_version(self) -> str:
+        """Identifies the conversion settings in the conversion cache key"""
+        version = docling_version()
+        return f"{version}+{TRIAGE_VERSION}" if self.page_triage else version
 
-            return splits
-            
-        except Exception as e:
-            return []
-        
+    def conversion_report(self) -> dict:
+        """Pages converted per route, reasons pages went to Docling, and pages/second per route"""
+        stats = self.conversion_stats
+        triaged_pages = stats["fast_pages"] + stats["docling_pages"] if self.page_triage else 0
+        # The fast path pays its share of the triage, which already extracted its text
+        fast_seconds = stats["fast_seconds"]
+        if triaged_pages:
+            fast_seconds += stats["triage_seconds"] * stats["fast_pages"] / triaged_pages
+        return {
+            "fast_pages": stats["fast_pages"],
+            "docling_pages": stats["docling_pages"],
+            "cached_files": stats["cached_files"],
+            "docling_reasons": dict(self.triage_reasons),
+            "profiles": dict(self.profiles_used),
+            "triage_pages_per_second": (round(triaged_pages / stats["triage_seconds"], 1)
+                                        if stats["triage_seconds"] else None),
+            "fast_pages_per_second": round(stats["fast_pages"] / fast_seconds, 1) if fast_seconds else None,
+            "docling_pages_per_second": (round(stats["docling_pages"] / stats["docling_seconds"], 2)
+                                         if stats["docling_seconds"] else None),
+        }
 
-    def create_qdrant_db(self, documents: List):
+    def convert_to_markdown(self, file_path: str, file_hash: Optional[str] = None,
+                            progress: Optional[IngestionProgress] = None, profile: Optional[str] = None) -> str:
         """
-        Creates a Qdrant database using the provided documents and collection name.
+        Converts a PDF to Markdown with Docling, using the conversion cache.
 
-        Parameters:
-        - documents: An iterable of document chunks to be added to the Qdrant database.
-        - name (str): The name of the collection within the Qdrant database.
+        On a miss the Markdown and the document structure are cached by the
+        file's content hash, the Docling version and the profile, so later
+        uploads of the same file and re-chunking runs skip layout analysis.
+
+        Args:
+            file_path (str): Path to the PDF file.
+            file_hash (str): SHA-256 of the file, computed when not given.
+            progress (IngestionProgress): Optional tracker, advanced per converted page.
+            profile (str): Docling profile name; defaults to the instance's profile.
+        """
+        file_hash = file_hash or file_sha256(file_path)
+        variant = get_profile(profile or self.profile).version()
+        cached = self.conversion_cache.get(file_hash, variant)
+        if cached is not None:
+            self.conversion_stats["cached_files"] += 1
+            return cached["markdown"]
+
+        markdown, structure = self.convert_pages(file_path, progress, profile)
+        self.conversion_cache.put(file_hash, markdown, structure, variant)
+        return markdown
+
+    def convert_pages(self, file_path: str, progress: Optional[IngestionProgress] = None,
+                      profile: Optional[str] = None):
+        """
+        Converts a PDF page by page and merges the result into one Markdown
+        stream in page order.
+
+        With page triage, text-only pages are extracted with pypdf and pages
+        with tables, figures or scanned images go to Docling; otherwise every
+        page goes to Docling. Docling pages are converted in page-range shards
+        of at most `SHARD_PAGES` pages, in parallel worker processes. Header
+        splitting happens on the merged stream, so shard boundaries do not
+        lose the section a page belongs to.
+
+        Docling runs with the given profile. With OCR set to "auto", only
+        shards containing pages triaged as scanned or unreadable are OCRed.
+
+        Args:
+            file_path (str): Path to the PDF file.
+            progress (IngestionProgress): Optional tracker, advanced per converted page.
+            profile (str): Docling profile name; defaults to the instance's profile.
 
         Returns:
-        - Tuple[qdrant_client.Collection, str]: A tuple containing the created Qdrant Collection and its name.
+            Tuple of the Markdown and the structure: per-page triage and the
+            Docling document of each converted shard
         """
-        try:
-            # Create collection if it doesn't exist
-            if not self.client.collection_exists(self.collection_name):
-                self.client.create_collection(
-                    self.collection_name,
-                    vectors_config=VectorParams(
-                        size=768, # Dimension of gemini-embedding-001
-                        distance=Distance.COSINE,
-                    ),
+        profile = get_profile(profile or self.profile)
+        self.profiles_used[profile.name] += 1
+        start = time.perf_counter()
+        triage = []
+        if self.page_triage:
+            try:
+                _, triage = pdf_triage.triage_pdf(file_path)
+            except Exception as e:
+                logger.warning("Page triage failed for %s, converting it with Docling: %s", file_path, e)
+            self.conversion_stats["triage_seconds"] += time.perf_counter() - start
+        if triage:
+            runs = pdf_triage.page_runs(triage)
+        else:
+            runs = [(pdf_triage.DOCLING, 1, count_pdf_pages(file_path))]
+        body_size = pdf_triage.body_font_size(triage)
+
+        # Docling shards of all runs are converted together, then slotted back in page order
+        parts = {}
+        shards = [shard for route, first, last in runs if route == pdf_triage.DOCLING
+                  for shard in docling_shards.shard_ranges(first, last)]
+        for route, first, last in runs:
+            if route == pdf_triage.FAST:
+                start = time.perf_counter()
+                parts[first] = "\n\n".join(
+                    pdf_triage.lines_to_markdown(page.lines, body_size) for page in triage[first - 1:last]
                 )
+                self.conversion_stats["fast_pages"] += last - first + 1
+                self.conversion_stats["fast_seconds"] += time.perf_counter() - start
+                if progress:
+                    progress.advance("pages_converted", last - first + 1)
 
-            # Get collection details to check for points id, so that upsert doesnt update existing points
-            collection_details = self.client.get_collection(self.collection_name)
-            if collection_details:
-                points_count = collection_details.points_count
-            else:
-                points_count = 0
-
-            # Generate embeddings for each document
-            embeddings  = [
-                        gemini_client.embed_content(
-                            model="models/embedding-001",
-                            content=doc['text'],
-                            task_type="retrieval_document",
-                            title="Qdrant x Gemini",
-                        )
-                        for doc in documents
-            ]
-            
-            # Create list of points
-            points = []
-            for idx, (response, doc) in enumerate(zip(embeddings, documents)):
-                points_count += 1
-                metadata = {
-                    'source': doc['filename'],
-                    "chunk_size": len(doc['text']),
-                    "timestamp": str(datetime.now())
-                }
-                for key, value in doc['metadata'].items():
-                    metadata[key] = value
+        docling_runs = []
+        if shards:
+            # Without triage nothing is known about the pages, so "auto" OCR covers all of them
+            needs_ocr = {page.page for page in triage if page.reason in ("scanned", "unreadable")}
+            ocr = [profile.use_ocr(not triage or any(page in needs_ocr for page in range(first, last + 1)))
+                   for first, last in shards]
+            start = time.perf_counter()
+            converted = docling_shards.convert_shards(file_path, shards, profile=profile.name, ocr=ocr)
+            # Wall-clock time, so pages/second reflects the parallel speed-up
+            self.conversion_stats["docling_seconds"] += time.perf_counter() - start
+            for (first, last), (markdown, document) in zip(shards, converted):
+                parts[first] = markdown
+                docling_runs.append({"pages": [first, last], "document": document})
+                self.conversion_stats["docling_pages"] += last - first + 1
+                if progress:
+                    progress.advance("pages_converted", last - first + 1)
+        elif not runs[0][2]:
+            # pypdf could not read the page count; convert the whole file in one go
+            start = time.perf_counter()
+            document = get_document_converter(profile.name).convert(file_path).document
+            parts[1] = document.export_to_markdown(image_placeholder="")
+            docling_runs.append({"pages": None, "document": document.export_to_dict()})
+            self.conversion_stats["docling_seconds"] += time.perf_counter() - start
+        self.triage_reasons.update(page.reason for page in triage if page.route == pdf_triage.DOCLING)
 
-                point = PointStruct(
-                    id=points_count,
-                    vector=response['embedding'],
-                    payload={"page_content": doc['text'], "metadata": metadata},
-                )
-                points.append(point)
+        logger.info("Converted %s: %d pages with pypdf, %d with Docling in %d shards",
+                    os.path.basename(file_path),
+                    sum(last - first + 1 for route, first, last in runs if route == pdf_triage.FAST),
+                    sum(last - first + 1 for first, last in shards), len(shards))
+        markdown = "\n\n".join(parts[first] for first in sorted(parts) if parts[first])
+        return markdown, {"pages": [page.to_dict() for page in triage], "docling_runs": docling_runs}
 
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=points
+    def split_markdown(self, markdown: str) -> List[dict]:
+        """Splits Markdown in one pass into chunks of at most chunk_size tokens with Header_1/Header_2 metadata"""
+        return self.chunker.split(markdown)
+
+    def docling_load_and_split(self, file_path, file_hash: Optional[str] = None,
+                               progress: Optional[IngestionProgress] = None,
+                               profile: Optional[str] = None) -> ChunkBatch:
+        try:
+            markdown = self.convert_to_markdown(file_path, file_hash, progress, profile)
+
+            if not markdown.strip():
+                return ChunkBatch()
+
+            # Chunks stream from the chunker straight into the columnar batch
+            return ChunkBatch.from_chunks(
+                chunk for chunk in self.chunker.iter_chunks(markdown) if chunk['text'].strip()
             )
-            
+
         except Exception as e:
+            return ChunkBatch()
+
+    def create_qdrant_db(self) -> bool:
+        """
+        Creates the Qdrant collection if it doesn't exist, recording the
+        embedding provider, model and dimension in its metadata, with the
+        tenant field indexed as its tenant key.
+
+        Returns:
+        - bool: True if the collection was created by this call.
+
+        Raises:
+        - EmbeddingMismatchError: If the existing collection was built with other embeddings.
+        """
+        from qdrant_client.models import Distance, PayloadSchemaType, VectorParams
+
+        if self.client.collection_exists(self.collection_name):
+            # Vectors of another model would not be comparable with the ones already stored
+            check_collection_embedding(self.client, self.collection_name, self.embeddings)
+            # Collections created before tenancy get the tenant index on their next ingestion
+            create_tenant_index(self.client, self.collection_name)
+            return False
+        self.client.create_collection(
+            self.collection_name,
+            vectors_config=VectorParams(
+                size=self.embeddings.dimension,
+                distance=Distance.COSINE,
+            ),
+            # Searches are always filtered by tenant, so graphs are only built per tenant
+            hnsw_config=tenant_hnsw_config(),
+            # Lets the retriever embed queries with the same model
+            metadata=collection_metadata(self.embeddings),
+        )
+        forget_collection_embedding(self.collection_name)
+        create_tenant_index(self.client, self.collection_name)
+        # Used to replace the points of a file when it is ingested again
+        self.client.create_payload_index(
+            self.collection_name, field_name="metadata.file_hash", field_schema=PayloadSchemaType.KEYWORD
+        )
+        return True
+
+    def convert_file(self, file_path: str, file_hash: Optional[str] = None,
+                     progress: Optional[IngestionProgress] = None, profile: Optional[str] = None) -> ChunkBatch:
+        """Convert and split one PDF into a batch of its non-empty chunks"""
+        return self.docling_load_and_split(file_path, file_hash, progress, profile)
+
+    def delete_file_points(self, file_hash: str, tenant: str = DEFAULT_TENANT):
+        """Deletes a tenant's points of an earlier ingestion of the same file, e.g. with other chunk settings"""
+        from qdrant_client import models
+
+        retry_with_backoff(
+            lambda: self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.FilterSelector(filter=models.Filter(must=[
+                    models.FieldCondition(key="metadata.file_hash", match=models.MatchValue(value=file_hash)),
+                    *tenant_conditions(tenant),
+                ])),
+            ),
+            f"Deleting earlier points of {file_hash[:12]}",
+            attempts=MAX_ATTEMPTS,
+        )
+        self.chunk_store.delete_file(file_hash, tenant)
+
+    def embed_and_upsert(self, checkpoint: FileCheckpoint, progress: IngestionProgress, uploader: PointUploader,
+                         tenant: str = DEFAULT_TENANT):
+        """
+        Embeds and upserts the chunks of one converted file, batch by batch.
+
+        Uploads are pipelined: each batch is handed to `uploader` and
+        uploaded on a worker thread while the next batch is embedded.
+
+        Each embedded batch is checkpointed before it is uploaded and each
+        upload is recorded once acknowledged, so a rerun only redoes the
+        batches that were not durable. Failed requests are retried with
+        backoff; a batch that still fails stops the run with an error.
+
+        Point ids are derived from the tenant, file hash and chunk index, so
+        re-upserting a batch overwrites its points instead of duplicating them,
+        and two tenants uploading the same file get separate points.
+
+        With slim payloads, the chunk texts and metadata of a batch are
+        written to the chunk store before its points are uploaded, and the
+        points only carry the tenant and file hash.
+
+        Parameters:
+        - checkpoint: Checkpoint of the file, already converted.
+        - progress: Progress tracker, advanced per embedded chunk and upserted point.
+          Cancellation is checked between batches.
+        - uploader: Uploader the batches are queued on.
+        - tenant: Tenant the points belong to.
+        """
+        batch_size = self.embeddings.batch_size
+
+        chunks = checkpoint.load_chunks()
+        num_batches = (len(chunks) + batch_size - 1) // batch_size
+        checkpoint.set_batches(batch_size, num_batches)
+
+        # Uploads in submission order, as (future, batch index, points)
+        pending = deque()
+
+        def settle(block: bool):
+            """Record acknowledged uploads in order; raises the error of a failed one."""
+            while pending and (block or pending[0][0].done()):
+                future, batch_index, size = pending[0]
+                future.result()
+                pending.popleft()
+                checkpoint.mark_upserted(batch_index)
+                progress.advance("points_upserted", size)
+
+        try:
+            for batch_index in range(num_batches):
+                start = batch_index * batch_size
+                batch = chunks.slice(start, start + batch_size)
+                if checkpoint.is_upserted(batch_index):
+                    progress.advance("chunks_embedded", len(batch))
+                    progress.advance("points_upserted", len(batch))
+                    continue
+                progress.raise_if_cancelled()
+
+                label = f"batch {batch_index + 1}/{num_batches} of {checkpoint.filename}"
+                if checkpoint.is_embedded(batch_index):
+                    embeddings = checkpoint.load_embeddings(batch_index)
+                else:
+                    embeddings = retry_with_backoff(
+                        lambda: self.embeddings.embed_documents(batch.texts),
+                        f"Embedding {label}",
+                        attempts=MAX_ATTEMPTS,
+                    )
+                    checkpoint.save_embeddings(batch_index, embeddings)
+                progress.advance("chunks_embedded", len(batch))
+
+                batch.vectors = embeddings
+                common = {
+                    'source': checkpoint.filename,
+                    'file_hash': checkpoint.file_hash,
+                    'tenant_id': tenant,
+                    "timestamp": str(datetime.now()),
+                }
+                # The default tenant keeps the ids points had before tenancy
+                id_prefix = checkpoint.file_hash if tenant == DEFAULT_TENANT else f"{tenant}:{checkpoint.file_hash}"
+                ids = [str(uuid.uuid5(POINT_ID_NAMESPACE, f"{id_prefix}:{start + offset}"))
+                       for offset in range(len(batch))]
+                payloads = batch.payloads(common)
+                if self.slim_payloads:
+                    self.chunk_store.put_many(ids, payloads, tenant, checkpoint.file_hash)
+                    payloads = [slim_payload(tenant, checkpoint.file_hash)] * len(ids)
+
+                progress.raise_if_cancelled()
+                pending.append((uploader.submit(ids, batch.vectors, payloads), batch_index, len(batch)))
+                settle(block=False)
+            settle(block=True)
+        except BaseException:
+            # Record the uploads that did go through, so a rerun does not redo them
+            for future, batch_index, _ in pending:
+                try:
+                    future.result()
+                    checkpoint.mark_upserted(batch_index)
+                except Exception:
+                    pass
             raise
 
-    def run_ingestion_pipeline(self, file_paths: List[str]):
+    def run_ingestion_pipeline(self, file_paths: List[str], progress: Optional[IngestionProgress] = None,
+                               profile: Optional[str] = None, file_profiles: Optional[Dict[str, str]] = None,
+                               tenant: Optional[str] = None):
         """
         Runs the data ingestion pipeline
 
+        Progress is checkpointed per file (converted) and per batch (embedded,
+        upserted) under `checkpoint_dir`, so rerunning the pipeline on the
+        same files after a failure resumes from the last durable step, and
+        files that were fully ingested are skipped.
+
         Args:
             file_paths (List[str]): A list of file paths to the PDF files.
+            progress (IngestionProgress): Optional tracker for per-stage progress
+                (pages converted, chunks embedded, points upserted) and cancellation.
+            profile (str): Docling profile for this run; defaults to the instance's profile.
+            file_profiles (Dict[str, str]): Per-file profile overrides, keyed by file name.
+            tenant (str): Tenant the documents are ingested for; only its searches see them.
         """
-        try:
-            any_content = False
-            total_chunks = 0
-            all_chunks = []
-            
-            for i, file in enumerate(file_paths):
-                try:
+        progress = progress or IngestionProgress()
+        tenant = validate_tenant(tenant)
+        namespace = checkpoint_namespace(self.collection_name, tenant)
+
+        if self.create_qdrant_db():
+            # A new collection holds none of the points recorded as upserted
+            clear_checkpoints(self.collection_name, self.checkpoint_dir)
+
+        profile = get_profile(profile or self.profile).name
+        file_profiles = file_profiles or {}
 
-                    chunked_text = self.docling_load_and_split(file)
-                    
-                    if not chunked_text:
-                        continue
-                    
-                    file_name = os.path.basename(file)
-                    for j, chunk in enumerate(chunked_text):
-                        if chunk.page_content and chunk.page_content.strip():
-                            chunk_data_dict = {
-                                'text': chunk.page_content,
-                                'filename': file_name,
-                                'file_index': i,
-                                'metadata': chunk.metadata
-                            }
-                            
-                            all_chunks.append(chunk_data_dict)
-
-                    total_chunks += len(chunked_text)
-                    any_content = True
-                    
+        page_counts = [count_pdf_pages(file) for file in file_paths]
+        progress.set_total("pages_converted", sum(page_counts))
+
+        checkpoints = []
+        pages_done = 0
+        for i, file in enumerate(file_paths):
+            progress.raise_if_cancelled()
+            file_profile = get_profile(file_profiles.get(os.path.basename(file), profile))
+            # Checkpointed chunks are only reused when they were converted and split the same way
+            settings = {"chunker": CHUNKER_VERSION, "chunk_size": self.chunk_size, "chunk_overlap": self.chunk_overlap,
+                        "profile": file_profile.version(),
+                        "embedding": f"{self.embeddings.name}:{self.embeddings.model}"}
+            checkpoint = FileCheckpoint(namespace, file, self.checkpoint_dir, settings=settings)
+            if not checkpoint.converted:
+                try:
+                    chunks = self.convert_file(file, checkpoint.file_hash, progress, file_profile.name)
                 except Exception as e:
+                    chunks = []
+                # Files without content are not checkpointed so they are converted again on rerun
+                if chunks:
+                    self.delete_file_points(checkpoint.file_hash, tenant)
+                    checkpoint.save_chunks(chunks)
+            # Account for pages not reported during conversion (checkpointed, cached or failed files)
+            pages_done += page_counts[i]
+            progress.advance("pages_converted", pages_done - progress.snapshot()["pages_converted"]["done"])
+            progress.set_report("conversion", self.conversion_report())
+            if checkpoint.converted:
+                checkpoints.append(checkpoint)
+
+        if not checkpoints:
+            error_msg = "No valid content found in any of the provided files"
+            raise ValueError(error_msg)
+
+        total_chunks = sum(checkpoint.num_chunks for checkpoint in checkpoints)
+        progress.set_total("chunks_embedded", total_chunks)
+        progress.set_total("points_upserted", total_chunks)
+
+        uploader = PointUploader(self.client, self.collection_name, attempts=MAX_ATTEMPTS)
+        uploaded = {}
+        try:
+            for checkpoint in checkpoints:
+                if checkpoint.completed:
+                    progress.advance("chunks_embedded", checkpoint.num_chunks)
+                    progress.advance("points_upserted", checkpoint.num_chunks)
                     continue
-            
-            if not any_content:
-                error_msg = "No valid content found in any of the provided files"
-                raise ValueError(error_msg)
-            
-            # Create QdrantDB collection with all chunks
-            self.create_qdrant_db(all_chunks)
-            
-        except Exception as e:
-            raise
\ No newline at end of file
+                self.embed_and_upsert(checkpoint, progress, uploader, tenant)
+                uploaded[checkpoint.file_hash] = checkpoint.num_chunks
+            # Uploads are acknowledged before they are applied; wait until the points are visible
+            uploader.barrier(uploaded, conditions=tenant_conditions(tenant))
+        finally:
+            uploader.close()
+            progress.set_report("upload", uploader.stats())
@@ -0,0 +1,82 @@
+import threading
+import time
+from typing import Dict, Optional
+
+# Stages reported by the ingestion pipeline, in pipeline order.
+STAGES = ("pages_converted", "chunks_embedded", "points_upserted")
+
+
+class IngestionCancelled(Exception):
+    """Raised inside the ingestion pipeline when its job has been cancelled."""
+
+
+class IngestionProgress:
+    """
+    Thread-safe per-stage progress for one ingestion run.
+
+    The pipeline calls `set_total`/`advance` as work completes and
+    `raise_if_cancelled` between units of work; readers call `snapshot`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._stages = {stage: {"done": 0, "total": 0, "started_at": None, "updated_at": None} for stage in STAGES}
+        self._report: Dict[str, dict] = {}
+
+    def set_total(self, stage: str, total: int):
+        with self._lock:
+            self._stages[stage]["total"] = total
+
+    def add_total(self, stage: str, n: int):
+        with self._lock:
+            self._stages[stage]["total"] += n
+
+    def advance(self, stage: str, n: int = 1):
+        now = time.time()
+        with self._lock:
+            entry = self._stages[stage]
+            if entry["started_at"] is None:
+                entry["started_at"] = now
+            entry["done"] += n
+            entry["updated_at"] = now
+
+    def set_report(self, section: str, values: dict):
+        """Publish a named section of free-form figures (e.g. how pages were converted)."""
+        with self._lock:
+            self._report[section] = dict(values)
+
+    def report(self) -> Dict[str, dict]:
+        with self._lock:
+            return {section: dict(values) for section, values in self._report.items()}
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def raise_if_cancelled(self):
+        if self._cancelled.is_set():
+            raise IngestionCancelled("Ingestion was cancelled")
+
+    def snapshot(self, started_at: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Per-stage `done`/`total` counts and throughput in units per second.
+
+        Throughput is measured from `started_at` (the start of the run) when
+        given, otherwise from the first unit of the stage.
+        """
+        with self._lock:
+            stages = {stage: dict(entry) for stage, entry in self._stages.items()}
+        result = {}
+        for stage, entry in stages.items():
+            start = started_at or entry["started_at"]
+            elapsed = (entry["updated_at"] - start) if (start and entry["updated_at"]) else 0.0
+            result[stage] = {
+                "done": entry["done"],
+                "total": entry["total"],
+                "per_second": round(entry["done"] / elapsed, 2) if elapsed > 0 else None,
+            }
+        return result
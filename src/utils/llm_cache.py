@@ -0,0 +1,284 @@
+"""
+Persistent exact-match cache of LLM responses.
+
+The same prompts reach Gemini over and over: the routing prompt for repeated
+queries, the answer prompt when the retrieved context has not changed, and
+the grader prompts of unchanged eval examples. Every LLM call site goes
+through `LLMCache.call` (or `acall`), which serves a response stored for the
+same model, generation parameters and prompt instead of calling the model.
+
+Entries live in one SQLite file shared by all processes on the host. They
+expire after `ttl` seconds, and the least recently used are evicted once the
+cache holds more than `max_entries` entries or `max_bytes` of responses.
+Eviction scans the table, so each process runs it on its first write and then
+every `evict_every` writes; the caps can be exceeded by that many entries in
+between. Responses a call site cannot use (e.g. a routing answer that is not
+valid JSON) are rejected by its `cacheable` check and not stored.
+Call sites are named (router, retriever, grader), can be opted out with
+LLM_CACHE_DISABLED_SITES or per call, and have their own hit counts in `stats()`.
+
+Settings (environment variables):
+    LLM_CACHE                 Cache LLM responses (default 1)
+    LLM_CACHE_PATH            SQLite file (default .llm_cache/responses.sqlite)
+    LLM_CACHE_TTL             Seconds a response is served for, 0 for no expiry (default 604800, a week)
+    LLM_CACHE_MAX_ENTRIES     Entries kept (default 100000)
+    LLM_CACHE_MAX_BYTES       Total response size kept (default 256 MB)
+    LLM_CACHE_EVICT_EVERY     Writes between eviction passes (default 100)
+    LLM_CACHE_DISABLED_SITES  Comma-separated call sites that always call the model, e.g. "retriever"
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from src.utils.cassette import content_hash
+
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".llm_cache", "responses.sqlite"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 ** 2)))
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "100"))
+LLM_CACHE_DISABLED_SITES = frozenset(
+    site.strip() for site in os.getenv("LLM_CACHE_DISABLED_SITES", "").split(",") if site.strip()
+)
+
+# Generation settings that change the response, read from LangChain model objects
+_PARAMS = ("temperature", "top_p", "top_k", "max_output_tokens", "max_tokens")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def llm_params(llm) -> Dict[str, Any]:
+    """Generation parameters of a LangChain LLM that are part of the cache key."""
+    return {name: getattr(llm, name) for name in _PARAMS if getattr(llm, name, None) is not None}
+
+
+class LLMCache:
+    """SQLite-backed exact-match LLM response cache with TTL, size caps and per-site hit counts."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, enabled: bool = LLM_CACHE_ENABLED, ttl: float = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 disabled_sites: Iterable[str] = LLM_CACHE_DISABLED_SITES, evict_every: int = LLM_CACHE_EVICT_EVERY,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            path: SQLite file
+            enabled: When False every call goes to the model and nothing is stored
+            ttl: Seconds a response is served for; 0 for no expiry
+            max_entries: Entries above which the least recently used are evicted
+            max_bytes: Total response size above which the least recently used are evicted
+            disabled_sites: Call sites that bypass the cache
+            evict_every: Writes between eviction passes; 1 evicts on every write
+            clock: Time source (for tests)
+        """
+        self.path = path
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disabled_sites = set(disabled_sites)
+        self.evict_every = max(1, evict_every)
+        self._clock = clock
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def key(model: str, params: Optional[Dict[str, Any]], prompt: Any) -> str:
+        """Cache key of a call: the model, its generation parameters and the prompt's hash."""
+        prompt_hash = hashlib.sha256(
+            json.dumps(prompt, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()
+        return content_hash(model, params or {}, prompt_hash)
+
+    def _count(self, site: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(site, {"hits": 0, "misses": 0, "bypassed": 0})
+            counts[outcome] += 1
+
+    def _active(self, site: str, cache: bool) -> bool:
+        if self.enabled and cache and site not in self.disabled_sites:
+            return True
+        self._count(site, "bypassed")
+        return False
+
+    def get(self, key: str, site: str) -> Optional[Any]:
+        """Stored response for a key, or None on a miss (counted for `site`)."""
+        now = self._clock()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and self.ttl and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    row = None
+                if row is not None:
+                    conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning("LLM cache lookup failed: %s", e)
+            row = None
+        self._count(site, "misses" if row is None else "hits")
+        return None if row is None else json.loads(row[0])
+
+    def put(self, key: str, response: Any, site: str, model: str):
+        """Store a JSON-serializable response, evicting expired and least recently used entries every `evict_every` writes."""
+        data = json.dumps(response, ensure_ascii=False)
+        now = self._clock()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, site, model, response, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, site, model, data, len(data.encode("utf-8")), now, now),
+                )
+                if self._writes % self.evict_every == 0:
+                    self._evict(conn, now)
+                self._writes += 1
+        except sqlite3.Error as e:
+            logger.warning("LLM cache write failed: %s", e)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        if self.ttl:
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        # Drop the least recently used entries until both caps hold
+        excess_entries, excess_bytes, evict = entries - self.max_entries, size - self.max_bytes, []
+        for key, entry_size in conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            evict.append((key,))
+            excess_entries -= 1
+            excess_bytes -= entry_size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+
+    def call(self, site: str, model: str, prompt: Any, fn: Callable[[], Any],
+             params: Optional[Dict[str, Any]] = None, cache: bool = True,
+             cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Run an LLM call through the cache.
+
+        Args:
+            site: Call site name, e.g. "router", "retriever", "grader"
+            model: Model name
+            prompt: Prompt or messages sent, JSON-serializable
+            fn: Performs the call; its result must be JSON-serializable
+            params: Generation parameters that change the response (see `llm_params`)
+            cache: False to bypass the cache for this call
+            cacheable: Whether a live response may be stored; by default all are
+
+        Returns:
+            The cached or live response
+        """
+        if not self._active(site, cache):
+            return fn()
+        key = self.key(model, params, prompt)
+        response = self.get(key, site)
+        if response is None:
+            response = fn()
+            if cacheable is None or cacheable(response):
+                self.put(key, response, site, model)
+        return response
+
+    async def acall(self, site: str, model: str, prompt: Any, fn: Callable[[], Awaitable[Any]],
+                    params: Optional[Dict[str, Any]] = None, cache: bool = True,
+                    cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Async `call`, for a coroutine function `fn`."""
+        if not self._active(site, cache):
+            return await fn()
+        key = self.key(model, params, prompt)
+        response = self.get(key, site)
+        if response is None:
+            response = await fn()
+            if cacheable is None or cacheable(response):
+                self.put(key, response, site, model)
+        return response
+
+    def stats(self) -> dict:
+        """Hit, miss and bypass counts overall and per call site, and the stored entries and bytes."""
+        with self._lock:
+            sites = {site: dict(counts) for site, counts in self._counts.items()}
+        for counts in sites.values():
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / lookups, 4) if lookups else 0.0
+        totals = {name: sum(counts[name] for counts in sites.values()) for name in ("hits", "misses", "bypassed")}
+        lookups = totals["hits"] + totals["misses"]
+        entries = size = 0
+        if self.enabled and (self._conn is not None or os.path.exists(self.path)):
+            try:
+                with self._lock:
+                    entries, size = self._connect().execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                    ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning("LLM cache stats failed: %s", e)
+        return {
+            "enabled": self.enabled,
+            **totals,
+            "hit_rate": round(totals["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "sites": sites,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide LLM cache, configured from the LLM_CACHE_* settings unless `configure_llm_cache` was called."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
+
+
+def configure_llm_cache(**kwargs) -> LLMCache:
+    """Replace the process-wide LLM cache; takes the `LLMCache` arguments."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is not None:
+            _llm_cache.close()
+        _llm_cache = LLMCache(**kwargs)
+        return _llm_cache
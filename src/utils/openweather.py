@@ -1,20 +1,54 @@
 import os
 import requests
 from typing import Optional, Dict, Any
+from src.utils.cassette import get_cassette
+from src.utils import resilience
+from src.utils.weather_cache import WeatherCache, WeatherRefresher, get_weather_cache
+
+# Shared across service instances so keep-alive connections (and the TLS
+# session) to OpenWeatherMap are reused between requests.
+_session = requests.Session()
 
 
 class OpenWeatherService:
     """Service class for handling OpenWeatherMap API calls including geocoding and weather data."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[WeatherCache] = None):
         self.api_key = api_key or os.getenv("OPENWEATHER_API_KEY")
         if not self.api_key:
             raise ValueError("OpenWeather API key is required. Set OPENWEATHER_API_KEY environment variable.")
+        self.cache = cache or get_weather_cache()
         
         self.base_url = "https://api.openweathermap.org"
         self.geocoding_url = f"{self.base_url}/geo/1.0/direct"
         self.weather_url = f"{self.base_url}/data/2.5/weather"
     
+    def _get_json(self, url: str, params: Dict[str, Any], name: str, hedge: bool = False) -> Any:
+        """
+        GET a JSON endpoint, recorded/replayed through the cassette (API key excluded from the key).
+
+        The request is bounded by the current deadline and goes through the
+        OpenWeatherMap circuit breaker; `hedge` marks idempotent lookups that
+        may be sent twice when slow (see src/utils/resilience.py).
+        """
+        def fetch():
+            left = resilience.remaining()
+            timeout = 10 if left is None else max(min(10, left), 0.001)
+            try:
+                response = _session.get(url, params={**params, "appid": self.api_key}, timeout=timeout)
+            except requests.exceptions.Timeout as e:
+                if timeout < 10:
+                    # The timeout was shortened to the request's deadline, so the provider is not at fault
+                    raise resilience.DeadlineExceeded(f"{name} did not return before the deadline") from e
+                raise
+            response.raise_for_status()
+            return response.json()
+
+        return get_cassette().call(
+            "weather", {"url": url, "params": params},
+            lambda: resilience.call("openweather", name, fetch, hedge=hedge),
+        )
+    
     def geocode_location(self, location: str) -> Dict[str, Any]:
         """
         Convert location name to coordinates using OpenWeatherMap Geocoding API.
@@ -27,14 +61,11 @@ class OpenWeatherService:
         """
         params = {
             "q": location,
-            "limit": 1,
-            "appid": self.api_key
+            "limit": 1
         }
         
         try:
-            response = requests.get(self.geocoding_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(self.geocoding_url, params, "geocode", hedge=True)
             
             if not data:
                 raise ValueError(f"Location '{location}' not found")
@@ -66,14 +97,11 @@ class OpenWeatherService:
         params = {
             "lat": lat,
             "lon": lon,
-            "appid": self.api_key,
             "units": units
         }
         
         try:
-            response = requests.get(self.weather_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(self.weather_url, params, "weather")
             
             return {
                 "location": data.get("name", "Unknown"),
@@ -94,4 +122,47 @@ class OpenWeatherService:
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to get weather data: {str(e)}")
 
+    def current_weather(self, location: str, units: str = "metric") -> Dict[str, Any]:
+        """
+        Current weather for a location name, served from the weather cache when fresh.
+
+        Counts the lookup towards the location's popularity, which decides the
+        locations the background refresher keeps warm (see src/utils/weather_cache.py).
+
+        Args:
+            location: Location name (e.g., "London", "New York", "Tokyo")
+            units: Temperature units (metric, imperial, or standard)
+
+        Returns:
+            Dict containing weather data, as returned by `get_weather`
+        """
+        self.cache.record(location)
+        cached = self.cache.weather(location, units)
+        if cached is not None:
+            return cached
+        return self.fetch_current_weather(location, units)
+
+    def fetch_current_weather(self, location: str, units: str = "metric") -> Dict[str, Any]:
+        """Fetch the current weather for a location name into the cache, geocoding it unless its coordinates are cached."""
+        geocoded = self.cache.coordinates(location)
+        if geocoded is None:
+            geocoded = self.geocode_location(location)
+            self.cache.put_coordinates(location, geocoded)
+        weather_data = self.get_weather(geocoded["lat"], geocoded["lon"], units)
+        self.cache.put_weather(location, units, weather_data)
+        return weather_data
+
+
+def start_weather_refresher(service: Optional[OpenWeatherService] = None, **kwargs) -> WeatherRefresher:
+    """
+    Start the background refresher keeping the weather of popular locations warm.
+
+    Args:
+        service: Service fetching the weather. Defaults to `OpenWeatherService()`.
+        **kwargs: `WeatherRefresher` settings (top_n, interval, budget)
 
+    Returns:
+        The running refresher; call `stop()` on shutdown
+    """
+    service = service or OpenWeatherService()
+    return WeatherRefresher(service.cache, service.fetch_current_weather, **kwargs).start()
@@ -0,0 +1,264 @@
+"""
+Per-page triage between fast text extraction (pypdf) and Docling.
+
+Born-digital pages with only running text are extracted by pypdf in
+milliseconds; pages that show figures, ruled tables or scanned images need
+Docling's layout analysis, OCR and table-structure models. `triage_pdf`
+decides the route of every page from its content stream, without rendering.
+
+Fast pages are turned into Markdown with headings inferred from font sizes,
+so the chunker still sees the section structure.
+"""
+import os
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+load_dotenv()
+
+FAST = "fast"
+DOCLING = "docling"
+
+# Share of the page covered by images above which a page with little text is treated as scanned
+SCANNED_IMAGE_COVERAGE = 0.5
+# Pages with fewer extractable characters than this are scanned candidates
+MIN_TEXT_CHARS = 200
+# Share of the page covered by images above which a page is treated as having figures
+FIGURE_IMAGE_COVERAGE = float(os.getenv("TRIAGE_FIGURE_COVERAGE", "0.05"))
+# Rectangles and line segments drawn on a page above which it is treated as having a ruled table
+TABLE_RULING_OPS = int(os.getenv("TRIAGE_TABLE_RULING_OPS", "12"))
+# Lines with at least this many wide column gaps count as table rows
+TABLE_COLUMN_GAPS = 2
+# Consecutive table rows above which a page is treated as having an unruled table
+TABLE_MIN_ROWS = 3
+
+_COLUMN_GAP = re.compile(r"\S {3,}(?=\S)")
+
+
+class PageTriage:
+    """Route of one page and the evidence it was based on."""
+
+    __slots__ = ("page", "route", "reason", "text_chars", "image_coverage", "ruling_ops", "lines")
+
+    def __init__(self, page: int, route: str, reason: str, text_chars: int = 0,
+                 image_coverage: float = 0.0, ruling_ops: int = 0,
+                 lines: Optional[List[Tuple[str, float]]] = None):
+        self.page = page
+        self.route = route
+        self.reason = reason
+        self.text_chars = text_chars
+        self.image_coverage = image_coverage
+        self.ruling_ops = ruling_ops
+        # Extracted lines with font sizes, kept for fast pages
+        self.lines = lines or []
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != "lines"}
+
+
+def _multiply(m1, m2):
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (
+        a1 * a2 + b1 * c2, a1 * b2 + b1 * d2,
+        c1 * a2 + d1 * c2, c1 * b2 + d1 * d2,
+        e1 * a2 + f1 * c2 + e2, e1 * b2 + f1 * d2 + f2,
+    )
+
+
+def _image_names(page) -> set:
+    try:
+        xobjects = page["/Resources"]["/XObject"]
+    except (KeyError, TypeError):
+        return set()
+    names = set()
+    for name, ref in xobjects.items():
+        try:
+            if ref.get_object().get("/Subtype") == "/Image":
+                names.add(name)
+        except Exception:
+            continue
+    return names
+
+
+def scan_content(page) -> Tuple[float, int]:
+    """
+    Walk a page's content stream.
+
+    Returns:
+        Share of the page area covered by images (capped at 1) and the number
+        of rectangles and line segments drawn
+    """
+    from pypdf.generic import ContentStream
+
+    contents = page.get_contents()
+    if contents is None:
+        return 0.0, 0
+    if not isinstance(contents, ContentStream):
+        contents = ContentStream(contents, page.pdf)
+
+    image_names = _image_names(page)
+    ctm = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+    stack = []
+    image_area = 0.0
+    ruling_ops = 0
+    for operands, operator in contents.operations:
+        if operator == b"q":
+            stack.append(ctm)
+        elif operator == b"Q":
+            ctm = stack.pop() if stack else ctm
+        elif operator == b"cm":
+            try:
+                ctm = _multiply(tuple(float(x) for x in operands), ctm)
+            except (TypeError, ValueError):
+                continue
+        elif operator == b"Do" and operands and operands[0] in image_names:
+            # Images are drawn into the unit square, so the area is the CTM determinant
+            image_area += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+        elif operator == b"INLINE IMAGE":
+            image_area += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+        elif operator in (b"re", b"l"):
+            ruling_ops += 1
+
+    box = page.mediabox
+    page_area = abs(float(box.width) * float(box.height)) or 1.0
+    return min(image_area / page_area, 1.0), ruling_ops
+
+
+def _has_text_table(page) -> bool:
+    """Detect unruled tables: consecutive lines split into columns by wide gaps."""
+    try:
+        text = page.extract_text(extraction_mode="layout")
+    except Exception:
+        return False
+    rows = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            # Layout mode reproduces vertical spacing as blank lines
+            continue
+        if len(_COLUMN_GAP.findall(line)) >= TABLE_COLUMN_GAPS:
+            rows += 1
+            if rows >= TABLE_MIN_ROWS:
+                return True
+        else:
+            rows = 0
+    return False
+
+
+def triage_page(page, number: int) -> PageTriage:
+    """
+    Decide whether a page can be extracted by pypdf or needs Docling.
+
+    The cheap checks (extracted text, images and ruling in the content stream)
+    run first; the layout-mode extraction that finds unruled tables only runs
+    on pages that passed them.
+
+    Args:
+        page: pypdf page
+        number: 1-based page number
+
+    Returns:
+        PageTriage with route FAST or DOCLING and the reason (text, empty,
+        scanned, figure, table, or unreadable when the page could not be parsed)
+    """
+    try:
+        lines = extract_lines(page)
+        text_chars = sum(len(text) for text, _ in lines)
+        image_coverage, ruling_ops = scan_content(page)
+    except Exception:
+        return PageTriage(number, DOCLING, "unreadable")
+
+    evidence = dict(text_chars=text_chars, image_coverage=round(image_coverage, 3), ruling_ops=ruling_ops)
+    if image_coverage >= SCANNED_IMAGE_COVERAGE and text_chars < MIN_TEXT_CHARS:
+        return PageTriage(number, DOCLING, "scanned", **evidence)
+    if image_coverage >= FIGURE_IMAGE_COVERAGE:
+        return PageTriage(number, DOCLING, "figure", **evidence)
+    if ruling_ops >= TABLE_RULING_OPS or (text_chars and _has_text_table(page)):
+        return PageTriage(number, DOCLING, "table", **evidence)
+    if not text_chars:
+        return PageTriage(number, FAST, "empty", **evidence)
+    return PageTriage(number, FAST, "text", lines=lines, **evidence)
+
+
+def extract_lines(page) -> List[Tuple[str, float]]:
+    """Text lines of a page with the largest font size used on each line."""
+    lines: List[Tuple[str, float]] = []
+    current: List[str] = []
+    size = 0.0
+
+    def flush():
+        nonlocal current, size
+        line = " ".join("".join(current).split())
+        if line:
+            lines.append((line, round(size, 1)))
+        current, size = [], 0.0
+
+    def visitor(text, cm, tm, font_dict, font_size):
+        nonlocal size
+        # Rendered size: font size scaled by the text and transformation matrices
+        scale = abs(tm[3] or tm[0]) * abs(cm[3] or cm[0])
+        parts = text.split("\n")
+        for i, part in enumerate(parts):
+            if i:
+                flush()
+            if part.strip():
+                current.append(part)
+                size = max(size, (font_size or 0) * (scale or 1))
+            elif part:
+                current.append(part)
+
+    page.extract_text(visitor_text=visitor)
+    flush()
+    return lines
+
+
+def body_font_size(triage: List[PageTriage]) -> float:
+    """Font size covering the most characters on the fast pages, i.e. the size of running text."""
+    sizes = Counter()
+    for page in triage:
+        for text, size in page.lines:
+            sizes[size] += len(text)
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+
+def lines_to_markdown(lines: List[Tuple[str, float]], body_size: float) -> str:
+    """
+    Render extracted lines as Markdown, marking short lines set clearly larger
+    than running text as `#` (title size) or `##` (section size) headings.
+    """
+    out = []
+    for text, size in lines:
+        heading = body_size and len(text) <= 120 and not text.endswith((".", ",", ";"))
+        if heading and size >= body_size * 1.5:
+            out.append(f"\n# {text}\n")
+        elif heading and size >= body_size * 1.15:
+            out.append(f"\n## {text}\n")
+        else:
+            out.append(text)
+    return "\n".join(out).strip()
+
+
+def triage_pdf(file_path: str) -> Tuple[list, List[PageTriage]]:
+    """
+    Triage every page of a PDF.
+
+    Returns:
+        The pypdf pages and one PageTriage per page
+    """
+    from pypdf import PdfReader
+
+    pages = list(PdfReader(file_path).pages)
+    return pages, [triage_page(page, number) for number, page in enumerate(pages, start=1)]
+
+
+def page_runs(triage: List[PageTriage]) -> List[Tuple[str, int, int]]:
+    """Group consecutive pages with the same route into (route, first page, last page) runs, 1-based."""
+    runs: List[Tuple[str, int, int]] = []
+    for page in triage:
+        if runs and runs[-1][0] == page.route and runs[-1][2] == page.page - 1:
+            runs[-1] = (page.route, runs[-1][1], page.page)
+        else:
+            runs.append((page.route, page.page, page.page))
+    return runs
@@ -19,19 +19,21 @@ Question: {query}
 Answer:"""
 
 
-WEATHER_CLASSIFICATION_PROMPT = """Analyze the user query and determine if it's asking about weather information. If it is a weather query, extract the location mentioned.
+WEATHER_CLASSIFICATION_PROMPT = """Analyze the user query and determine if it's asking about weather information. If it is a weather query, extract the location mentioned, and determine whether it also asks a question about the user's documents (manuals, reports, papers).
 
 User query: {query}
 
 Return your response in the following JSON format:
 {{
     "is_weather": True/False,
-    "location": "extracted location or null"
+    "location": "extracted location or null",
+    "needs_documents": True/False
 }}
 
 Examples:
-- "What's the weather in New York?" → {{"is_weather": True, "location": "New York"}}
-- "How's the weather today in London?" → {{"is_weather": True, "location": "London"}}
-- "Tell me about Python programming" → {{"is_weather": False, "location": null}}
-- "What's the temperature in Paris?" → {{"is_weather": True, "location": "Paris"}}"""
+- "What's the weather in New York?" → {{"is_weather": True, "location": "New York", "needs_documents": False}}
+- "How's the weather today in London?" → {{"is_weather": True, "location": "London", "needs_documents": False}}
+- "Tell me about Python programming" → {{"is_weather": False, "location": null, "needs_documents": False}}
+- "What's the temperature in Paris?" → {{"is_weather": True, "location": "Paris", "needs_documents": False}}
+- "What's the weather in Oslo and what does the manual say about cold starts?" → {{"is_weather": True, "location": "Oslo", "needs_documents": True}}"""
 
@@ -0,0 +1,164 @@
+"""
+Pipelined, parallel point uploads to Qdrant.
+
+Ingestion embeds a batch and hands its points to a `PointUploader`, which
+uploads them on worker threads while the next batch is being embedded.
+Uploads use `wait=False`, so Qdrant acknowledges a batch once it is in its
+write-ahead log instead of after indexing; `barrier()` then waits until the
+points of every uploaded file are visible before the run reports success.
+
+Vectors are passed as contiguous float32 matrices. Over gRPC
+(QDRANT_PREFER_GRPC=1) they are sent as packed float32 arrays; over REST
+they are serialized to JSON.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.utils.ingest_checkpoint import retry_with_backoff
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Concurrent upload requests
+UPSERT_WORKERS = int(os.getenv("INGEST_UPSERT_WORKERS", "4"))
+# Batches allowed in flight before embedding waits for uploads to catch up
+UPSERT_MAX_PENDING = int(os.getenv("INGEST_UPSERT_MAX_PENDING", str(2 * UPSERT_WORKERS)))
+# Seconds to wait for acknowledged points to become visible
+BARRIER_TIMEOUT = float(os.getenv("INGEST_UPSERT_BARRIER_TIMEOUT", "120"))
+
+
+class PointUploader:
+    """Uploads batches of points on a bounded pool of worker threads and tracks throughput."""
+
+    def __init__(self, client, collection_name: str, workers: Optional[int] = None,
+                 max_pending: Optional[int] = None, attempts: int = 4):
+        """
+        Args:
+            client: QdrantClient
+            collection_name: Collection the points go to
+            workers: Concurrent upload requests (default INGEST_UPSERT_WORKERS)
+            max_pending: Batches queued or in flight before `submit` blocks
+                (default INGEST_UPSERT_MAX_PENDING)
+            attempts: Attempts per batch before its future fails
+        """
+        self.client = client
+        self.collection_name = collection_name
+        self.workers = workers or UPSERT_WORKERS
+        self.attempts = attempts
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qdrant-upload")
+        self._slots = threading.BoundedSemaphore(max(max_pending or UPSERT_MAX_PENDING, self.workers))
+        self._lock = threading.Lock()
+        self.points = 0
+        self.batches = 0
+        self._first_submit: Optional[float] = None
+        self._last_done: Optional[float] = None
+        self.barrier_seconds = 0.0
+
+    def submit(self, ids: List[str], vectors: np.ndarray, payloads: List[dict]) -> Future:
+        """
+        Queue one batch for upload; blocks while `max_pending` batches are outstanding.
+
+        Args:
+            ids: Point ids
+            vectors: float32 matrix with one row per point
+            payloads: Payload per point
+
+        Returns:
+            Future resolved once Qdrant acknowledged the batch; it raises the
+            last error if every attempt failed
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self._slots.acquire()
+        if self._first_submit is None:
+            self._first_submit = time.perf_counter()
+        try:
+            future = self._executor.submit(self._upload, ids, vectors, payloads)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _upload(self, ids: List[str], vectors: np.ndarray, payloads: List[dict]):
+        retry_with_backoff(
+            lambda: self.client.upload_collection(
+                collection_name=self.collection_name,
+                vectors=vectors,
+                payload=payloads,
+                ids=ids,
+                batch_size=len(ids),
+                max_retries=1,
+                wait=False,
+            ),
+            f"Uploading {len(ids)} points",
+            attempts=self.attempts,
+        )
+        with self._lock:
+            self.points += len(ids)
+            self.batches += 1
+            self._last_done = time.perf_counter()
+
+    def barrier(self, expected: Dict[str, int], timeout: float = BARRIER_TIMEOUT, poll: float = 0.2,
+                conditions: Optional[list] = None):
+        """
+        Wait until the acknowledged points are visible: the collection holds
+        the expected number of points for each file.
+
+        Args:
+            expected: Point count per file hash (`metadata.file_hash`)
+            timeout: Seconds to wait before raising
+            poll: Initial delay between checks, doubled up to 2 seconds
+            conditions: Further filter conditions of the counted points, e.g. their tenant
+
+        Raises:
+            TimeoutError: If some file's points are still missing after `timeout`
+        """
+        from qdrant_client import models
+
+        start = time.perf_counter()
+        remaining = dict(expected)
+        while remaining:
+            for file_hash, count in list(remaining.items()):
+                found = self.client.count(
+                    collection_name=self.collection_name,
+                    count_filter=models.Filter(must=[
+                        models.FieldCondition(key="metadata.file_hash", match=models.MatchValue(value=file_hash)),
+                        *(conditions or []),
+                    ]),
+                    exact=True,
+                ).count
+                if found >= count:
+                    del remaining[file_hash]
+            if not remaining:
+                break
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"Points of {len(remaining)} file(s) not visible after {timeout:.0f}s")
+            time.sleep(poll)
+            poll = min(poll * 2, 2.0)
+        self.barrier_seconds += time.perf_counter() - start
+
+    def stats(self) -> dict:
+        """Points uploaded and upload throughput from the first submit to the last acknowledgement."""
+        with self._lock:
+            seconds = (self._last_done - self._first_submit) if self._last_done and self._first_submit else 0.0
+            return {
+                "points": self.points,
+                "batches": self.batches,
+                "workers": self.workers,
+                "seconds": round(seconds, 3),
+                "points_per_second": round(self.points / seconds, 1) if seconds else 0.0,
+                "barrier_seconds": round(self.barrier_seconds, 3),
+                "transport": "grpc" if getattr(getattr(self.client, "_client", None), "_prefer_grpc", False) else "rest",
+            }
+
+    def close(self):
+        """Wait for outstanding uploads and stop the worker threads."""
+        self._executor.shutdown(wait=True)
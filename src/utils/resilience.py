@@ -0,0 +1,365 @@
+"""
+Deadlines, hedged requests and circuit breakers for calls to external providers.
+
+Gemini, Qdrant Cloud and OpenWeatherMap all have long latency tails. Every
+provider call of the retriever, the router and the weather service goes
+through `call`, which
+- bounds the call by the time left before the request's deadline. The graph
+  state carries an absolute deadline (`deadline`); nodes make it current with
+  `deadline_scope`, and a call that would outlive it raises `DeadlineExceeded`
+  instead of blocking the user until the client's own timeout
+- for idempotent reads (query embedding, vector search, geocoding), sends a
+  duplicate request once the first has been outstanding for longer than the
+  recent p95 latency of that call, and returns whichever finishes first
+- fails fast with `CircuitOpenError` while a provider's circuit breaker is
+  open: after `RAG_BREAKER_FAILURES` consecutive failures calls are refused
+  for `RAG_BREAKER_COOLDOWN` seconds, then a single trial call decides whether
+  the circuit closes again
+
+Only provider errors and provider timeouts count towards a breaker; a call
+that runs out of the caller's own deadline does not, so requests with short
+budgets cannot open the circuit of a healthy provider.
+
+A call abandoned at its deadline, or the slower attempt of a hedged read,
+keeps its worker thread until the provider answers or the client's own
+timeout fires; its result is discarded, and an error it ends with still
+counts towards the breaker. While `RAG_MAX_ABANDONED_CALLS` abandoned calls
+are still running, reads are not hedged, so a slow provider cannot fill the
+pool with duplicates.
+
+Settings (environment variables):
+    RAG_REQUEST_DEADLINE   Seconds a graph run may take when no deadline is given (default 30)
+    RAG_HEDGING            Hedge idempotent reads (default 1)
+    RAG_HEDGE_DELAY        Hedge delay until a call has enough latency samples for its p95 (default 1.0)
+    RAG_HEDGE_WORKERS      Threads running provider calls (default 64)
+    RAG_MAX_ABANDONED_CALLS  Abandoned calls still running above which reads are not hedged (default 16)
+    RAG_BREAKER_FAILURES   Consecutive failures that open a provider's circuit (default 5)
+    RAG_BREAKER_COOLDOWN   Seconds a circuit stays open before a trial call (default 30)
+"""
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DEADLINE = float(os.getenv("RAG_REQUEST_DEADLINE", "30"))
+HEDGING = os.getenv("RAG_HEDGING", "1") == "1"
+HEDGE_DELAY = float(os.getenv("RAG_HEDGE_DELAY", "1.0"))
+HEDGE_WORKERS = int(os.getenv("RAG_HEDGE_WORKERS", "64"))
+MAX_ABANDONED_CALLS = int(os.getenv("RAG_MAX_ABANDONED_CALLS", "16"))
+BREAKER_FAILURES = int(os.getenv("RAG_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("RAG_BREAKER_COOLDOWN", "30"))
+
+# Latency samples a call needs before its p95 replaces HEDGE_DELAY
+MIN_HEDGE_SAMPLES = 20
+
+
+class ResilienceError(Exception):
+    """A call was not made, or abandoned, to protect the request or the provider."""
+
+
+class DeadlineExceeded(ResilienceError, TimeoutError):
+    """The request's deadline passed before the call returned."""
+
+
+class CircuitOpenError(ResilienceError, RuntimeError):
+    """The provider's circuit breaker is open, so the call was refused."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"{provider} is unavailable (circuit open)")
+        self.provider = provider
+
+
+def error_code(error: BaseException) -> str:
+    """Short error kind recorded in the graph state (`error`)."""
+    if isinstance(error, DeadlineExceeded):
+        return "deadline_exceeded"
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    return "provider_error"
+
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("rag_deadline", default=None)
+
+
+def new_deadline(budget: Optional[float] = None) -> float:
+    """Absolute deadline (epoch seconds) `budget` seconds from now; RAG_REQUEST_DEADLINE by default."""
+    return time.time() + (REQUEST_DEADLINE if budget is None else budget)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]):
+    """Make `deadline` the deadline of the calls made in this block (and the threads they start)."""
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single trial call after the cooldown."""
+
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failures
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and self._clock() - self._opened_at >= self.cooldown:
+                return "half_open"
+            return self._state
+
+    def before(self):
+        """
+        Admit a call.
+
+        Raises:
+            CircuitOpenError: While the circuit is open, or a trial call is already running
+        """
+        with self._lock:
+            if self._state == "open" and self._clock() - self._opened_at >= self.cooldown:
+                self._state, self._trial = "half_open", False
+            if self._state == "open" or (self._state == "half_open" and self._trial):
+                self.rejected += 1
+                raise CircuitOpenError(self.name)
+            if self._state == "half_open":
+                self._trial = True
+
+    def success(self):
+        with self._lock:
+            self._state, self._failures, self._trial = "closed", 0, False
+
+    def release(self):
+        """Neither a success nor a failure (e.g. the caller's deadline passed): free the trial slot."""
+        with self._lock:
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.opened += 1
+                    logger.warning("Circuit for %s opened after %d failures", self.name, self._failures)
+                self._state, self._opened_at, self._trial = "open", self._clock(), False
+
+    def stats(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {"state": state, "failures": self._failures, "opened": self.opened, "rejected": self.rejected}
+
+
+class LatencyTracker:
+    """Recent successful latencies of a call, for its hedge delay."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count_hedge(self, won: bool = False):
+        with self._lock:
+            if won:
+                self.hedge_wins += 1
+            else:
+                self.hedged += 1
+
+    def hedge_delay(self) -> float:
+        """p95 of the recent latencies, or HEDGE_DELAY until there are enough samples."""
+        with self._lock:
+            if len(self._samples) < MIN_HEDGE_SAMPLES:
+                return HEDGE_DELAY
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def stats(self) -> dict:
+        delay = self.hedge_delay()
+        with self._lock:
+            return {"samples": len(self._samples), "hedge_delay_s": round(delay, 4),
+                    "hedged": self.hedged, "hedge_wins": self.hedge_wins}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_trackers: Dict[str, LatencyTracker] = {}
+_registry_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="provider-call")
+# Calls abandoned (deadline passed, hedge lost) that still hold a worker thread
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _registry_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def _tracker(name: str) -> LatencyTracker:
+    with _registry_lock:
+        if name not in _trackers:
+            _trackers[name] = LatencyTracker()
+        return _trackers[name]
+
+
+def _provider_fault(error: BaseException) -> bool:
+    """Whether a failure counts against the provider; rejected requests (4xx except 429) do not."""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return not (isinstance(status, int) and 400 <= status < 500 and status != 429)
+
+
+def _submit(fn: Callable[[], Any]) -> Future:
+    # Each attempt runs in its own copy of the caller's context, so it sees the deadline
+    return _executor.submit(contextvars.copy_context().run, fn)
+
+
+def abandoned_calls() -> int:
+    """Abandoned provider calls still holding a worker thread."""
+    with _abandoned_lock:
+        return _abandoned
+
+
+def _abandon(futures, breaker: CircuitBreaker):
+    """Stop waiting for calls; provider errors they end with still count towards the breaker."""
+    global _abandoned
+
+    def landed(future: Future):
+        global _abandoned
+        with _abandoned_lock:
+            _abandoned -= 1
+        error = future.exception()
+        if error is not None and not isinstance(error, DeadlineExceeded) and _provider_fault(error):
+            breaker.failure()
+
+    for future in futures:
+        with _abandoned_lock:
+            _abandoned += 1
+        future.add_done_callback(landed)
+
+
+def _hedged(name: str, fn: Callable[[], Any], timeout: Optional[float], tracker: LatencyTracker,
+            breaker: CircuitBreaker) -> Any:
+    first = _submit(fn)
+    delay = tracker.hedge_delay()
+    if timeout is not None and delay >= timeout:
+        return _result(name, first, timeout, breaker)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+
+    tracker.count_hedge()
+    second = _submit(fn)
+    pending = {first, second}
+    until = None if timeout is None else time.monotonic() + timeout - delay
+    error: Optional[BaseException] = None
+    while pending:
+        left = None if until is None else max(until - time.monotonic(), 0)
+        done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+        if not done:
+            _abandon(pending, breaker)
+            raise DeadlineExceeded(f"{name} did not return before the deadline")
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    tracker.count_hedge(won=True)
+                _abandon(pending, breaker)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _result(name: str, future: Future, timeout: Optional[float], breaker: CircuitBreaker) -> Any:
+    done, _ = wait([future], timeout=timeout)
+    if not done:
+        _abandon([future], breaker)
+        raise DeadlineExceeded(f"{name} did not return before the deadline")
+    return future.result()
+
+
+def call(provider: str, name: str, fn: Callable[[], Any], hedge: bool = False) -> Any:
+    """
+    Make a provider call within the current deadline, behind the provider's circuit breaker.
+
+    Args:
+        provider: Provider whose circuit breaker guards the call ("gemini", "qdrant", "openweather")
+        name: Call name, for its latency statistics (e.g. "embedding", "search", "geocode")
+        fn: Performs the call
+        hedge: The call is an idempotent read that may be sent twice
+
+    Returns:
+        The result of `fn`
+
+    Raises:
+        DeadlineExceeded: If the deadline passed, or passes before the call returns; `fn`
+            raises it too when a client timeout it shortened to the deadline fires
+        CircuitOpenError: If the provider's circuit is open
+    """
+    budget = remaining()
+    if budget is not None and budget <= 0:
+        raise DeadlineExceeded(f"No time left for {name}")
+    breaker = get_breaker(provider)
+    breaker.before()
+    tracker = _tracker(name)
+    start = time.perf_counter()
+    try:
+        if hedge and HEDGING and abandoned_calls() < MAX_ABANDONED_CALLS:
+            result = _hedged(name, fn, budget, tracker, breaker)
+        else:
+            result = _result(name, _submit(fn), budget, breaker)
+    except DeadlineExceeded:
+        # The caller's budget ran out, which says nothing about the provider
+        breaker.release()
+        raise
+    except Exception as e:
+        if _provider_fault(e):
+            breaker.failure()
+        else:
+            breaker.success()
+        raise
+    breaker.success()
+    tracker.record(time.perf_counter() - start)
+    return result
+
+
+def stats() -> dict:
+    """Circuit breaker state per provider, hedging statistics per call, and abandoned calls still running."""
+    with _registry_lock:
+        breakers, trackers = dict(_breakers), dict(_trackers)
+    return {
+        "breakers": {provider: breaker.stats() for provider, breaker in breakers.items()},
+        "calls": {name: tracker.stats() for name, tracker in trackers.items()},
+        "abandoned_calls": abandoned_calls(),
+    }
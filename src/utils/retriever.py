@@ -1,65 +1,216 @@
-from langchain_google_genai import GoogleGenerativeAI
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-import google.generativeai as gemini_client
-
-import qdrant_client
+from langchain_core.runnables import RunnableLambda
 from src.utils.prompts import RETRIEVER_PROMPT
+from src.utils.cassette import get_cassette
+from src.utils.clients import get_llm, get_qdrant_client
+from src.utils.llm_cache import get_llm_cache, llm_params
+from src.utils import resilience
+from src.utils.embeddings import EmbeddingProvider, collection_embedding, provider_for_embedding
+from src.utils.tenancy import tenant_filter, validate_tenant
+from src.utils.chunk_store import get_chunk_store
 import os
+from typing import List, Optional
 
 from dotenv import load_dotenv
 load_dotenv()
 
+# Payload fields a search returns; points with slim payloads have their text in the chunk store
+PAYLOAD_FIELDS = ["page_content", "metadata"]
+
 class Retriever:
-    def __init__(self, collection_name: str = "uploaded-pdfs"):
+    def __init__(self, collection_name: str = "uploaded-pdfs", embeddings: Optional[EmbeddingProvider] = None,
+                 tenant: Optional[str] = None):
 
         self.qdrant_url = os.getenv("QDRANT_CLOUD_URL")
         self.qdrant_api_key = os.getenv("QDRANT_API_KEY")
-        
+
         if not self.qdrant_api_key:
             raise ValueError("QDRANT_API_KEY environment variable is not set. Please set it with your QDrant Cloud API key.")
-        
-        self.client = qdrant_client.QdrantClient(
-            url=self.qdrant_url,
-            api_key=self.qdrant_api_key,
-        )
+
+        # Clients are shared across Retriever instances so connections are reused
+        self.client = get_qdrant_client()
         self.collection_name = collection_name
-        
-        self.llm = GoogleGenerativeAI(model="gemini-2.0-flash")
-        
-        gemini_client.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-    def retrieve(self, query: str, k: int = 7):
-        """Retrieve top-k similar chunks from Qdrant"""
-        # results = self.vector_store.similarity_search(query, k=k)
-        results = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=gemini_client.embed_content(
-                    model="models/embedding-001",
-                    content=query,
-                    task_type="retrieval_query",
-                )["embedding"],
-                limit=k,
+        # Resolved on first use from the collection's metadata, so queries are
+        # embedded with the model the documents were embedded with
+        self._embeddings = embeddings
+        # Searches only see the documents ingested for this tenant
+        self.tenant = validate_tenant(tenant)
+
+        self.llm = get_llm("gemini-2.0-flash")
+
+    @property
+    def embeddings(self) -> EmbeddingProvider:
+        """Embedding provider recorded in the collection (the configured default for a missing collection)"""
+        if self._embeddings is None:
+            recorded = get_cassette().call(
+                "collection_embedding", {"collection": self.collection_name},
+                lambda: collection_embedding(self.client, self.collection_name),
             )
+            self._embeddings = provider_for_embedding(recorded)
+        return self._embeddings
+
+    @staticmethod
+    def _embed(embeddings: EmbeddingProvider, texts: List[str], name: str, hedge: bool) -> List[List[float]]:
+        embed = lambda: embeddings.embed_queries(texts).tolist()
+        if not embeddings.remote:
+            return embed()
+        return resilience.call(embeddings.name, name, embed, hedge=hedge)
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed all queries with a single batch embedding request"""
+        embeddings = self.embeddings
+        return get_cassette().call(
+            "embedding", {"model": embeddings.model, "task_type": "retrieval_query", "content": queries},
+            lambda: self._embed(embeddings, queries, "embedding_batch", hedge=False),
+        )
 
-        formatted_results = []
-        for result in results:       
-            formatted_results.append({
-                'page_content': result.payload.get('page_content', ''),
-                'metadata': result.payload.get('metadata', {})
+    def embed_query(self, query: str) -> List[float]:
+        """Query embedding used for search (also reused by the routing classifier)"""
+        embeddings = self.embeddings
+        return get_cassette().call(
+            "embedding", {"model": embeddings.model, "task_type": "retrieval_query", "content": query},
+            lambda: self._embed(embeddings, [query], "embedding", hedge=True)[0],
+        )
+
+    def _generate(self, prompt: str) -> str:
+        return get_cassette().call(
+            "llm", {"model": self.llm.model, "prompt": prompt},
+            lambda: get_llm_cache().call(
+                "retriever", self.llm.model, prompt,
+                lambda: resilience.call("gemini", "generate", lambda: self.llm.invoke(prompt)),
+                params=llm_params(self.llm),
+            ),
+        )
+
+    def _format_results(self, points) -> List[dict]:
+        """Hits as chunks, reading the text of points with slim payloads from the chunk store"""
+        slim = [point.id for point in points if 'page_content' not in (point.payload or {})]
+        stored = get_chunk_store(self.collection_name).get_many(slim) if slim else {}
+        results = []
+        for point in points:
+            payload = point.payload or {}
+            if 'page_content' not in payload:
+                payload = stored.get(str(point.id), payload)
+            results.append({
+                'page_content': payload.get('page_content', ''),
+                'metadata': payload.get('metadata', {})
             })
-        
-        return formatted_results
+        return results
 
-    def generate_response(self, query: str, k: int = 7) -> str:
-        """Retrieve context and generate a response with Gemini 2 Flash"""
-        docs = self.retrieve(query, k=k)
-        
+    @staticmethod
+    def _build_prompt(query: str, docs: List[dict]) -> str:
         context = "\n\n".join(
             [f"[Metadata - {d['metadata']}]\n{d['page_content']}" for d in docs]
         )
 
         # Create prompt with context using the imported prompt template
-        prompt = RETRIEVER_PROMPT.format(context=context, query=query)
+        return RETRIEVER_PROMPT.format(context=context, query=query)
+
+    def retrieve(self, query: str, k: int = 7, vector: Optional[List[float]] = None):
+        """Retrieve top-k similar chunks from Qdrant, searching with `vector` if the query was already embedded"""
+        if vector is None:
+            vector = self.embed_query(query)
+
+        def search():
+            results = self.client.query_points(
+                collection_name=self.collection_name,
+                query=vector,
+                query_filter=tenant_filter(self.tenant),
+                limit=k,
+                with_payload=PAYLOAD_FIELDS,
+                with_vectors=False,
+            ).points
+            return self._format_results(results)
+
+        return get_cassette().call(
+            "search", {"collection": self.collection_name, "tenant": self.tenant, "vector": vector, "k": k},
+            lambda: resilience.call("qdrant", "search", search, hedge=True),
+        )
 
-        response = self.llm.invoke(prompt)
-        return response
\ No newline at end of file
+    def retrieve_batch(self, queries: List[str], k: int = 7) -> List[List[dict]]:
+        """
+        Retrieve top-k similar chunks for many queries at once.
+
+        All queries are embedded in one request and searched with a single
+        Qdrant batch query, instead of one round trip of each per query.
+
+        Args:
+            queries: Queries to retrieve context for
+            k: Number of chunks to return per query
+
+        Returns:
+            One list of chunks per query, in input order
+        """
+        if not queries:
+            return []
+
+        from qdrant_client import models
+
+        vectors = self._embed_queries(queries)
+        query_filter = tenant_filter(self.tenant)
+
+        def search_batch():
+            responses = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    models.QueryRequest(query=vector, filter=query_filter, limit=k,
+                                        with_payload=PAYLOAD_FIELDS, with_vector=False)
+                    for vector in vectors
+                ],
+            )
+            return [self._format_results(response.points) for response in responses]
+
+        return get_cassette().call(
+            "search_batch", {"collection": self.collection_name, "tenant": self.tenant, "vectors": vectors, "k": k},
+            lambda: resilience.call("qdrant", "search_batch", search_batch),
+        )
+
+    def generate_response(self, query: str, k: int = 7) -> str:
+        """Retrieve context and generate a response with Gemini 2 Flash"""
+        return self.generate_response_with_sources(query, k=k)["answer"]
+
+    def generate_response_with_sources(self, query: str, k: int = 7, documents: Optional[List[dict]] = None,
+                                       vector: Optional[List[float]] = None) -> dict:
+        """
+        Retrieve context and generate a response, returning both.
+
+        Args:
+            query: User query
+            k: Number of chunks to use as context
+            documents: Chunks already retrieved for the query (e.g. speculatively); skips retrieval
+            vector: Query embedding computed during routing; skips embedding the query again
+
+        Returns:
+            Dict with the generated `answer` and the retrieved `documents` it was based on
+        """
+        docs = documents if documents is not None else self.retrieve(query, k=k, vector=vector)
+
+        prompt = self._build_prompt(query, docs)
+
+        response = self._generate(prompt)
+        return {"answer": response, "documents": docs}
+
+    def generate_batch(self, queries: List[str], k: int = 7, max_concurrency: int = 4,
+                       return_exceptions: bool = False) -> List[str]:
+        """
+        Generate responses for many queries.
+
+        Retrieval is batched (see `retrieve_batch`) and generation runs with at
+        most `max_concurrency` Gemini calls in flight.
+
+        Args:
+            queries: Queries to answer
+            k: Number of chunks to use as context per query
+            max_concurrency: Maximum concurrent generation calls
+            return_exceptions: Return failed generations as exceptions in place
+                of their answer instead of raising the first failure
+
+        Returns:
+            One response per query, in input order
+        """
+        docs_batch = self.retrieve_batch(queries, k=k)
+        prompts = [self._build_prompt(query, docs) for query, docs in zip(queries, docs_batch)]
+        return RunnableLambda(self._generate).batch(
+            prompts,
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=return_exceptions,
+        )
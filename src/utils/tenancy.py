@@ -0,0 +1,117 @@
+"""
+Tenant isolation within a Qdrant collection.
+
+Every point carries the tenant it was ingested for in `metadata.tenant_id`,
+indexed as Qdrant's tenant key (`is_tenant`), so the points of a tenant are
+stored together and each search only visits them. New collections build HNSW
+graphs per tenant (`payload_m`) instead of one global graph (`m=0`), so
+search cost follows the size of a tenant's own corpus.
+
+Points ingested before tenancy have no tenant and belong to the default
+tenant. A tenant's data, points, chunk store records and ingestion
+checkpoints, is dropped with one `drop_tenant` call.
+"""
+import os
+import re
+import shutil
+from typing import Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Tenant of requests that do not name one
+DEFAULT_TENANT = os.getenv("RAG_DEFAULT_TENANT", "default")
+TENANT_FIELD = "metadata.tenant_id"
+
+_TENANT_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def validate_tenant(tenant) -> str:
+    """
+    The tenant to use for a request; the default tenant when none is given.
+
+    Raises:
+        ValueError: If the tenant id is not 1-64 letters, digits, `-` or `_`
+    """
+    if not tenant:
+        return DEFAULT_TENANT
+    if not isinstance(tenant, str) or not _TENANT_PATTERN.match(tenant):
+        raise ValueError("Tenant ids must be 1-64 letters, digits, '-' or '_'")
+    return tenant
+
+
+def tenant_conditions(tenant: str) -> list:
+    """Filter conditions (all required) that select the points of a tenant."""
+    from qdrant_client import models
+
+    match = models.FieldCondition(key=TENANT_FIELD, match=models.MatchValue(value=tenant))
+    if tenant != DEFAULT_TENANT:
+        return [match]
+    # Points from before tenancy carry no tenant
+    return [models.Filter(should=[match, models.IsEmptyCondition(is_empty=models.PayloadField(key=TENANT_FIELD))])]
+
+
+def tenant_filter(tenant: str):
+    """Search filter restricted to the points of a tenant."""
+    from qdrant_client import models
+    return models.Filter(must=tenant_conditions(tenant))
+
+
+def tenant_hnsw_config():
+    """HNSW settings of new collections: one graph per tenant, none across tenants."""
+    from qdrant_client import models
+    return models.HnswConfigDiff(payload_m=16, m=0)
+
+
+def create_tenant_index(client, collection_name: str):
+    """Index the tenant field as the collection's tenant key."""
+    from qdrant_client import models
+
+    client.create_payload_index(
+        collection_name, field_name=TENANT_FIELD,
+        field_schema=models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True),
+    )
+
+
+def checkpoint_namespace(collection_name: str, tenant: str) -> str:
+    """Checkpoint directory of a tenant, relative to the checkpoint root."""
+    if tenant == DEFAULT_TENANT:
+        # Where checkpoints were kept before tenancy
+        return collection_name
+    return os.path.join(collection_name, "tenants", tenant)
+
+
+def drop_tenant(client, collection_name: str, tenant: str, checkpoint_root: Optional[str] = None) -> int:
+    """
+    Delete every point of a tenant, its chunk store records and its ingestion checkpoints, in one call.
+
+    Args:
+        client: QdrantClient
+        collection_name: Collection holding the tenant's points
+        tenant: Tenant to drop
+        checkpoint_root: Ingestion checkpoint root; defaults to INGEST_CHECKPOINT_DIR
+
+    Returns:
+        Number of points deleted
+    """
+    from qdrant_client import models
+    from src.utils.chunk_store import get_chunk_store
+    from src.utils.ingest_checkpoint import CHECKPOINT_DIR
+
+    tenant = validate_tenant(tenant)
+    path = os.path.join(checkpoint_root or CHECKPOINT_DIR, checkpoint_namespace(collection_name, tenant))
+    if tenant == DEFAULT_TENANT and os.path.isdir(path):
+        # The default tenant's checkpoints sit beside the other tenants' directory
+        for name in os.listdir(path):
+            if name != "tenants":
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    else:
+        shutil.rmtree(path, ignore_errors=True)
+    get_chunk_store(collection_name).drop_tenant(tenant)
+
+    if not client.collection_exists(collection_name):
+        return 0
+    selector = tenant_filter(tenant)
+    count = client.count(collection_name, count_filter=selector, exact=True).count
+    client.delete(collection_name, points_selector=models.FilterSelector(filter=selector), wait=True)
+    return count
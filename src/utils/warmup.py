@@ -0,0 +1,130 @@
+"""
+Warm-up hook run at service start-up.
+
+Moves the cost the first query would otherwise pay (importing the provider
+SDKs, creating clients, DNS lookups and TLS handshakes, fitting the routing
+intent classifier) to start-up, optionally
+in a background thread so the service can accept requests meanwhile.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+GEMINI_HOST = "generativelanguage.googleapis.com"
+OPENWEATHER_URL = "https://api.openweathermap.org"
+
+
+def _import_sdks():
+    import qdrant_client  # noqa: F401
+    import langchain_google_genai  # noqa: F401
+    import google.generativeai  # noqa: F401
+
+
+def _resolve_hosts():
+    hosts = [GEMINI_HOST, urlparse(OPENWEATHER_URL).hostname]
+    qdrant_url = os.getenv("QDRANT_CLOUD_URL")
+    if qdrant_url:
+        hosts.append(urlparse(qdrant_url).hostname)
+    failed = []
+    for host in hosts:
+        try:
+            socket.getaddrinfo(host, 443)
+        except OSError:
+            failed.append(host)
+    if failed:
+        raise OSError(f"Could not resolve {', '.join(failed)}")
+
+
+def _connect_qdrant():
+    from src.utils.clients import get_qdrant_client
+    # Opens a pooled keep-alive connection (TCP + TLS) reused by later searches
+    get_qdrant_client().get_collections()
+
+
+def _connect_gemini():
+    from src.utils.clients import get_gemini_client, get_llm
+    get_llm("gemini-2.0-flash")
+    # Listing models opens the Gemini channel without spending generation quota
+    next(iter(get_gemini_client().list_models()), None)
+
+
+def _load_embeddings():
+    from src.utils.embeddings import get_embedding_provider
+    # Loads a local embedding model; a no-op for the Gemini API
+    get_embedding_provider().dimension
+
+
+def _fit_intent_classifier():
+    from src.graphs.intent_classifier import ROUTER, get_intent_classifier
+    from src.utils import resilience
+    from src.utils.retriever import Retriever
+    if ROUTER != "embedding":
+        return
+    # Embeds the example queries in one request, within the same deadline a query's calls get
+    with resilience.deadline_scope(resilience.new_deadline()):
+        get_intent_classifier(Retriever().embeddings).centroids
+
+
+def _connect_openweather():
+    from src.utils.openweather import _session
+    _session.head(OPENWEATHER_URL, timeout=5)
+
+
+def _load_ingestion():
+    from src.utils.ingest_pdf_docling_genaiembeddings import IngestPDF  # noqa: F401
+    from src.utils.clients import get_document_converter
+    get_document_converter()
+
+
+STEPS = {
+    "import_sdks": _import_sdks,
+    "resolve_dns": _resolve_hosts,
+    "connect_qdrant": _connect_qdrant,
+    "connect_gemini": _connect_gemini,
+    "load_embeddings": _load_embeddings,
+    "fit_intent_classifier": _fit_intent_classifier,
+    "connect_openweather": _connect_openweather,
+}
+
+
+def run_warm_up(include_ingestion: bool = False) -> Dict[str, dict]:
+    """
+    Run every warm-up step, never raising.
+
+    Args:
+        include_ingestion: Also import Docling and build its converter
+
+    Returns:
+        Dict mapping step name to {"seconds": float, "error": Optional[str]}
+    """
+    steps = dict(STEPS)
+    if include_ingestion:
+        steps["load_ingestion"] = _load_ingestion
+
+    timings = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            step()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.warning("Warm-up step %s failed: %s", name, error)
+        timings[name] = {"seconds": round(time.perf_counter() - start, 4), "error": error}
+    logger.info("Warm-up finished: %s", timings)
+    return timings
+
+
+def start_warm_up(include_ingestion: bool = False) -> threading.Thread:
+    """Run `run_warm_up` in a daemon thread and return the thread."""
+    thread = threading.Thread(
+        target=run_warm_up, kwargs={"include_ingestion": include_ingestion}, name="warm-up", daemon=True
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,288 @@
+"""
+In-memory cache of current weather, kept warm for popular locations.
+
+A weather answer costs two OpenWeatherMap calls (geocoding, then current
+weather) on the request path, although current conditions only change every
+few minutes and most questions are about a handful of cities.
+`OpenWeatherService.current_weather` serves conditions fetched less than
+`ttl` seconds ago from memory and records how often each location is asked
+about; coordinates are kept much longer, so a miss usually costs one call.
+At most `max_locations` locations are kept per table; expired entries are
+dropped when read or when a table is full, then the least recently used.
+
+`WeatherRefresher` runs in the background and, every `interval` seconds,
+re-fetches the current weather of the `top_n` most asked-about locations
+whose cached conditions would expire before its next pass, so their answers
+never wait for the API. Popularity decays with a half-life, so yesterday's
+popular city stops being refreshed, and the refresher spends at most `budget`
+API calls per hour.
+
+Settings (environment variables):
+    WEATHER_CACHE_TTL             Seconds current weather is served from memory (default 600)
+    WEATHER_GEOCODE_TTL           Seconds coordinates are kept (default 604800, a week)
+    WEATHER_POPULARITY_HALF_LIFE  Seconds after which a lookup counts half towards popularity (default 3600)
+    WEATHER_CACHE_MAX_LOCATIONS   Locations kept in memory (default 10000)
+    WEATHER_REFRESH               Run the background refresher in the query service (default 1)
+    WEATHER_REFRESH_TOP_N         Locations kept warm (default 20)
+    WEATHER_REFRESH_INTERVAL      Seconds between refresher passes (default 60)
+    WEATHER_REFRESH_BUDGET        OpenWeatherMap calls the refresher may make per hour (default 500)
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+WEATHER_GEOCODE_TTL = float(os.getenv("WEATHER_GEOCODE_TTL", str(7 * 24 * 3600)))
+WEATHER_POPULARITY_HALF_LIFE = float(os.getenv("WEATHER_POPULARITY_HALF_LIFE", "3600"))
+WEATHER_CACHE_MAX_LOCATIONS = int(os.getenv("WEATHER_CACHE_MAX_LOCATIONS", "10000"))
+WEATHER_REFRESH = os.getenv("WEATHER_REFRESH", "1") == "1"
+WEATHER_REFRESH_TOP_N = int(os.getenv("WEATHER_REFRESH_TOP_N", "20"))
+WEATHER_REFRESH_INTERVAL = float(os.getenv("WEATHER_REFRESH_INTERVAL", "60"))
+WEATHER_REFRESH_BUDGET = int(os.getenv("WEATHER_REFRESH_BUDGET", "500"))
+
+
+def location_key(location: str) -> str:
+    """Case- and whitespace-insensitive form of a location name."""
+    return " ".join(location.split()).casefold()
+
+
+class WeatherCache:
+    """Thread-safe, size-bounded LRU store of coordinates and current weather by location, with decayed lookup counts."""
+
+    def __init__(self, ttl: float = WEATHER_CACHE_TTL, geocode_ttl: float = WEATHER_GEOCODE_TTL,
+                 half_life: float = WEATHER_POPULARITY_HALF_LIFE, max_locations: int = WEATHER_CACHE_MAX_LOCATIONS,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            ttl: Seconds current weather is served for
+            geocode_ttl: Seconds coordinates are served for
+            half_life: Seconds after which a lookup counts half towards a location's popularity
+            max_locations: Entries kept in each of the coordinates, weather and popularity tables
+            clock: Time source (for tests)
+        """
+        self.ttl = ttl
+        self.geocode_ttl = geocode_ttl
+        self.half_life = half_life
+        self.max_locations = max_locations
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Least recently used first
+        self._coordinates: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._weather: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Location -> (popularity at `updated`, updated), least recently asked first
+        self._popularity: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _lookup(self, table: OrderedDict, key, ttl: float, now: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Entry of a table if not expired, marked as recently used; expired entries are dropped. Hold the lock."""
+        entry = table.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] > ttl:
+            del table[key]
+            return None
+        table.move_to_end(key)
+        return entry
+
+    def _store(self, table: OrderedDict, key, value: Dict[str, Any], ttl: float, now: float):
+        """Add an entry, dropping expired entries and then the least recently used once full. Hold the lock."""
+        table[key] = (now, value)
+        table.move_to_end(key)
+        if len(table) <= self.max_locations:
+            return
+        for expired in [k for k, (fetched, _) in table.items() if now - fetched > ttl]:
+            del table[expired]
+            self.evicted += 1
+        while len(table) > self.max_locations:
+            table.popitem(last=False)
+            self.evicted += 1
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        return score * 0.5 ** ((now - updated) / self.half_life) if self.half_life else score
+
+    def record(self, location: str):
+        """Count a lookup of a location towards its popularity."""
+        key, now = location_key(location), self._clock()
+        with self._lock:
+            score, updated = self._popularity.get(key, (0.0, now))
+            self._popularity[key] = (self._decayed(score, updated, now) + 1, now)
+            self._popularity.move_to_end(key)
+            if len(self._popularity) > self.max_locations:
+                # The least recently asked location is also the least popular one by now
+                self._popularity.popitem(last=False)
+
+    def popular(self, n: int) -> List[str]:
+        """The `n` most popular locations, most popular first."""
+        now = self._clock()
+        with self._lock:
+            scores = {key: self._decayed(score, updated, now) for key, (score, updated) in self._popularity.items()}
+            # Forget locations nobody has asked about for a long time
+            for key in [key for key, score in scores.items() if score < 0.01]:
+                del self._popularity[key], scores[key]
+        return sorted(scores, key=scores.get, reverse=True)[:n]
+
+    def coordinates(self, location: str) -> Optional[Dict[str, Any]]:
+        """Cached geocoding result of a location, or None."""
+        with self._lock:
+            entry = self._lookup(self._coordinates, location_key(location), self.geocode_ttl, self._clock())
+        return None if entry is None else entry[1]
+
+    def put_coordinates(self, location: str, geocoded: Dict[str, Any]):
+        with self._lock:
+            self._store(self._coordinates, location_key(location), geocoded, self.geocode_ttl, self._clock())
+
+    def age(self, location: str, units: str = "metric") -> Optional[float]:
+        """Seconds since the cached weather of a location was fetched, or None if there is none."""
+        with self._lock:
+            entry = self._weather.get((location_key(location), units))
+        return None if entry is None else self._clock() - entry[0]
+
+    def weather(self, location: str, units: str = "metric") -> Optional[Dict[str, Any]]:
+        """Cached current weather of a location if fresher than the TTL (counted as a hit or miss), or None."""
+        with self._lock:
+            entry = self._lookup(self._weather, (location_key(location), units), self.ttl, self._clock())
+            if entry is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return None if entry is None else entry[1]
+
+    def put_weather(self, location: str, units: str, data: Dict[str, Any]):
+        with self._lock:
+            self._store(self._weather, (location_key(location), units), data, self.ttl, self._clock())
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "locations": len(self._weather),
+                "tracked": len(self._popularity),
+                "evicted": self.evicted,
+            }
+
+
+class WeatherRefresher:
+    """Background thread keeping the current weather of the most popular locations fresh."""
+
+    def __init__(self, cache: WeatherCache, refresh: Callable[[str], Any], top_n: int = WEATHER_REFRESH_TOP_N,
+                 interval: float = WEATHER_REFRESH_INTERVAL, budget: int = WEATHER_REFRESH_BUDGET,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            cache: Cache to keep warm
+            refresh: Fetches a location's current weather into the cache
+                (`OpenWeatherService.fetch_current_weather`)
+            top_n: Locations kept warm
+            interval: Seconds between passes
+            budget: API calls the refresher may make per hour
+            clock: Time source (for tests)
+        """
+        self.cache = cache
+        self.refresh = refresh
+        self.top_n = top_n
+        self.interval = interval
+        self.budget = budget
+        self._clock = clock
+        # Times of the refresher's API calls in the last hour; read by `stats()` from other threads
+        self._calls: Deque[float] = deque()
+        self._calls_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refreshed = 0
+        self.failed = 0
+        self.skipped_for_budget = 0
+
+    def _budget_left_locked(self, now: float) -> int:
+        while self._calls and now - self._calls[0] >= 3600:
+            self._calls.popleft()
+        return self.budget - len(self._calls)
+
+    def _budget_left(self, now: float) -> int:
+        with self._calls_lock:
+            return self._budget_left_locked(now)
+
+    def _spend(self, now: float) -> bool:
+        """Record an API call if the hourly budget allows it."""
+        with self._calls_lock:
+            if self._budget_left_locked(now) < 1:
+                return False
+            self._calls.append(now)
+            return True
+
+    def refresh_once(self) -> int:
+        """
+        Refresh the popular locations whose weather expires before the next pass.
+
+        Only locations that were geocoded successfully are refreshed, so
+        misspelled or unknown names never spend budget.
+
+        Returns:
+            Number of locations refreshed
+        """
+        refreshed = 0
+        for location in self.cache.popular(self.top_n):
+            age = self.cache.age(location)
+            if self.cache.coordinates(location) is None or (age is not None and age < self.cache.ttl - self.interval):
+                continue
+            if not self._spend(self._clock()):
+                self.skipped_for_budget += 1
+                continue
+            try:
+                self.refresh(location)
+                refreshed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning("Refreshing the weather of %s failed: %s", location, e)
+        self.refreshed += refreshed
+        return refreshed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh_once()
+            except Exception:
+                logger.exception("Weather refresher pass failed")
+
+    def start(self) -> "WeatherRefresher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="weather-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "skipped_for_budget": self.skipped_for_budget,
+            "budget_per_hour": self.budget,
+            "budget_left": self._budget_left(self._clock()),
+        }
+
+
+_weather_cache: Optional[WeatherCache] = None
+_weather_cache_lock = threading.Lock()
+
+
+def get_weather_cache() -> WeatherCache:
+    """Process-wide weather cache, shared by all `OpenWeatherService` instances."""
+    global _weather_cache
+    with _weather_cache_lock:
+        if _weather_cache is None:
+            _weather_cache = WeatherCache()
+        return _weather_cache
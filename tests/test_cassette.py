@@ -0,0 +1,58 @@
+import pytest
+from src.utils.cassette import Cassette, CassetteMissError, content_hash
+
+
+@pytest.fixture
+def cassette_path(tmp_path):
+    return str(tmp_path / "cassette.jsonl")
+
+
+def test_off_mode_always_calls(cassette_path):
+    """Test that off mode never records or replays."""
+    calls = []
+    cassette = Cassette(cassette_path, mode="off")
+    for _ in range(2):
+        cassette.call("llm", {"prompt": "hi"}, lambda: calls.append(1) or "answer")
+    assert len(calls) == 2
+    assert len(cassette) == 0
+
+
+def test_record_then_replay(cassette_path):
+    """Test that recorded responses are replayed without calling the provider."""
+    recorder = Cassette(cassette_path, mode="record")
+    assert recorder.call("embedding", {"content": "query"}, lambda: [0.1, 0.2]) == [0.1, 0.2]
+
+    player = Cassette(cassette_path, mode="replay")
+    assert player.call("embedding", {"content": "query"}, lambda: pytest.fail("provider called")) == [0.1, 0.2]
+
+
+def test_replay_miss_raises(cassette_path):
+    """Test that replaying an unrecorded call raises instead of reaching the provider."""
+    player = Cassette(cassette_path, mode="replay")
+    with pytest.raises(CassetteMissError):
+        player.call("llm", {"prompt": "never recorded"}, lambda: "live")
+
+
+def test_record_reuses_existing_entries(cassette_path):
+    """Test that record mode only calls the provider for new requests."""
+    calls = []
+    recorder = Cassette(cassette_path, mode="record")
+    for _ in range(3):
+        recorder.call("llm", {"prompt": "same"}, lambda: calls.append(1) or "answer")
+    assert len(calls) == 1
+
+
+def test_invalid_mode():
+    """Test that an unknown mode is rejected."""
+    with pytest.raises(ValueError, match="Invalid cassette mode"):
+        Cassette(mode="rewind")
+
+
+@pytest.mark.parametrize("a,b,equal", [
+    (("llm", {"prompt": "x", "model": "m"}), ("llm", {"model": "m", "prompt": "x"}), True),
+    (("llm", {"prompt": "x"}), ("embedding", {"prompt": "x"}), False),
+    (("llm", {"prompt": "x"}), ("llm", {"prompt": "y"}), False),
+])
+def test_content_hash(a, b, equal):
+    """Test that hashing ignores key order but not content."""
+    assert (content_hash(*a) == content_hash(*b)) is equal
@@ -0,0 +1,39 @@
+import numpy as np
+from src.utils.chunk_batch import ChunkBatch
+
+
+def chunks():
+    return [
+        {"text": "Intro.", "metadata": {"Header_1": "Guide"}},
+        {"text": "Step one.", "metadata": {"Header_1": "Guide", "Header_2": "Setup"}},
+        {"text": "Step two.", "metadata": {"Header_2": "Setup", "Header_1": "Guide"}},
+        {"text": "Done.", "metadata": {"Header_1": "Guide"}},
+    ]
+
+
+def test_metadata_is_interned():
+    """Test that chunks with equal metadata share one metadata entry."""
+    batch = ChunkBatch.from_chunks(chunks())
+    assert len(batch) == 4
+    assert batch.metadata_table == [{"Header_1": "Guide"}, {"Header_1": "Guide", "Header_2": "Setup"}]
+    assert batch.metadata_ids.tolist() == [0, 1, 1, 0]
+    assert [chunk.to_dict() for chunk in batch] == [
+        {"text": chunk["text"], "metadata": chunk["metadata"]} for chunk in chunks()
+    ]
+
+
+def test_slices_share_table_and_build_payloads():
+    """Test that a slice shares the metadata table and builds Qdrant payloads with the common fields."""
+    batch = ChunkBatch.from_chunks(chunks())
+    batch.vectors = np.arange(8, dtype=np.float32).reshape(4, 2)
+    part = batch.slice(1, 3)
+    assert part.metadata_table is batch.metadata_table
+    assert np.shares_memory(part.vectors, batch.vectors) and part.vectors[0].tolist() == [2.0, 3.0]
+    assert part.payloads({"source": "guide.pdf"}) == [
+        {"page_content": "Step one.",
+         "metadata": {"source": "guide.pdf", "chunk_size": 9, "Header_1": "Guide", "Header_2": "Setup"}},
+        {"page_content": "Step two.",
+         "metadata": {"source": "guide.pdf", "chunk_size": 9, "Header_1": "Guide", "Header_2": "Setup"}},
+    ]
+    restored = ChunkBatch.from_dict(batch.to_dict())
+    assert restored.texts == batch.texts and restored.metadata_ids.tolist() == [0, 1, 1, 0]
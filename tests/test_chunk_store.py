@@ -0,0 +1,78 @@
+import multiprocessing
+from qdrant_client import QdrantClient, models
+from src.utils import retriever as retriever_module
+from src.utils.chunk_store import ChunkStore, slim_payload
+from src.utils.retriever import Retriever
+
+
+def record(text):
+    return {"page_content": text, "metadata": {"source": "manual.pdf", "chunk_size": len(text)}}
+
+
+def test_chunk_store_round_trip_delete_and_compact(tmp_path):
+    """Test that records are read back by point id, replaced, deleted per file and tenant, and compacted."""
+    store = ChunkStore("docs", root=str(tmp_path))
+    store.put_many(["a", "b"], [record("alpha " * 300), record("beta")], "acme", "file-1")
+    store.put_many(["c"], [record("gamma")], "globex", "file-1")
+    store.put_many(["b"], [record("beta v2")], "acme", "file-1")
+
+    assert store.get_many(["a", "b", "missing"]) == {"a": record("alpha " * 300), "b": record("beta v2")}
+    # Records are compressed
+    assert store.stats()["bytes"] < len("alpha " * 300)
+
+    assert store.delete_file("file-1", "acme") == 2
+    assert store.get_many(["a", "b", "c"]) == {"c": record("gamma")}
+    assert store.compact() > 0
+    assert store.stats()["file_bytes"] == store.stats()["bytes"]
+    assert store.get_many(["c"]) == {"c": record("gamma")}
+    assert store.drop_tenant("globex") == 1 and store.get_many(["c"]) == {}
+    store.close()
+
+
+def _append_records(root, writer, batches):
+    store = ChunkStore("docs", root=root)
+    for batch in range(batches):
+        ids = [f"{writer}-{batch}-{i}" for i in range(5)]
+        store.put_many(ids, [record(f"{point_id} " * (1 + i * 40)) for i, point_id in enumerate(ids)], "acme", writer)
+        if writer == "w0" and batch % 5 == 0:
+            store.compact()
+    store.close()
+
+
+def test_concurrent_writers_in_separate_processes_keep_offsets_consistent(tmp_path):
+    """Test that appends and compactions from several processes never leave an offset pointing at another record."""
+    context = multiprocessing.get_context("spawn")
+    writers = [context.Process(target=_append_records, args=(str(tmp_path), f"w{n}", 20)) for n in range(3)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(60)
+        assert writer.exitcode == 0
+
+    store = ChunkStore("docs", root=str(tmp_path))
+    ids = [f"w{n}-{batch}-{i}" for n in range(3) for batch in range(20) for i in range(5)]
+    stored = store.get_many(ids)
+    assert stored == {point_id: record(f"{point_id} " * (1 + int(point_id[-1]) * 40)) for point_id in ids}
+    store.close()
+
+
+def test_retriever_reads_slim_points_from_the_chunk_store(tmp_path, monkeypatch):
+    """Test that searches return the text of slim points from the store and of full points from Qdrant."""
+    client = QdrantClient(":memory:")
+    client.create_collection("docs", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    slim_id, full_id = "6f2b7c1e-4c1a-4f3e-9a51-2d8f0e7b9c01", "6f2b7c1e-4c1a-4f3e-9a51-2d8f0e7b9c02"
+    store = ChunkStore("docs", root=str(tmp_path))
+    store.put_many([slim_id], [record("slim chunk")], "acme", "file-1")
+    client.upsert("docs", points=[
+        models.PointStruct(id=slim_id, vector=[1.0, 0.0], payload=slim_payload("acme", "file-1")),
+        models.PointStruct(id=full_id, vector=[0.9, 0.1],
+                           payload={"page_content": "full chunk", "metadata": {"tenant_id": "acme"}}),
+    ])
+
+    monkeypatch.setenv("QDRANT_API_KEY", "test")
+    monkeypatch.setattr(retriever_module, "get_qdrant_client", lambda: client)
+    monkeypatch.setattr(retriever_module, "get_llm", lambda model: None)
+    monkeypatch.setattr(retriever_module, "get_chunk_store", lambda collection_name: store)
+
+    documents = Retriever("docs", tenant="acme").retrieve("cold starts", k=2, vector=[1.0, 0.0])
+    assert documents == [record("slim chunk"), {"page_content": "full chunk", "metadata": {"tenant_id": "acme"}}]
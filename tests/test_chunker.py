@@ -0,0 +1,64 @@
+import pytest
+from src.utils.chunker import MarkdownChunker, estimate_tokens
+
+TABLE = "| Name | Value |\n|---|---|\n" + "\n".join(f"| row{i} | {i} |" for i in range(40))
+LONG = " ".join(f"Sentence number {i} goes here." for i in range(60))
+
+
+@pytest.fixture
+def chunks():
+    markdown = f"""# Manual
+
+## Installation
+
+Run the installer. Then restart the service.
+
+## Usage
+
+Start it.
+
+{TABLE}
+
+## Long
+
+{LONG}
+
+# Appendix
+
+Text.
+"""
+    return MarkdownChunker(chunk_size=60, chunk_overlap=8).split(markdown)
+
+
+def test_chunks_fit_token_budget(chunks):
+    """Test that every chunk, including split paragraphs and tables, stays within the token budget."""
+    assert all(estimate_tokens(chunk["text"]) <= 60 for chunk in chunks)
+
+
+def test_header_breadcrumbs(chunks):
+    """Test that small sections are packed with their headings and breadcrumbs follow the sections."""
+    assert chunks[0] == {
+        "text": "Run the installer. Then restart the service.\n\n## Usage\n\nStart it.",
+        "metadata": {"Header_1": "Manual", "Header_2": "Installation"},
+    }
+    assert {chunk["metadata"].get("Header_2") for chunk in chunks[1:-1]} <= {"Usage", "Long"}
+    assert chunks[-1] == {"text": "Text.", "metadata": {"Header_1": "Appendix"}}
+
+
+def test_tables_stay_atomic(chunks):
+    """Test that oversized tables are split between rows and every piece repeats the header row."""
+    tables = [chunk["text"] for chunk in chunks if chunk["text"].startswith("|")]
+    assert len(tables) > 1
+    assert all(table.startswith("| Name | Value |\n|---|---|\n") for table in tables)
+    rows = [row for table in tables for row in table.split("\n")[2:]]
+    assert rows == TABLE.split("\n")[2:]
+    assert not any("|" in chunk["text"] for chunk in chunks if not chunk["text"].startswith("|"))
+
+
+def test_split_paragraph_overlaps(chunks):
+    """Test that a paragraph split across chunks repeats its last words at the start of the next chunk."""
+    long_chunks = [chunk["text"] for chunk in chunks if chunk["metadata"].get("Header_2") == "Long"]
+    assert len(long_chunks) > 1
+    for previous, current in zip(long_chunks, long_chunks[1:]):
+        overlap = current.split("\n\n")[0]
+        assert previous.endswith(overlap)
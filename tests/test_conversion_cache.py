@@ -0,0 +1,52 @@
+import os
+import pytest
+from src.utils.conversion_cache import ConversionCache
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "conversions")
+
+
+def test_put_then_get(root):
+    """Test that a stored conversion is returned for the same file hash."""
+    cache = ConversionCache(root, converter_version="docling-test")
+    assert cache.get("abc") is None
+    cache.put("abc", "# Title\n\nBody", {"name": "doc"})
+
+    entry = ConversionCache(root, converter_version="docling-test").get("abc")
+    assert entry["markdown"] == "# Title\n\nBody"
+    assert entry["document"] == {"name": "doc"}
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_converter_version_is_part_of_key(root):
+    """Test that a conversion by another converter version is not reused."""
+    ConversionCache(root, converter_version="docling-1").put("abc", "old")
+    assert ConversionCache(root, converter_version="docling-2").get("abc") is None
+
+
+def test_evicts_least_recently_used(root):
+    """Test that the oldest unused entries are evicted once the cache is over its size bound."""
+    cache = ConversionCache(root, converter_version="docling-test")
+    cache.put("a", "x" * 1000)
+    cache.put("b", "y" * 1000)
+    entry_size = cache.size() // 2
+
+    # Make "a" older than "b", then use it so "b" becomes least recently used
+    for name, mtime in (("a", 1000), ("b", 2000)):
+        os.utime(cache._path(name), (mtime, mtime))
+    cache.get("a")
+
+    cache.max_bytes = 2 * entry_size + entry_size // 2
+    cache.put("c", "z" * 1000)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_disabled_when_max_bytes_is_zero(root):
+    """Test that a zero size bound disables caching."""
+    cache = ConversionCache(root, max_bytes=0, converter_version="docling-test")
+    cache.put("abc", "markdown")
+    assert cache.get("abc") is None
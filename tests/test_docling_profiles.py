@@ -0,0 +1,30 @@
+import pytest
+from src.utils.docling_profiles import DoclingProfile, get_profile, validate_profiles
+
+
+def test_profiles_differ_in_version():
+    """Test that each profile has its own cache and checkpoint key."""
+    versions = {get_profile(name).version() for name in ("fast", "balanced", "accurate")}
+    assert len(versions) == 3
+    assert get_profile().name == "balanced"
+
+
+@pytest.mark.parametrize("name, needs_ocr, expected", [
+    ("fast", True, False),
+    ("balanced", False, False),
+    ("balanced", True, True),
+    ("accurate", False, True),
+])
+def test_use_ocr(name, needs_ocr, expected):
+    """Test that "auto" OCR follows triage while "on" and "off" ignore it."""
+    assert get_profile(name).use_ocr(needs_ocr) is expected
+
+
+def test_invalid_profiles_rejected():
+    """Test that unknown profile names and settings raise ValueError."""
+    with pytest.raises(ValueError):
+        get_profile("turbo")
+    with pytest.raises(ValueError):
+        validate_profiles(["fast", "turbo"])
+    with pytest.raises(ValueError):
+        DoclingProfile("custom", ocr="sometimes")
@@ -0,0 +1,49 @@
+import pytest
+from src.utils import docling_shards
+
+
+@pytest.mark.parametrize("first,last,shard_pages,expected", [
+    (1, 10, 40, [(1, 10)]),
+    (1, 100, 40, [(1, 34), (35, 67), (68, 100)]),
+    (5, 12, 4, [(5, 8), (9, 12)]),
+    (3, 3, 40, [(3, 3)]),
+    (1, 0, 40, []),
+])
+def test_shard_ranges(first, last, shard_pages, expected):
+    """Test that page ranges are split into balanced consecutive shards."""
+    assert docling_shards.shard_ranges(first, last, shard_pages) == expected
+
+
+def test_convert_shards_keeps_page_order(monkeypatch):
+    """Test that shard results come back in page order."""
+    monkeypatch.setattr(docling_shards, "convert_page_range",
+                        lambda file_path, first, last, profile=None, ocr=None: (f"pages {first}-{last}", {"pages": [first, last]}))
+    results = docling_shards.convert_shards("doc.pdf", [(1, 3), (4, 6), (7, 9)], workers=1)
+    assert [markdown for markdown, _ in results] == ["pages 1-3", "pages 4-6", "pages 7-9"]
+
+
+def test_header_context_crosses_shard_boundaries(monkeypatch, tmp_path):
+    """Test that text at the start of a shard keeps the section headers of the previous shard."""
+    from src.utils import ingest_pdf_docling_genaiembeddings as ingestion
+    from src.utils.conversion_cache import ConversionCache
+
+    monkeypatch.setenv("QDRANT_API_KEY", "test")
+    monkeypatch.setattr(ingestion, "get_qdrant_client", lambda: None)
+    monkeypatch.setattr(ingestion, "count_pdf_pages", lambda file_path: 8)
+    monkeypatch.setattr(docling_shards, "SHARD_PAGES", 4)
+    shards = {
+        (1, 4): "# Manual\n\n## Installation\n\nRun the installer.",
+        (5, 8): "Then restart the service.\n\n## Usage\n\nStart it.",
+    }
+    monkeypatch.setattr(docling_shards, "convert_page_range",
+                        lambda file_path, first, last, profile=None, ocr=None: (shards[(first, last)], {}))
+
+    ingest = ingestion.IngestPDF(checkpoint_dir=str(tmp_path / "checkpoints"), page_triage=False,
+                                 conversion_cache=ConversionCache(str(tmp_path / "cache"), max_bytes=0))
+    ingest.chunker.merge_sections = False
+    chunks = ingest.split_markdown(ingest.convert_to_markdown("doc.pdf", file_hash="abc"))
+    sections = {chunk["text"]: chunk["metadata"] for chunk in chunks}
+    assert sections["Run the installer.\n\nThen restart the service."] == {
+        "Header_1": "Manual", "Header_2": "Installation"
+    }
+    assert sections["Start it."] == {"Header_1": "Manual", "Header_2": "Usage"}
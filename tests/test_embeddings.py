@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient, models
+from src.utils import clients, embeddings
+from src.utils.embeddings import (
+    EmbeddingMismatchError, EmbeddingProvider, GeminiEmbeddings, check_collection_embedding,
+    collection_embedding, collection_metadata, encode_length_sorted,
+)
+
+
+class FakeEmbeddings(EmbeddingProvider):
+    name = "fake"
+
+    def __init__(self, model="fake-model", dimension=4):
+        super().__init__(model)
+        self._dimension = dimension
+
+    @property
+    def dimension(self):
+        return self._dimension
+
+
+def test_length_sorted_encoding_keeps_input_order():
+    """Test that texts are encoded longest first and the vectors come back in input order."""
+    texts = ["bb", "a", "dddd", "ccc", "ee"]
+    seen = []
+
+    def encode(sorted_texts):
+        seen.extend(sorted_texts)
+        return [[len(text)] for text in sorted_texts]
+
+    vectors = encode_length_sorted(texts, encode)
+    assert seen == ["dddd", "ccc", "bb", "ee", "a"]
+    assert vectors.dtype == np.float32
+    assert vectors[:, 0].tolist() == [2, 1, 4, 3, 2]
+
+
+def test_gemini_embeddings_batch_requests(monkeypatch):
+    """Test that Gemini embeddings are requested 100 texts at a time and returned as one matrix."""
+    calls = []
+
+    class FakeGemini:
+        @staticmethod
+        def embed_content(model, content, task_type, **kwargs):
+            calls.append((len(content), task_type))
+            return {"embedding": [[float(len(text)), 0.0, 0.0] for text in content]}
+
+    monkeypatch.setattr(clients, "get_gemini_client", lambda: FakeGemini)
+    vectors = GeminiEmbeddings(dimension=3).embed_documents(["x" * i for i in range(250)])
+    assert calls == [(100, "retrieval_document"), (100, "retrieval_document"), (50, "retrieval_document")]
+    assert vectors.shape == (250, 3) and vectors[249, 0] == 249
+
+
+def test_collection_records_embedding_and_rejects_other_models():
+    """Test that a collection's recorded embedding is checked, and legacy collections count as Gemini."""
+    client = QdrantClient(":memory:")
+    provider = FakeEmbeddings()
+    client.create_collection("docs-recorded", metadata=collection_metadata(provider),
+                             vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE))
+    client.create_collection("docs-legacy",
+                             vectors_config=models.VectorParams(size=768, distance=models.Distance.COSINE))
+
+    assert collection_embedding(client, "docs-recorded") == {"provider": "fake", "model": "fake-model", "dimension": 4}
+    assert collection_embedding(client, "docs-missing") is None
+    check_collection_embedding(client, "docs-recorded", provider)
+    with pytest.raises(EmbeddingMismatchError, match="fake-model"):
+        check_collection_embedding(client, "docs-recorded", FakeEmbeddings(model="other-model"))
+    check_collection_embedding(client, "docs-legacy", GeminiEmbeddings())
+    with pytest.raises(EmbeddingMismatchError):
+        check_collection_embedding(client, "docs-legacy", provider)
+
+    for name in ("docs-recorded", "docs-legacy"):
+        embeddings.forget_collection_embedding(name)
@@ -0,0 +1,47 @@
+import threading
+from src.graphs.builder import build_graph
+from src.graphs.type import RAGAgentState, initial_state
+from benchmarks.offline import OfflineProviders, offline_nodes
+
+
+def test_multi_intent_query_runs_both_branches_concurrently_and_merges_them():
+    """Test that a weather question that also asks about the documents gets both answers from parallel branches."""
+    nodes = offline_nodes(OfflineProviders(scale=0.01, seed=0))
+    # Each branch waits for the other to start, which only succeeds if they run concurrently
+    both_started = threading.Barrier(2, timeout=5)
+
+    def concurrent(node):
+        def branch(state):
+            both_started.wait()
+            return node(state)
+        return branch
+
+    nodes["weather"], nodes["retriever"] = concurrent(nodes["weather"]), concurrent(nodes["retriever"])
+    graph = build_graph(RAGAgentState, nodes=nodes, speculative=False)
+    query = "What does the manual say about cold starts, and what's the weather in Oslo?"
+    state = graph.invoke(initial_state(query))
+
+    assert state["status"] == "MergeNodeCompleted"
+    assert state["answer"] == (
+        "The weather in Oslo is clear sky with a temperature of 18.0°C.\n\n" f"Offline answer for: {query}"
+    )
+    assert state["error"] is None
+
+
+def test_single_intent_queries_skip_the_merge_and_failed_branches_degrade_the_answer():
+    """Test that single-intent queries end at their node, and a failed branch's error survives the merge."""
+    nodes = offline_nodes(OfflineProviders(scale=0.01, seed=0))
+
+    def failing_weather(state):
+        state["answer"] = "Error getting weather data: circuit open"
+        state["error"] = "circuit_open"
+        state["status"] = "WeatherNodeCompleted"
+        return state
+
+    graph = build_graph(RAGAgentState, nodes={**nodes, "weather": failing_weather}, speculative=False)
+    weather = graph.invoke(initial_state("What's the weather in Oslo?"))
+    mixed = graph.invoke(initial_state("What does the report say about storms, and what's the weather in Oslo?"))
+
+    assert (weather["status"], weather["error"]) == ("WeatherNodeCompleted", "circuit_open")
+    assert (mixed["status"], mixed["error"]) == ("MergeNodeCompleted", "circuit_open")
+    assert mixed["answer"].startswith("Error getting weather data: circuit open\n\nOffline answer for:")
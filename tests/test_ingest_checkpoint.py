@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import pytest
+from src.utils.ingest_checkpoint import FileCheckpoint, clear_checkpoints, retry_with_backoff
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.4 test")
+    return str(path)
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "checkpoints")
+
+
+def test_retry_succeeds_after_failures():
+    """Test that failed calls are retried with exponential backoff."""
+    delays = []
+    outcomes = iter([ConnectionError("1"), ConnectionError("2"), "ok"])
+
+    def flaky():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert retry_with_backoff(flaky, "flaky call", attempts=3, base_delay=0.5, sleep=delays.append) == "ok"
+    assert delays == [0.5, 1.0]
+
+
+def test_retry_gives_up_with_error():
+    """Test that a call failing every attempt raises instead of being skipped."""
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    with pytest.raises(RuntimeError, match="Upserting batch 1 failed after 3 attempts"):
+        retry_with_backoff(failing, "Upserting batch 1", attempts=3, sleep=lambda _: None)
+    assert len(calls) == 3
+
+
+def test_checkpoint_resumes_from_last_durable_step(pdf_path, root):
+    """Test that converted chunks and embedded/upserted batches survive a restart."""
+    checkpoint = FileCheckpoint("docs", pdf_path, root)
+    assert not checkpoint.converted
+    checkpoint.save_chunks([{"text": "a", "metadata": {}}, {"text": "b", "metadata": {}}])
+    checkpoint.set_batches(batch_size=1, num_batches=2)
+    checkpoint.save_embeddings(0, [[0.1, 0.2]])
+    checkpoint.mark_upserted(0)
+    checkpoint.save_embeddings(1, [[0.3, 0.4]])
+
+    resumed = FileCheckpoint("docs", pdf_path, root)
+    assert resumed.converted and resumed.num_chunks == 2
+    assert resumed.load_chunks().texts == ["a", "b"]
+    resumed.set_batches(batch_size=1, num_batches=2)
+    assert resumed.is_upserted(0)
+    assert resumed.is_embedded(1) and not resumed.is_upserted(1)
+    embeddings = resumed.load_embeddings(1)
+    assert embeddings.dtype == np.float32 and np.allclose(embeddings, [[0.3, 0.4]])
+
+    resumed.mark_upserted(1)
+    assert FileCheckpoint("docs", pdf_path, root).completed
+    assert os.listdir(resumed.path) == ["manifest.json"]
+
+
+def test_batch_layout_change_resets_batches(pdf_path, root):
+    """Test that changing the batch size discards batch records that no longer line up."""
+    checkpoint = FileCheckpoint("docs", pdf_path, root)
+    checkpoint.save_chunks([{"text": "a", "metadata": {}}, {"text": "b", "metadata": {}}])
+    checkpoint.set_batches(batch_size=1, num_batches=2)
+    checkpoint.save_embeddings(0, [[0.1]])
+
+    checkpoint.set_batches(batch_size=2, num_batches=1)
+    assert not checkpoint.is_embedded(0)
+    assert checkpoint.converted
+
+
+def test_clear_checkpoints(pdf_path, root):
+    """Test that clearing a collection forgets its files."""
+    FileCheckpoint("docs", pdf_path, root).save_chunks([{"text": "a", "metadata": {}}])
+    clear_checkpoints("docs", root)
+    assert not FileCheckpoint("docs", pdf_path, root).converted
+
+
+def test_settings_change_discards_checkpoint(pdf_path, root):
+    """Test that chunks split with other settings are not reused."""
+    FileCheckpoint("docs", pdf_path, root, settings={"chunk_size": 2000}).save_chunks([{"text": "a", "metadata": {}}])
+    assert FileCheckpoint("docs", pdf_path, root, settings={"chunk_size": 2000}).converted
+    assert not FileCheckpoint("docs", pdf_path, root, settings={"chunk_size": 500}).converted
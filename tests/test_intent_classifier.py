@@ -0,0 +1,126 @@
+import json
+import time
+import zlib
+import numpy as np
+import pytest
+from src.graphs.intent_classifier import INTENT_EXAMPLES_PATH, IntentClassifier
+from src.graphs.nodes import routing_node as routing
+from src.utils import resilience
+from src.utils.embeddings import EmbeddingProvider
+from evals.router_eval import DEFAULT_DATASET_PATH, load_router_dataset
+
+
+class BagOfWordsEmbeddings(EmbeddingProvider):
+    """Hashed bag-of-words vectors, so classification can be tested without an embedding API."""
+    name = "bag-of-words"
+
+    def __init__(self):
+        super().__init__("hashed-words")
+        self.calls = 0
+
+    @property
+    def dimension(self):
+        return 512
+
+    def embed_queries(self, texts):
+        self.calls += 1
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().replace("?", " ").replace("'s", " ").split():
+                vectors[row, zlib.crc32(word.encode()) % self.dimension] += 1
+        return vectors
+
+
+def test_classifier_learns_intents_from_the_bundled_examples():
+    """Test that the centroids are fitted once, in one batch, and separate weather from document questions."""
+    embeddings = BagOfWordsEmbeddings()
+    classifier = IntentClassifier.from_file(embeddings, min_margin=0.0)
+    weather = embeddings.embed_queries(["Is it raining in Oslo right now?"])[0]
+    document = embeddings.embed_queries(["What are the limitations of the study?"])[0]
+
+    assert classifier.classify_vector(weather)[0] == "weather"
+    assert classifier.classify_vector(document)[0] == "document"
+    assert classifier.is_document(document) and not classifier.is_document(weather)
+    assert embeddings.calls == 3
+
+    with open(INTENT_EXAMPLES_PATH, encoding="utf-8") as f:
+        training = {query for queries in json.load(f).values() for query in queries}
+    assert not training & {example["query"] for example in load_router_dataset(DEFAULT_DATASET_PATH)}
+
+
+def test_routing_node_only_calls_the_llm_for_uncertain_or_weather_queries(monkeypatch):
+    """Test that confident document questions keep their query vector and skip the LLM router."""
+    llm_calls = []
+    monkeypatch.setattr(routing, "ROUTER", "embedding")
+    monkeypatch.setattr(routing, "embedding_route",
+                        lambda query, tenant=None: None if "weather" in query else [0.5, 0.5])
+    monkeypatch.setattr(routing, "llm_route",
+                        lambda query: llm_calls.append(query) or {"is_weather_query": True, "location": "Oslo"})
+
+    document = routing.routing_node({"query": "Summarize the report", "tenant": "default"})
+    weather = routing.routing_node({"query": "What's the weather in Oslo?", "tenant": "default"})
+
+    assert (document["is_weather_query"], document["query_vector"]) == (False, [0.5, 0.5])
+    assert (weather["is_weather_query"], weather["location"]) == (True, "Oslo")
+    assert llm_calls == ["What's the weather in Oslo?"]
+
+
+def test_embedding_router_sends_mixed_questions_to_the_llm(monkeypatch):
+    """Test that a question asking about the weather and the documents is not routed document-only."""
+    embeddings = BagOfWordsEmbeddings()
+    classifier = IntentClassifier.from_file(embeddings)
+
+    class StubRetriever:
+        def __init__(self, tenant=None):
+            self.embeddings = embeddings
+
+        def embed_query(self, query):
+            return embeddings.embed_queries([query])[0].tolist()
+
+    llm_calls = []
+    monkeypatch.setattr(routing, "ROUTER", "embedding")
+    monkeypatch.setattr(routing, "Retriever", StubRetriever)
+    monkeypatch.setattr(routing, "get_intent_classifier", lambda provider: classifier)
+    monkeypatch.setattr(routing, "llm_route", lambda query: llm_calls.append(query) or {
+        "is_weather_query": True, "location": "Oslo", "needs_documents": True,
+    })
+
+    query = "Will I need a jacket in Oslo, and what does the manual say about storing the battery?"
+    assert classifier.classify_vector(embeddings.embed_queries([query])[0])[0] == "mixed"
+    state = routing.routing_node({"query": query, "tenant": "default"})
+
+    assert llm_calls == [query]
+    assert (state["is_weather_query"], state["needs_documents"]) == (True, True)
+    assert state.get("query_vector") is None
+
+
+def test_embedding_router_sends_obvious_weather_questions_straight_to_the_llm(monkeypatch):
+    """Test that queries naming a weather term are not embedded before the LLM router classifies them."""
+    embedded, llm_calls = [], []
+    monkeypatch.setattr(routing, "ROUTER", "embedding")
+    monkeypatch.setattr(routing, "embedding_route",
+                        lambda query, tenant=None: embedded.append(query) or [0.5, 0.5])
+    monkeypatch.setattr(routing, "llm_route",
+                        lambda query: llm_calls.append(query) or {"is_weather_query": True, "location": "Oslo"})
+
+    weather = routing.routing_node({"query": "Is it RAINING in Oslo right now?", "tenant": "default"})
+    document = routing.routing_node({"query": "How do I drain the water tank?", "tenant": "default"})
+
+    assert (weather["is_weather_query"], weather["location"]) == (True, "Oslo")
+    assert weather.get("query_vector") is None
+    assert embedded == ["How do I drain the water tank?"] and llm_calls == ["Is it RAINING in Oslo right now?"]
+    assert document["query_vector"] == [0.5, 0.5]
+
+
+def test_fitting_the_centroids_respects_the_deadline():
+    """Test that the example embedding is a guarded provider call: refused past the deadline, retried later."""
+    embeddings = BagOfWordsEmbeddings()
+    classifier = IntentClassifier.from_file(embeddings)
+
+    with resilience.deadline_scope(time.time() - 1):
+        with pytest.raises(resilience.DeadlineExceeded):
+            classifier.centroids
+    assert embeddings.calls == 0
+
+    assert classifier.centroids.shape == (len(classifier.labels), embeddings.dimension)
+    assert embeddings.calls == 1 and "intent_fit" in resilience.stats()["calls"]
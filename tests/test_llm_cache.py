@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from src.utils.llm_cache import LLMCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_cache_serves_identical_calls_and_expires_them(tmp_path, clock):
+    """Test that responses are keyed by model, parameters and prompt, and expire after the TTL."""
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), ttl=60, evict_every=1, clock=clock)
+    calls = []
+
+    def generate(prompt, model="gemini", params=None):
+        return cache.call("router", model, prompt, lambda: calls.append(prompt) or f"answer {len(calls)}",
+                          params=params)
+
+    assert generate("a") == "answer 1"
+    assert generate("a") == "answer 1"
+    assert generate("a", model="other") == "answer 2"
+    assert generate("a", params={"temperature": 0.2}) == "answer 3"
+    clock.now += 61
+    assert generate("a") == "answer 4"
+
+    stats = cache.stats()
+    # Expired entries are purged on the next write
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 4, 1)
+    assert stats["sites"]["router"]["hit_rate"] == 0.2
+    # Entries persist across processes
+    assert LLMCache(cache.path, ttl=60, clock=clock).call("router", "gemini", "a", lambda: "live") == "answer 4"
+
+
+def test_cache_evicts_least_recently_used_beyond_caps(tmp_path, clock):
+    """Test that the entry cap evicts the least recently used responses first."""
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), max_entries=2, evict_every=1, clock=clock)
+    for prompt in ("a", "b"):
+        clock.now += 1
+        cache.call("retriever", "gemini", prompt, lambda: prompt.upper())
+    clock.now += 1
+    cache.call("retriever", "gemini", "a", lambda: "stale")
+    clock.now += 1
+    cache.call("retriever", "gemini", "c", lambda: "C")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.call("retriever", "gemini", "a", lambda: "live") == "A"
+    assert cache.call("retriever", "gemini", "b", lambda: "live") == "live"
+
+
+def test_cache_can_be_bypassed_per_site_and_per_call(tmp_path):
+    """Test that disabled sites and cache=False always call the model and are counted as bypassed."""
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), disabled_sites=["retriever"])
+    responses = iter(["first", "second", "third", "fourth"])
+
+    async def grade():
+        return next(responses)
+
+    assert cache.call("retriever", "gemini", "p", lambda: next(responses)) == "first"
+    assert cache.call("retriever", "gemini", "p", lambda: next(responses)) == "second"
+    assert asyncio.run(cache.acall("grader", "gemini", ["p"], grade, cache=False)) == "third"
+    assert asyncio.run(cache.acall("grader", "gemini", ["p"], grade)) == "fourth"
+    assert asyncio.run(cache.acall("grader", "gemini", ["p"], grade)) == "fourth"
+
+    stats = cache.stats()
+    assert stats["sites"]["retriever"]["bypassed"] == 2
+    assert (stats["sites"]["grader"]["bypassed"], stats["sites"]["grader"]["hits"]) == (1, 1)
+
+
+def test_eviction_runs_every_n_writes(tmp_path, clock):
+    """Test that the caps are enforced on the first write and then every `evict_every` writes, not on each one."""
+    cache = LLMCache(str(tmp_path / "llm.sqlite"), max_entries=1, evict_every=3, clock=clock)
+    entries = []
+    for prompt in "abcde":
+        clock.now += 1
+        cache.call("retriever", "gemini", prompt, lambda: prompt.upper())
+        entries.append(cache.stats()["entries"])
+
+    assert entries == [1, 2, 3, 1, 2]
+    assert cache.call("retriever", "gemini", "c", lambda: "live") == "live"
+
+
+def test_uncacheable_responses_are_not_stored(tmp_path, monkeypatch):
+    """Test that a routing response that is not valid JSON is retried on the next identical query."""
+    from src.graphs.nodes import routing_node as routing
+
+    class StubLLM:
+        model = "gemini-stub"
+
+        def __init__(self):
+            self.responses = iter(["Sorry, I can't help with that.", '{"is_weather": true, "location": "Oslo"}'])
+            self.calls = 0
+
+        def invoke(self, prompt):
+            self.calls += 1
+            return next(self.responses)
+
+    llm, cache = StubLLM(), LLMCache(str(tmp_path / "llm.sqlite"))
+    monkeypatch.setattr(routing, "get_llm", lambda model: llm)
+    monkeypatch.setattr(routing, "get_llm_cache", lambda: cache)
+
+    assert routing.llm_route("Weather in Oslo?")["answer"] == "Error parsing JSON response"
+    assert routing.llm_route("Weather in Oslo?")["location"] == "Oslo"
+    assert routing.llm_route("Weather in Oslo?")["location"] == "Oslo"
+    assert llm.calls == 2 and cache.stats()["entries"] == 1
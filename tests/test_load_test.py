@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from src.graphs.builder import build_graph
+from src.graphs.type import RAGAgentState
+from benchmarks.load_test import LoadTester, QueryMix, find_saturation, percentile
+from benchmarks.offline import OfflineProviders, offline_nodes
+
+
+@pytest.fixture
+def offline_tester():
+    """Load tester running against the graph with fast offline stand-in nodes."""
+    graph = build_graph(RAGAgentState, nodes=offline_nodes(OfflineProviders(scale=0.001, seed=0)))
+    mix = QueryMix({
+        "weather": {"weight": 1, "queries": ["What's the weather in London?"]},
+        "document": {"weight": 1, "queries": ["What are the main findings?"]},
+    }, seed=0)
+    return LoadTester(graph, mix, workers=8)
+
+
+@pytest.mark.parametrize("values,pct,expected", [
+    ([1.0], 50, 1.0),
+    ([1.0, 2.0, 3.0, 4.0, 5.0], 50, 3.0),
+    ([1.0, 2.0, 3.0, 4.0, 5.0], 0, 1.0),
+    ([1.0, 2.0, 3.0, 4.0, 5.0], 100, 5.0),
+    ([1.0, 2.0], 95, 1.95),
+])
+def test_percentile(values, pct, expected):
+    """Test interpolated percentiles."""
+    assert percentile(values, pct) == pytest.approx(expected)
+
+
+def test_query_mix_respects_zero_weight():
+    """Test that categories with zero weight are never sampled."""
+    mix = QueryMix({
+        "weather": {"weight": 0, "queries": ["What's the weather in Paris?"]},
+        "document": {"weight": 1, "queries": ["Summarize the document"]},
+    }, seed=1)
+    assert all(mix.sample()[0] == "document" for _ in range(50))
+
+
+def test_closed_loop_offline(offline_tester):
+    """Test a closed-loop run reports every request and per-node timings."""
+    report = asyncio.run(offline_tester.run_closed(concurrency=4, requests=20))
+    summary = report.summary()
+
+    assert summary["requests"] == 20
+    assert summary["error_rate"] == 0.0
+    assert summary["nodes"]["routing"]["count"] == 20
+    assert set(summary["nodes"]) <= {"routing", "weather", "retriever"}
+
+
+def test_open_loop_offline(offline_tester):
+    """Test an open-loop run sends the requested number of queries."""
+    report = asyncio.run(offline_tester.run_open(qps=200, requests=20, seed=0))
+    assert report.summary()["requests"] == 20
+
+
+def test_find_saturation(offline_tester):
+    """Test saturation detection on reports with flat throughput."""
+    report = asyncio.run(offline_tester.run_closed(concurrency=1, requests=5))
+    assert find_saturation([report, report]) is report
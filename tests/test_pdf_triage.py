@@ -0,0 +1,89 @@
+import pytest
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+from src.utils.pdf_triage import DOCLING, FAST, body_font_size, lines_to_markdown, page_runs, triage_pdf
+
+BODY = [(f"Running text of the document that goes on for a while {i}", 11) for i in range(20)]
+
+
+def text_ops(lines):
+    ops = []
+    y = 740
+    for text, size in lines:
+        ops.append(f"BT /F1 {size} Tf 72 {y} Td ({text}) Tj ET")
+        y -= size * 2
+    return "\n".join(ops)
+
+
+def make_pdf(path, pages):
+    """Write a PDF with one page per content stream; pages can draw a 1x1 image as /Im1."""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    image = DecodedStreamObject()
+    image.set_data(b"\x00")
+    image.update({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Image"),
+        NameObject("/Width"): NumberObject(1),
+        NameObject("/Height"): NumberObject(1),
+        NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+        NameObject("/BitsPerComponent"): NumberObject(8),
+    })
+    image = writer._add_object(image)
+    for content in pages:
+        page = writer.add_blank_page(612, 792)
+        stream = DecodedStreamObject()
+        stream.set_data(content.encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+            NameObject("/XObject"): DictionaryObject({NameObject("/Im1"): image}),
+        })
+    writer.write(path)
+    return path
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    return make_pdf(str(tmp_path / "mixed.pdf"), [
+        text_ops([("Big Title", 24), ("Section One", 14)] + BODY),
+        text_ops(BODY) + "\nq 500 0 0 400 50 50 cm /Im1 Do Q",
+        "q 612 0 0 792 0 0 cm /Im1 Do Q",
+        text_ops(BODY) + "\n" + "\n".join(f"72 {100 + i * 20} 400 20 re S" for i in range(13)),
+        text_ops([("Name     Value     Unit", 11), ("alpha     1     m", 11), ("beta     2     s", 11)]),
+        text_ops(BODY) + "\nq 20 0 0 20 500 750 cm /Im1 Do Q",
+        "",
+    ])
+
+
+def test_triage_routes(pdf_path):
+    """Test that only pages with figures, scans or tables are routed to Docling."""
+    _, triage = triage_pdf(pdf_path)
+    assert [(page.route, page.reason) for page in triage] == [
+        (FAST, "text"),
+        (DOCLING, "figure"),
+        (DOCLING, "scanned"),
+        (DOCLING, "table"),
+        (DOCLING, "table"),
+        (FAST, "text"),  # a small logo is not a figure
+        (FAST, "empty"),
+    ]
+
+
+def test_page_runs(pdf_path):
+    """Test that consecutive pages with the same route are grouped into page ranges."""
+    _, triage = triage_pdf(pdf_path)
+    assert page_runs(triage) == [(FAST, 1, 1), (DOCLING, 2, 5), (FAST, 6, 7)]
+
+
+def test_fast_pages_keep_headings(pdf_path):
+    """Test that lines set larger than running text become Markdown headings."""
+    _, triage = triage_pdf(pdf_path)
+    markdown = lines_to_markdown(triage[0].lines, body_font_size(triage))
+    assert markdown.startswith("# Big Title")
+    assert "\n## Section One\n" in markdown
+    assert "Running text of the document that goes on for a while 0" in markdown
@@ -0,0 +1,50 @@
+import uuid
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient, models
+from src.utils.qdrant_upload import PointUploader
+
+
+@pytest.fixture
+def client():
+    client = QdrantClient(":memory:")
+    client.create_collection("docs", vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE))
+    return client
+
+
+def batch(file_hash, start, size):
+    ids = [str(uuid.uuid5(uuid.NAMESPACE_OID, f"{file_hash}:{i}")) for i in range(start, start + size)]
+    payloads = [{"page_content": f"chunk {i}", "metadata": {"file_hash": file_hash}} for i in range(start, start + size)]
+    return ids, np.random.rand(size, 4), payloads
+
+
+def test_parallel_upload_and_barrier(client):
+    """Test that batches uploaded on worker threads are all visible after the barrier."""
+    uploader = PointUploader(client, "docs", workers=3, max_pending=3)
+    futures = [uploader.submit(*batch("a", start, 10)) for start in range(0, 50, 10)]
+    futures.append(uploader.submit(*batch("b", 0, 5)))
+    for future in futures:
+        future.result()
+    uploader.barrier({"a": 50, "b": 5})
+    uploader.close()
+
+    assert client.count("docs", exact=True).count == 55
+    stats = uploader.stats()
+    assert stats["points"] == 55 and stats["batches"] == 6 and stats["points_per_second"] > 0
+
+
+def test_barrier_times_out_on_missing_points(client):
+    """Test that the barrier fails instead of reporting success when points are missing."""
+    uploader = PointUploader(client, "docs", workers=1)
+    uploader.submit(*batch("a", 0, 3)).result()
+    with pytest.raises(TimeoutError):
+        uploader.barrier({"a": 4}, timeout=0.1, poll=0.05)
+    uploader.close()
+
+
+def test_failed_upload_raises(client):
+    """Test that an upload that fails every attempt surfaces its error on the future."""
+    uploader = PointUploader(QdrantClient(":memory:"), "missing", workers=1, attempts=1)
+    with pytest.raises(Exception):
+        uploader.submit(*batch("a", 0, 2)).result()
+    uploader.close()
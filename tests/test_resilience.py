@@ -0,0 +1,141 @@
+import threading
+import time
+import pytest
+from src.utils import resilience
+from src.utils.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, deadline_scope, new_deadline
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+def test_breaker_opens_after_failures_and_recovers_after_a_trial_call():
+    """Test that an open circuit refuses calls until its cooldown ends, then closes after a successful trial."""
+    clock = Clock()
+    breaker = CircuitBreaker("provider", failures=2, cooldown=10, clock=clock)
+    for _ in range(2):
+        breaker.before()
+        breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+
+    clock.now += 10
+    breaker.before()
+    # Only one trial call is let through while half-open
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    breaker.failure()
+    assert breaker.state == "open"
+
+    clock.now += 10
+    breaker.before()
+    breaker.success()
+    assert breaker.stats() == {"state": "closed", "failures": 0, "opened": 2, "rejected": 2}
+
+
+def test_rejected_requests_do_not_open_the_circuit():
+    """Test that client errors (4xx other than 429) do not count as provider failures."""
+    def fail(status_code):
+        def fn():
+            raise HTTPError(status_code)
+        return fn
+
+    for _ in range(resilience.BREAKER_FAILURES + 1):
+        with pytest.raises(HTTPError):
+            resilience.call("test-4xx", "lookup", fail(404))
+    assert resilience.get_breaker("test-4xx").state == "closed"
+
+    for _ in range(resilience.BREAKER_FAILURES):
+        with pytest.raises(HTTPError):
+            resilience.call("test-4xx", "lookup", fail(503))
+    with pytest.raises(CircuitOpenError):
+        resilience.call("test-4xx", "lookup", lambda: "unreached")
+
+
+def test_hedged_read_returns_the_faster_duplicate(monkeypatch):
+    """Test that a read outstanding past the hedge delay is sent again and the first answer wins."""
+    monkeypatch.setattr(resilience, "HEDGE_DELAY", 0.05)
+    release = threading.Event()
+    attempts = []
+
+    def read():
+        attempts.append(1)
+        if len(attempts) == 1:
+            # The first request hits the latency tail
+            release.wait(5)
+            return "slow"
+        return "fast"
+
+    start = time.perf_counter()
+    assert resilience.call("test-hedge", "hedged_read", read, hedge=True) == "fast"
+    assert time.perf_counter() - start < 1
+    release.set()
+    assert resilience.stats()["calls"]["hedged_read"]["hedge_wins"] == 1
+
+
+def test_calls_give_up_at_the_deadline():
+    """Test that a call returns DeadlineExceeded at the deadline instead of waiting for the provider."""
+    release = threading.Event()
+    start = time.perf_counter()
+    with deadline_scope(new_deadline(0.1)):
+        with pytest.raises(DeadlineExceeded):
+            resilience.call("test-deadline", "slow_read", lambda: release.wait(5))
+    assert time.perf_counter() - start < 1
+    release.set()
+
+    with deadline_scope(time.time() - 1):
+        with pytest.raises(DeadlineExceeded):
+            resilience.call("test-deadline", "slow_read", lambda: "unreached")
+
+
+def test_deadline_expiries_do_not_open_the_circuit():
+    """Test that calls running out of the caller's budget leave the breaker closed, but provider errors count."""
+    release = threading.Event()
+
+    def slow_then_fail():
+        release.wait(5)
+        raise RuntimeError("provider down")
+
+    for _ in range(resilience.BREAKER_FAILURES + 1):
+        with deadline_scope(new_deadline(0.01)):
+            with pytest.raises(DeadlineExceeded):
+                resilience.call("test-budget", "short_budget", lambda: release.wait(5) or "late")
+    assert resilience.get_breaker("test-budget").state == "closed"
+    assert resilience.abandoned_calls() >= resilience.BREAKER_FAILURES + 1
+    release.set()
+
+    # An abandoned call that ends in a provider error still counts
+    release.clear()
+    with deadline_scope(new_deadline(0.01)):
+        with pytest.raises(DeadlineExceeded):
+            resilience.call("test-budget", "short_budget", slow_then_fail)
+    release.set()
+    deadline = time.time() + 5
+    while resilience.get_breaker("test-budget").stats()["failures"] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert resilience.get_breaker("test-budget").stats()["failures"] == 1
+
+
+def test_expired_trial_call_frees_the_half_open_slot():
+    """Test that a trial call abandoned at the caller's deadline lets the next call try the provider."""
+    clock = Clock()
+    breaker = CircuitBreaker("provider", failures=1, cooldown=10, clock=clock)
+    breaker.before()
+    breaker.failure()
+    clock.now += 10
+    breaker.before()
+    breaker.release()
+    breaker.before()
+    breaker.success()
+    assert breaker.state == "closed"
@@ -1,4 +1,10 @@
+import time
+from types import SimpleNamespace
+import numpy as np
 import pytest
+from src.utils import retriever as retriever_module
+from src.utils.embeddings import EmbeddingProvider
+from src.utils.llm_cache import LLMCache
 from src.utils.retriever import Retriever
 from dotenv import load_dotenv
 load_dotenv()
@@ -87,3 +93,109 @@ def test_generate_response_with_custom_k():
     response = retriever.generate_response("test query", k=2)
     assert isinstance(response, str)
     assert len(response) > 0
+
+
+class OneHotEmbeddings(EmbeddingProvider):
+    """Embeds each query as the one-hot vector of its index in `vocabulary`, counting the embedding calls."""
+    name = "one-hot"
+    remote = False
+
+    def __init__(self, vocabulary):
+        super().__init__("one-hot")
+        self.vocabulary = vocabulary
+        self.calls = []
+
+    @property
+    def dimension(self):
+        return len(self.vocabulary)
+
+    def embed_queries(self, texts):
+        self.calls.append(list(texts))
+        return np.eye(self.dimension, dtype=np.float32)[[self.vocabulary.index(text) for text in texts]]
+
+
+class StubQdrantClient:
+    """Answers searches with a chunk naming the query whose one-hot vector was searched, recording the calls."""
+
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+        self.calls = []
+
+    def _points(self, vector, limit):
+        query = self.vocabulary[int(np.argmax(vector))]
+        return SimpleNamespace(points=[
+            SimpleNamespace(id=str(i), payload={"page_content": f"{query} chunk {i}", "metadata": {"rank": i}})
+            for i in range(limit)
+        ])
+
+    def query_points(self, collection_name, query, limit, **kwargs):
+        self.calls.append(("query_points", 1))
+        return self._points(query, limit)
+
+    def query_batch_points(self, collection_name, requests):
+        self.calls.append(("query_batch_points", len(requests)))
+        return [self._points(request.query, request.limit) for request in requests]
+
+
+class StubLLM:
+    """Answers prompts with the query they end with, slower for earlier prompts so they finish out of order."""
+    model = "gemini-stub"
+
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        query = prompt.rstrip().splitlines()[-1]
+        time.sleep(0.05 if "first" in query else 0)
+        return f"answer: {query}"
+
+
+@pytest.fixture
+def offline_retriever(tmp_path, monkeypatch):
+    """Retriever on a stubbed Qdrant client, embedding provider and LLM, with the LLM cache off."""
+    queries = ["first question", "second question", "third question"]
+    client, llm = StubQdrantClient(queries), StubLLM()
+    monkeypatch.setenv("QDRANT_API_KEY", "test")
+    monkeypatch.setattr(retriever_module, "get_qdrant_client", lambda: client)
+    monkeypatch.setattr(retriever_module, "get_llm", lambda model: llm)
+    monkeypatch.setattr(retriever_module, "get_llm_cache",
+                        lambda: LLMCache(str(tmp_path / "llm.sqlite"), enabled=False))
+    monkeypatch.setattr(retriever_module, "RETRIEVER_PROMPT", "{context}\n{query}")
+    retriever = Retriever(embeddings=OneHotEmbeddings(queries))
+    retriever.queries, retriever.stub_client, retriever.stub_llm = queries, client, llm
+    return retriever
+
+
+def test_retrieve_batch(offline_retriever):
+    """Test batched retrieval embeds and searches once, returning the same chunks as `retrieve` in query order."""
+    queries = offline_retriever.queries
+    results = offline_retriever.retrieve_batch(queries, k=2)
+
+    assert offline_retriever.embeddings.calls == [queries]
+    assert offline_retriever.stub_client.calls == [("query_batch_points", 3)]
+    assert [[doc["page_content"] for doc in docs] for docs in results] == [
+        [f"{query} chunk 0", f"{query} chunk 1"] for query in queries
+    ]
+    assert results == [offline_retriever.retrieve(query, k=2) for query in queries]
+
+
+def test_retrieve_batch_empty(offline_retriever):
+    """Test batched retrieval and generation with no queries make no embedding, search or LLM calls."""
+    assert offline_retriever.retrieve_batch([]) == []
+    assert offline_retriever.generate_batch([]) == []
+    assert offline_retriever.embeddings.calls == []
+    assert offline_retriever.stub_client.calls == []
+    assert offline_retriever.stub_llm.prompts == []
+
+
+def test_generate_batch(offline_retriever):
+    """Test batched generation answers every query from its own context, in query order."""
+    queries = offline_retriever.queries
+    responses = offline_retriever.generate_batch(queries, k=1, max_concurrency=3)
+
+    assert responses == [f"answer: {query}" for query in queries]
+    assert offline_retriever.stub_client.calls == [("query_batch_points", 3)]
+    assert sorted(offline_retriever.stub_llm.prompts) == sorted(
+        f"[Metadata - {{'rank': 0}}]\n{query} chunk 0\n{query}" for query in queries
+    )
@@ -0,0 +1,274 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from src.graphs.builder import build_graph
+from src.graphs.type import RAGAgentState
+from src.service.server import create_app
+from src.service.singleflight import SingleFlight
+from benchmarks.offline import OfflineProviders, offline_nodes
+
+
+class BlockingGraph:
+    """Graph stand-in whose invoke blocks until released."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def invoke(self, state):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        state["answer"] = "done"
+        return state
+
+
+@pytest.fixture
+def offline_graph():
+    return build_graph(RAGAgentState, nodes=offline_nodes(OfflineProviders(scale=0.001, seed=0)))
+
+
+@pytest.fixture
+def client(offline_graph):
+    ingested = []
+    dropped = []
+    app = create_app(graph=offline_graph, ingest=lambda paths, progress, **options: ingested.append((paths, options)),
+                     workers=2, queue_size=2, drop_tenant=lambda tenant: dropped.append(tenant) or 3)
+    with TestClient(app) as test_client:
+        test_client.ingested = ingested
+        test_client.dropped = dropped
+        yield test_client
+
+
+def test_health(client):
+    """Test health endpoint reports pool capacity."""
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["query_capacity"] == 4
+
+
+@pytest.mark.parametrize("query,is_weather", [
+    ("What's the weather in London?", True),
+    ("What are the main findings?", False),
+])
+def test_query(client, query, is_weather):
+    """Test single query returns the final graph state fields."""
+    response = client.post("/query", json={"query": query})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["is_weather_query"] is is_weather
+    assert body["answer"]
+
+
+def test_query_empty_rejected(client):
+    """Test empty queries are rejected by validation."""
+    assert client.post("/query", json={"query": ""}).status_code == 422
+
+
+def test_batch_preserves_order(client):
+    """Test batch results come back in input order."""
+    queries = ["What's the weather in Paris?", "Summarize the document"]
+    response = client.post("/query/batch", json={"queries": queries})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["is_weather_query"] for r in results] == [True, False]
+
+
+def test_batch_larger_than_capacity_rejected(client):
+    """Test a batch that cannot fit in the queue is rejected with 429."""
+    response = client.post("/query/batch", json={"queries": [f"q{i}" for i in range(5)]})
+    assert response.status_code == 429
+
+
+def test_stream(client):
+    """Test streaming emits one event per node and a final result."""
+    response = client.post("/query/stream", json={"query": "What's the weather in Tokyo?"})
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    assert [e["node"] for e in events if e["event"] == "node"] == ["routing", "weather"]
+    assert events[-1]["event"] == "result"
+    assert "Tokyo" in events[-1]["answer"]
+
+
+def _wait_for_job(client, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/ingest/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_ingest(client):
+    """Test uploads are queued as a background job handed to the ingestion callable."""
+    response = client.post("/ingest", files=[("files", ("a.pdf", b"%PDF-1.4", "application/pdf"))])
+    assert response.status_code == 202
+    job = response.json()
+    assert job["files"] == ["a.pdf"]
+
+    assert _wait_for_job(client, job["job_id"])["status"] == "completed"
+    assert len(client.ingested) == 1
+    assert [j["job_id"] for j in client.get("/ingest/jobs").json()["jobs"]] == [job["job_id"]]
+    assert client.get("/ingest/jobs/unknown").status_code == 404
+
+
+def test_ingest_keeps_uploads_with_the_same_name_apart(offline_graph):
+    """Test that two uploads with the same file name both reach ingestion with their own content and name."""
+    received = []
+
+    def ingest(paths, progress):
+        for path in paths:
+            with open(path, "rb") as f:
+                received.append((os.path.basename(path), f.read()))
+
+    files = [("files", ("report.pdf", b"%PDF-1.4 first", "application/pdf")),
+             ("files", ("scans/report.pdf", b"%PDF-1.4 second", "application/pdf"))]
+    with TestClient(create_app(graph=offline_graph, ingest=ingest)) as test_client:
+        job_id = test_client.post("/ingest", files=files).json()["job_id"]
+        assert _wait_for_job(test_client, job_id)["status"] == "completed"
+    assert received == [("report.pdf", b"%PDF-1.4 first"), ("report.pdf", b"%PDF-1.4 second")]
+
+
+def test_ingest_rejects_uploads_that_are_not_file_names(client):
+    """Test that upload names without a file name component are refused before anything is queued."""
+    for filename in ("..", "scans/", "C:\\scans\\", " "):
+        files = [("files", ("a.pdf", b"%PDF-1.4", "application/pdf")),
+                 ("files", (filename, b"%PDF-1.4", "application/pdf"))]
+        response = client.post("/ingest", files=files)
+        assert response.status_code == 422, filename
+    assert client.get("/ingest/jobs").json()["jobs"] == []
+
+
+def test_ingest_profiles(client):
+    """Test the Docling profile and per-file overrides reach the ingestion callable and are validated."""
+    files = [("files", ("a.pdf", b"%PDF-1.4", "application/pdf")), ("files", ("b.pdf", b"%PDF-1.4", "application/pdf"))]
+    response = client.post("/ingest", files=files,
+                           data={"profile": "fast", "file_profiles": json.dumps({"b.pdf": "accurate"})})
+    assert response.status_code == 202
+    assert _wait_for_job(client, response.json()["job_id"])["status"] == "completed"
+    assert client.ingested[-1][1] == {"profile": "fast", "file_profiles": {"b.pdf": "accurate"}}
+
+    assert client.post("/ingest", files=files, data={"profile": "turbo"}).status_code == 422
+    assert client.post("/ingest", files=files, data={"file_profiles": "[1]"}).status_code == 422
+    assert set(client.get("/ingest/profiles").json()["profiles"]) == {"fast", "balanced", "accurate"}
+
+
+def test_tenants(client):
+    """Test the tenant reaches ingestion, is validated, and a tenant's documents can be dropped."""
+    files = [("files", ("a.pdf", b"%PDF-1.4", "application/pdf"))]
+    response = client.post("/ingest", files=files, data={"tenant": "acme"})
+    assert _wait_for_job(client, response.json()["job_id"])["status"] == "completed"
+    assert client.ingested[-1][1] == {"tenant": "acme"}
+
+    assert client.post("/ingest", files=files, data={"tenant": "a/b"}).status_code == 422
+    assert client.post("/query", json={"query": "q", "tenant": "a b"}).status_code == 422
+    assert client.post("/query", json={"query": "What's the weather in Paris?", "tenant": "acme"}).status_code == 200
+
+    assert client.delete("/tenants/acme").json() == {"tenant": "acme", "points_deleted": 3}
+    assert client.dropped == ["acme"]
+
+
+def test_ingest_progress_cancel_and_backpressure(offline_graph):
+    """Test job progress is reported, a full ingest queue returns 429 and cancelling stops the job."""
+    started = threading.Event()
+
+    def ingest(paths, progress):
+        progress.set_total("chunks_embedded", 10)
+        progress.advance("chunks_embedded", 3)
+        started.set()
+        while True:
+            progress.raise_if_cancelled()
+            time.sleep(0.01)
+
+    app = create_app(graph=offline_graph, ingest=ingest, ingest_workers=1, ingest_queue_size=0)
+    files = [("files", ("a.pdf", b"%PDF-1.4", "application/pdf"))]
+    with TestClient(app) as test_client:
+        job_id = test_client.post("/ingest", files=files).json()["job_id"]
+        assert started.wait(2)
+
+        job = test_client.get(f"/ingest/jobs/{job_id}").json()
+        assert job["status"] == "running"
+        assert job["stages"]["chunks_embedded"]["done"] == 3
+        assert job["stages"]["chunks_embedded"]["total"] == 10
+
+        assert test_client.post("/ingest", files=files).status_code == 429
+
+        assert test_client.delete(f"/ingest/jobs/{job_id}").status_code == 200
+        assert _wait_for_job(test_client, job_id)["status"] == "cancelled"
+
+
+def test_backpressure_and_timeout():
+    """Test requests beyond workers + queue get 429 and slow queries get 504."""
+    graph = BlockingGraph()
+    app = create_app(graph=graph, workers=1, queue_size=0, timeout=0.2)
+    with TestClient(app) as test_client:
+        first = {}
+        thread = threading.Thread(target=lambda: first.update(r=test_client.post("/query", json={"query": "q"})))
+        thread.start()
+        assert graph.started.wait(2)
+
+        assert test_client.post("/query", json={"query": "another q"}).status_code == 429
+
+        thread.join()
+        assert first["r"].status_code == 504
+
+        graph.release.set()
+        time.sleep(0.1)
+        assert test_client.get("/health").json()["queries_pending"] == 0
+
+
+def test_identical_concurrent_queries_share_one_execution():
+    """Test that concurrent queries differing only in case and spacing run the graph once."""
+    graph = BlockingGraph()
+    app = create_app(graph=graph, workers=1, queue_size=0)
+    with TestClient(app) as test_client:
+        responses = []
+        threads = [
+            threading.Thread(target=lambda q=q: responses.append(test_client.post("/query", json={"query": q})))
+            for q in ("What is RAG?", "what is  rag?", " WHAT IS RAG? ")
+        ]
+        for thread in threads:
+            thread.start()
+        assert graph.started.wait(2)
+        deadline = time.time() + 2
+        while test_client.get("/health").json()["coalescing"]["requests"] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        graph.release.set()
+        for thread in threads:
+            thread.join()
+
+        assert [r.json()["answer"] for r in responses] == ["done"] * 3
+        assert graph.calls == 1
+        stats = test_client.get("/health").json()["coalescing"]
+        assert (stats["executions"], stats["coalesced"], stats["in_flight"]) == (1, 2, 0)
+
+
+def test_cancelled_waiter_does_not_cancel_shared_execution():
+    """Test that a cancelled waiter leaves the execution to the others, and the last one cancels it."""
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        flights = SingleFlight()
+        shared = loop.create_future()
+        first, second = flights.join(["k", "k"], lambda indexes: [shared])
+        first_task, second_task = asyncio.ensure_future(first), asyncio.ensure_future(second)
+        await asyncio.sleep(0)
+        first_task.cancel()
+        await asyncio.sleep(0)
+        assert not shared.cancelled()
+        shared.set_result("answer")
+        assert await second_task == "answer"
+
+        abandoned = loop.create_future()
+        (waiter,) = flights.join(["other"], lambda indexes: [abandoned])
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(waiter, 0.01)
+        assert abandoned.cancelled()
+        return flights.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["requests"], stats["executions"], stats["in_flight"]) == (3, 2, 0)
@@ -0,0 +1,79 @@
+import threading
+from src.graphs.builder import build_graph
+from src.graphs.speculative import Prefetcher, discard_prefetched, take_prefetched
+from src.graphs.type import RAGAgentState, initial_state
+from benchmarks.offline import OfflineProviders, offline_nodes, offline_prefetcher
+
+
+def test_speculative_graph_uses_prefetch_for_documents_and_discards_it_for_weather():
+    """Test that document queries answer from the prefetched chunks, weather queries discard them and
+    queries naming a weather term are not prefetched at all."""
+    providers = OfflineProviders(scale=0.01, seed=0)
+    prefetcher = offline_prefetcher(providers)
+    graph = build_graph(RAGAgentState, nodes=offline_nodes(providers), speculative=True, prefetcher=prefetcher)
+
+    document = graph.invoke(initial_state("What are the main findings?"))
+    weather = graph.invoke(initial_state("Will the wind pick up in London?"))
+    obvious = graph.invoke(initial_state("What's the weather in London?"))
+    prefetcher.shutdown(wait=True)
+
+    assert document["answer"] == "Offline answer for: What are the main findings?"
+    assert weather["answer"].startswith("The weather in London")
+    assert obvious["answer"].startswith("The weather in London")
+    stats = prefetcher.stats()
+    assert (stats["started"], stats["used"], stats["discarded"] + stats["cancelled"], stats["skipped"]) == (2, 1, 1, 1)
+    assert stats["saved_seconds"] > 0
+
+
+def test_prefetch_failures_fall_back_and_unstarted_prefetches_are_cancelled():
+    """Test that a failed prefetch returns None and a queued one is cancelled without cost."""
+    release = threading.Event()
+
+    def retrieve(query, tenant):
+        if query == "fail":
+            raise RuntimeError("search down")
+        release.wait(5)
+        return [{"page_content": query, "metadata": {}}]
+
+    prefetcher = Prefetcher(retrieve, workers=1)
+    assert take_prefetched(prefetcher.start("fail")) is None
+    running = prefetcher.start("running")
+    queued = prefetcher.start("queued")
+    discard_prefetched(queued)
+    release.set()
+    assert take_prefetched(running) == [{"page_content": "running", "metadata": {}}]
+    assert take_prefetched(queued) is None
+
+    stats = prefetcher.stats()
+    assert (stats["failed"], stats["used"], stats["cancelled"], stats["wasted_seconds"]) == (1, 1, 1, 0)
+    prefetcher.shutdown()
+
+
+def test_unclaimed_prefetches_expire():
+    """Test that a prefetch left behind by a failed or abandoned graph is discarded once older than the TTL."""
+    now = [0.0]
+    prefetcher = Prefetcher(lambda query, tenant: [], ttl=10, clock=lambda: now[0])
+    abandoned = prefetcher.start("abandoned")
+    now[0] += 11
+    prefetcher.start("next")
+
+    assert take_prefetched(abandoned) is None
+    prefetcher.shutdown(wait=True)
+    assert prefetcher.stats()["expired"] == 1
+
+
+def test_speculation_is_off_with_the_embedding_router(monkeypatch):
+    """Test that the default routing node is not wrapped when it embeds queries itself."""
+    from src.graphs import builder
+    prefetcher = Prefetcher(lambda query, tenant: [])
+    wrapped = []
+    monkeypatch.setattr(builder, "speculative_routing", lambda routing, *args, **kwargs: wrapped.append(routing) or routing)
+
+    monkeypatch.setattr(builder, "ROUTER", "embedding")
+    build_graph(RAGAgentState, speculative=True, prefetcher=prefetcher)
+    assert wrapped == []
+
+    monkeypatch.setattr(builder, "ROUTER", "llm")
+    build_graph(RAGAgentState, speculative=True, prefetcher=prefetcher)
+    assert wrapped == [builder.routing_node]
+    prefetcher.shutdown()
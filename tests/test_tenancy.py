@@ -0,0 +1,47 @@
+import pytest
+from qdrant_client import QdrantClient, models
+from src.utils.tenancy import DEFAULT_TENANT, checkpoint_namespace, drop_tenant, tenant_filter, validate_tenant
+
+
+@pytest.fixture
+def client():
+    client = QdrantClient(":memory:")
+    client.create_collection("docs", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    tenants = ["acme", "acme", "globex", DEFAULT_TENANT, None]
+    client.upsert("docs", points=[
+        models.PointStruct(id=i, vector=[1.0, float(i)],
+                           payload={"metadata": {"tenant_id": tenant} if tenant else {"source": "legacy.pdf"}})
+        for i, tenant in enumerate(tenants)
+    ])
+    return client
+
+
+def search(client, tenant):
+    points = client.query_points("docs", query=[1.0, 1.0], query_filter=tenant_filter(tenant), limit=10).points
+    return sorted(point.id for point in points)
+
+
+def test_searches_only_see_own_tenant(client):
+    """Test that a tenant's searches only return its points; untagged points belong to the default tenant."""
+    assert search(client, "acme") == [0, 1]
+    assert search(client, "globex") == [2]
+    assert search(client, DEFAULT_TENANT) == [3, 4]
+    assert validate_tenant(None) == DEFAULT_TENANT
+    with pytest.raises(ValueError):
+        validate_tenant("../other")
+
+
+def test_drop_tenant_removes_points_and_checkpoints(client, tmp_path):
+    """Test that dropping a tenant deletes its points and checkpoints only."""
+    acme = tmp_path / checkpoint_namespace("docs", "acme") / "abc"
+    default = tmp_path / checkpoint_namespace("docs", DEFAULT_TENANT) / "def"
+    acme.mkdir(parents=True)
+    default.mkdir(parents=True)
+
+    assert drop_tenant(client, "docs", "acme", checkpoint_root=str(tmp_path)) == 2
+    assert search(client, "acme") == [] and search(client, "globex") == [2]
+    assert not acme.exists() and default.exists()
+
+    assert drop_tenant(client, "docs", DEFAULT_TENANT, checkpoint_root=str(tmp_path)) == 2
+    assert not default.exists() and (tmp_path / "docs" / "tenants").exists()
+    assert client.count("docs", exact=True).count == 1
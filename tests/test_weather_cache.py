@@ -0,0 +1,91 @@
+import pytest
+from src.utils.openweather import OpenWeatherService
+from src.utils.weather_cache import WeatherCache, WeatherRefresher
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def service(clock):
+    """OpenWeatherService whose API calls are counted stand-ins."""
+    service = OpenWeatherService(api_key="test", cache=WeatherCache(ttl=600, half_life=3600, clock=clock))
+    service.calls = []
+
+    def geocode_location(location):
+        service.calls.append(("geocode", location))
+        return {"name": location, "lat": 1.0, "lon": 2.0}
+
+    def get_weather(lat, lon, units="metric"):
+        service.calls.append(("weather", lat, lon))
+        return {"location": "Oslo", "temperature": len(service.calls), "description": "clear sky"}
+
+    service.geocode_location, service.get_weather = geocode_location, get_weather
+    return service
+
+
+def test_current_weather_is_served_from_memory_within_the_ttl(service, clock):
+    """Test that repeated lookups hit the cache, and an expired entry costs one call with cached coordinates."""
+    first = service.current_weather("Oslo")
+    assert service.current_weather("  oslo ") == first
+    assert len(service.calls) == 2
+
+    clock.now += 601
+    assert service.current_weather("Oslo")["temperature"] == 3
+    assert service.calls[-1] == ("weather", 1.0, 2.0)
+    assert service.cache.stats()["hits"] == 1
+
+
+def test_refresher_keeps_popular_locations_warm_within_its_budget(service, clock):
+    """Test that only popular, geocoded locations about to expire are refreshed, up to the hourly budget."""
+    for location, lookups in (("Oslo", 5), ("Paris", 3), ("Rome", 1)):
+        for _ in range(lookups):
+            service.current_weather(location)
+    service.cache.record("Atlantis")  # Never geocoded, so never refreshed
+    refresher = WeatherRefresher(service.cache, service.fetch_current_weather, top_n=3, interval=60, budget=3,
+                                 clock=clock)
+
+    # Nothing expires before the next pass yet
+    assert refresher.refresh_once() == 0
+    clock.now += 550
+    assert refresher.refresh_once() == 3
+    assert service.cache.popular(2) == ["oslo", "paris"]
+
+    clock.now += 550
+    # The budget is spent for this hour
+    assert refresher.refresh_once() == 0
+    assert refresher.stats()["skipped_for_budget"] == 3
+    clock.now += 3600
+    assert refresher.refresh_once() == 3
+    calls = len(service.calls)
+    assert service.current_weather("Paris") is not None and len(service.calls) == calls
+
+
+def test_cache_is_bounded_and_drops_expired_entries(clock):
+    """Test that the least recently used locations are evicted, expired ones first, and expired reads are dropped."""
+    cache = WeatherCache(ttl=600, max_locations=2, clock=clock)
+    cache.put_weather("Oslo", "metric", {"temperature": 1})
+    clock.now += 700
+    cache.put_weather("Paris", "metric", {"temperature": 2})
+    cache.put_weather("Rome", "metric", {"temperature": 3})
+    # Oslo had expired, so it went before the less recently used Paris
+    assert cache.weather("Paris") == {"temperature": 2} and cache.weather("Rome") == {"temperature": 3}
+    cache.put_weather("Lima", "metric", {"temperature": 4})
+    assert cache.weather("Paris") is None and cache.weather("Rome") is not None
+    assert cache.stats()["evicted"] == 2
+
+    for i in range(5):
+        cache.record(f"city {i}")
+    assert cache.stats()["tracked"] == 2
+    clock.now += 601
+    assert cache.weather("Rome") is None and cache.stats()["locations"] == 1